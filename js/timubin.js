@@ -0,0 +1,86 @@
+// .tmb 二进制题库解码，格式说明见 py-timuToJson/timu_binfmt.py
+// 只解析文件头，题目在访问时才解码，题库再大打开也只需要很短的时间
+const TimuBin = (function () {
+    const NULL_INDEX = 0xFFFFFFFF;
+    const ANSWER_MASK_FLAG = 0x80000000;
+    const LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ';
+    const ID_DECIMAL = 0, ID_HEX = 1;
+    const decoder = new TextDecoder('utf-8');
+
+    function decode(buffer) {
+        const view = new DataView(buffer);
+        const magic = String.fromCharCode(view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3));
+        if (magic !== 'TMB1') {
+            throw new Error('不是 .tmb 题库文件');
+        }
+        const header = [];
+        for (let i = 0; i < 13; i++) {
+            header.push(view.getUint32(4 + i * 4, true));
+        }
+        const [version, count, idKind, stringCount, optionCount, ids, titles, analyses, answers,
+            optionOffsets, options, stringOffsets, stringData] = header;
+        if (version !== 1) {
+            throw new Error('不支持的 .tmb 版本: ' + version);
+        }
+        const u32 = (offset, i) => view.getUint32(offset + i * 4, true);
+        const bytes = new Uint8Array(buffer);
+
+        function string(i) {
+            if (i === NULL_INDEX) {
+                return null;
+            }
+            return decoder.decode(bytes.subarray(stringData + u32(stringOffsets, i), stringData + u32(stringOffsets, i + 1)));
+        }
+
+        function id(i) {
+            if (idKind === ID_DECIMAL) {
+                return view.getBigUint64(ids + i * 8, true).toString();
+            }
+            if (idKind === ID_HEX) {
+                return view.getBigUint64(ids + i * 8, true).toString(16).padStart(16, '0');
+            }
+            return string(u32(ids, i));
+        }
+
+        function answer(i) {
+            const value = u32(answers, i);
+            if (value !== NULL_INDEX && value >= ANSWER_MASK_FLAG) {
+                let result = '';
+                for (let k = 0; k < LETTERS.length; k++) {
+                    if (value & (1 << k)) {
+                        result += LETTERS[k];
+                    }
+                }
+                return result;
+            }
+            return string(value);
+        }
+
+        function get(i) {
+            const option = [];
+            for (let k = u32(optionOffsets, i); k < u32(optionOffsets, i + 1); k++) {
+                option.push(string(u32(options, k)));
+            }
+            return {
+                id: id(i),
+                title: string(u32(titles, i)),
+                option: option,
+                answer: answer(i),
+                analysis: string(u32(analyses, i))
+            };
+        }
+
+        function findById(timuId) {
+            for (let i = 0; i < count; i++) {
+                if (id(i) === timuId) {
+                    return get(i);
+                }
+            }
+            return undefined;
+        }
+
+        return { count: count, stringCount: stringCount, optionCount: optionCount, id: id, get: get, findById: findById };
+    }
+
+    return { decode: decode };
+})();
@@ -0,0 +1,146 @@
+"""答题统计速度测试：生成合成的答题日志，用 timu_analytics 计算全部指标
+
+学生能力和题目难度都是随机的，答对概率随二者之差变化，因此难题的错误率高、区分度为正。
+加 --check 时再用逐个事件的 Python 代码计算一遍错误率、选项次数和区分度，核对结果是否一致（只适合小规模）。
+
+用法：python benchmarks/bench_analytics.py [--events 10000000] [--questions 20000] [--users 50000] [--check]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_analytics import GROUP_FRACTION, LETTERS, MIN_GROUP, MIN_USER_ANSWERS, analyze
+from timu_core import open_database
+
+BANKS = 4
+
+
+def build_database(path, questions):
+    conn = open_database(path)
+    rng = np.random.RandomState(1)
+    answers = rng.randint(0, 4, questions)
+    conn.executemany("INSERT INTO timu (id, title, option, answer, analysis, source, create_time) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                     [(f"q{i:07d}", f"题目{i}", json.dumps(["甲", "乙", "丙", "丁"]), LETTERS[answers[i]], "",
+                       f"题库{i % BANKS}.txt", "2024-01-01 00:00:00") for i in range(questions)])
+    conn.commit()
+    return conn, answers
+
+
+def write_logs(log_dir, events, questions, users, answers):
+    # 每个题库一个日志，格式与 timu_progress 写入的相同；分批生成，内存占用不随事件数增长
+    rng = np.random.RandomState(2)
+    ability = rng.normal(0, 1, users)
+    difficulty = rng.normal(0, 1, questions)
+    per_bank = events // BANKS
+    for bank in range(BANKS):
+        with open(os.path.join(log_dir, f"bank{bank}.log"), 'w', encoding='utf-8') as f:
+            for start in range(0, per_bank, 1000000):
+                n = min(1000000, per_bank - start)
+                u = rng.randint(0, users, n)
+                q = rng.randint(0, questions // BANKS, n) * BANKS + bank
+                p = 1 / (1 + np.exp(difficulty[q] - ability[u]))
+                correct = rng.random_sample(n) < p
+                # 答错时随机选一个错误选项
+                wrong_choice = (answers[q] + rng.randint(1, 4, n)) % 4
+                choice = np.where(correct, answers[q], wrong_choice)
+                letters = np.array(list(LETTERS))[choice]
+                f.write("".join(f'{{"t":1700000000,"u":"u{a}","q":"q{b:07d}","r":{int(c)},"a":"{d}"}}\n'
+                                for a, b, c, d in zip(u.tolist(), q.tolist(), correct.tolist(), letters.tolist())))
+
+
+def reference(log_dir):
+    # 逐个事件计算，用于核对
+    stats = {}
+    first = {}
+    for name in sorted(os.listdir(log_dir)):
+        with open(os.path.join(log_dir, name), 'r', encoding='utf-8') as f:
+            for line in f:
+                event = json.loads(line)
+                s = stats.setdefault(event['q'], {'attempts': 0, 'wrong': 0, 'picks': {}})
+                s['attempts'] += 1
+                s['wrong'] += 1 - event['r']
+                s['picks'][event['a']] = s['picks'].get(event['a'], 0) + 1
+                first.setdefault((name, event['u'], event['q']), event['r'])
+    scores = {}
+    for (bank, user, _), r in first.items():
+        total = scores.setdefault((bank, user), [0, 0])
+        total[0] += 1
+        total[1] += r
+    ranked = {key: r / n for key, (n, r) in scores.items() if n >= MIN_USER_ANSWERS}
+    ordered = sorted(ranked.values())
+    size = int(len(ordered) * GROUP_FRACTION)
+    lower, upper = set(), set()
+    if size and ordered[size - 1] < ordered[-size]:
+        lower = {key for key, score in ranked.items() if score <= ordered[size - 1]}
+        upper = {key for key, score in ranked.items() if score >= ordered[-size]}
+    groups = {}
+    for (bank, user, qid), r in first.items():
+        g = groups.setdefault(qid, [0, 0, 0, 0])
+        if (bank, user) in upper:
+            g[0] += 1
+            g[1] += r
+        elif (bank, user) in lower:
+            g[2] += 1
+            g[3] += r
+    for qid, g in groups.items():
+        stats[qid]['discrimination'] = g[1] / g[0] - g[3] / g[2] if g[0] >= MIN_GROUP and g[2] >= MIN_GROUP else None
+    return stats
+
+
+def check(conn, log_dir):
+    expected = reference(log_dir)
+    rows = {row[0]: row for row in conn.execute("SELECT id, attempts, wrong, discrimination FROM timu_stats")}
+    picks = {}
+    for timu_id, option, count in conn.execute("SELECT id, option, picks FROM timu_option_stats"):
+        picks.setdefault(timu_id, {})[option] = count
+    assert set(rows) == set(expected), "题目集合不一致"
+    for qid, s in expected.items():
+        assert rows[qid][1] == s['attempts'] and rows[qid][2] == s['wrong'], qid
+        assert picks[qid] == s['picks'], qid
+        d = rows[qid][3]
+        assert (d is None and s['discrimination'] is None) or abs(d - s['discrimination']) < 1e-3, qid
+    print(f"核对通过：{len(expected)} 道题的答题次数、答错次数、选项次数和区分度都一致")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="答题统计速度测试")
+    parser.add_argument('--events', type=int, default=10000000)
+    parser.add_argument('--questions', type=int, default=20000)
+    parser.add_argument('--users', type=int, default=50000)
+    parser.add_argument('--check', action='store_true', help="用逐个事件的 Python 代码核对结果")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn, answers = build_database(os.path.join(tmp, 'bench.db'), args.questions)
+        log_dir = os.path.join(tmp, 'progress')
+        os.makedirs(log_dir)
+        start = time.perf_counter()
+        write_logs(log_dir, args.events, args.questions, args.users, answers)
+        size = sum(os.path.getsize(os.path.join(log_dir, name)) for name in os.listdir(log_dir))
+        print(f"生成 {args.events} 个答题事件（{size / 1024 / 1024:.0f} MB），耗时 {time.perf_counter() - start:.1f} 秒")
+
+        start = time.perf_counter()
+        result = analyze(conn, [log_dir])
+        seconds = time.perf_counter() - start
+        print(f"统计 {result['events']} 个事件、{result['users']} 个学生、{result['questions']} 道题，"
+              f"耗时 {seconds:.2f} 秒，{result['events'] / seconds / 1e6:.1f} 百万事件/秒")
+        hardest = conn.execute("SELECT id, attempts, error_rate, discrimination, distractor FROM timu_stats "
+                               "ORDER BY error_rate DESC LIMIT 3").fetchall()
+        print("错误率最高的题目: " + "，".join(f"{row[0]} 错误率 {row[2]:.2f} 区分度 {row[3]} 干扰项 {row[4]}"
+                                          for row in hardest))
+        corr = conn.execute("SELECT AVG(discrimination) FROM timu_stats").fetchone()[0]
+        print(f"平均区分度 {corr:.3f}")
+        if args.check:
+            check(conn, log_dir)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
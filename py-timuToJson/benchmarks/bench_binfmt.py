@@ -0,0 +1,110 @@
+"""题库文件格式对比：缩进JSON、紧凑JSON 与 .tmb 二进制列式格式
+
+比较文件大小（含 gzip 后大小）、解析耗时和解析时的峰值内存。
+.tmb 分别统计"打开并读取一道题"（随机访问）和"读取全部题目"两种情况。
+
+用法：python benchmarks/bench_binfmt.py [合成题目数量]
+"""
+import gzip
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_binfmt import BankReader, encode_bank
+
+JSON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'json')
+
+
+def load_corpus():
+    corpus = []
+    for filename in sorted(os.listdir(JSON_DIR)):
+        if filename.endswith('.json'):
+            with open(os.path.join(JSON_DIR, filename), 'r', encoding='utf-8') as f:
+                corpus.extend(json.load(f))
+    return corpus
+
+
+def synthetic_bank(corpus, count):
+    # 用仓库题库随机拼出指定数量的题目，ID 与旧版导入一样是18位左右的数字
+    rng = random.Random(1)
+    bank = []
+    for i in range(count):
+        a, b = rng.choice(corpus), rng.choice(corpus)
+        bank.append({
+            'id': str(202009130000000000 + i),
+            'title': f"{a['title']}（{b['title'][:10]}）",
+            'option': a['option'],
+            'answer': a['answer'],
+            'analysis': b['analysis'],
+        })
+    return bank
+
+
+def encodings(bank):
+    rows = [(item['id'], item['title'], json.dumps(item['option'], ensure_ascii=False), item['answer'], item['analysis'])
+            for item in bank]
+    return {
+        'JSON缩进': json.dumps(bank, ensure_ascii=False, indent=4).encode('utf-8'),
+        'JSON紧凑': json.dumps(bank, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+        '.tmb': encode_bank(rows),
+    }
+
+
+def measure(func, data, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(data)
+    seconds = (time.perf_counter() - start) / repeat
+    # 计时和内存统计分开跑，tracemalloc 会明显拖慢计时
+    tracemalloc.start()
+    func(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def parse_json(data):
+    return json.loads(data)
+
+
+def tmb_one(data):
+    bank = BankReader(data)
+    return bank[len(bank) // 2]
+
+
+def tmb_all(data):
+    return list(BankReader(data))
+
+
+def report(name, bank):
+    print(f"== {name}（{len(bank)} 道题）")
+    encoded = encodings(bank)
+    for fmt, data in encoded.items():
+        print(f"{fmt}: {len(data) / 1024:.1f} KB, gzip后 {len(gzip.compress(data, 9)) / 1024:.1f} KB")
+    cases = [
+        ('JSON缩进 全部解析', parse_json, encoded['JSON缩进']),
+        ('JSON紧凑 全部解析', parse_json, encoded['JSON紧凑']),
+        ('.tmb 打开并读取一题', tmb_one, encoded['.tmb']),
+        ('.tmb 读取全部题目', tmb_all, encoded['.tmb']),
+    ]
+    for case, func, data in cases:
+        seconds, peak = measure(func, data)
+        print(f"{case}: {seconds * 1000:.2f} ms, 峰值内存 {peak / 1024:.1f} KB")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for filename in sorted(os.listdir(JSON_DIR)):
+        if filename.endswith('.json'):
+            with open(os.path.join(JSON_DIR, filename), 'r', encoding='utf-8') as f:
+                report(filename, json.load(f))
+    report('合成题库', synthetic_bank(load_corpus(), count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""题目写入速度对比：旧的逐行 execute + 捕获 IntegrityError vs BulkWriter 批量写入
+
+用法：python benchmarks/bench_bulk_insert.py [题目数量]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_db import BulkWriter, INSERT_SQL, add_missing_columns, new_timu_id, now_str, txt_row
+
+CREATE_SQL = '''
+CREATE TABLE IF NOT EXISTS timu (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    option TEXT,
+    answer TEXT,
+    analysis TEXT,
+    source TEXT,
+    create_time TEXT
+)
+'''
+
+
+def make_timu(i):
+    return {
+        'title': f'第{i}题 下列关于电子商务的叙述中，正确的是',
+        'option': ['选项一的内容', '选项二的内容', '选项三的内容', '选项四的内容'],
+        'answer': 'ABCD'[i % 4],
+        'analysis': '解析内容' * 5,
+    }
+
+
+def legacy_insert(conn, count):
+    cursor = conn.cursor()
+    create_time = now_str()
+    for i in range(count):
+        row = txt_row(make_timu(i), 'bench.txt', create_time)
+        # 旧代码只重试一次，数据量大时第二次也会冲突，这里改成一直重试
+        while True:
+            try:
+                cursor.execute(INSERT_SQL, (new_timu_id(),) + row[1:])
+                break
+            except sqlite3.IntegrityError:
+                pass
+    conn.commit()
+
+
+def bulk_insert(conn, count):
+    create_time = now_str()
+    with BulkWriter(conn) as writer:
+        for i in range(count):
+            writer.add(txt_row(make_timu(i), 'bench.txt', create_time))
+
+
+def run(name, func, count):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute(CREATE_SQL)
+        add_missing_columns(conn)
+        conn.commit()
+        start = time.perf_counter()
+        func(conn, count)
+        elapsed = time.perf_counter() - start
+        total = conn.execute("SELECT COUNT(*) FROM timu").fetchone()[0]
+        conn.close()
+        print(f"{name}: 写入 {total} 道题, {elapsed:.2f} 秒, {total / elapsed:.0f} 行/秒")
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    run('逐行写入', legacy_insert, count)
+    run('批量写入', bulk_insert, count)
+
+
+if __name__ == "__main__":
+    main()
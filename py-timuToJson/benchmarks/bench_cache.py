@@ -0,0 +1,113 @@
+"""题目管理器读缓存的效果：重复打开题目详情、重复搜索、来回滚动列表，有缓存和没有缓存的耗时对比
+
+另外检查写入后缓存是否正确失效：本程序保存后只丢弃这道题，其他连接写入后全部作废。
+
+用法：python benchmarks/bench_cache.py [题目数量]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from gen_bank import generate
+from timu_cache import CachedSource, TimuCache, load_record
+from timu_core import open_database
+from timu_jobs import Job
+from timu_listview import PAGE_SIZE, AllTimuSource, SearchSource
+from timu_storage import Storage
+from timu_tasks import import_txt
+
+KEYWORDS = ['电子商务', '网络', '管理 发展']
+# 模拟浏览时重复的次数
+ROUNDS = 20
+LIST_PAGES = 10
+
+
+class NullQueue:
+    def put(self, item):
+        pass
+
+
+def build(workdir, count):
+    generate(os.path.join(workdir, 'bank.txt'), count)
+    path = os.path.join(workdir, 'bank.db')
+    conn = open_database(path)
+    job = Job(0, 'bench', None, (), {}, NullQueue())
+    job.started = time.time()
+    import_txt(job, conn, os.path.join(workdir, 'bank.txt'))
+    conn.close()
+    return path
+
+
+def browse(conn, ids, make_source):
+    # 打开详情、搜索、向下翻页各 ROUNDS 轮，返回每轮的平均毫秒数
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for timu_id in ids:
+            make_source('record', timu_id)
+        for keyword in KEYWORDS:
+            source = make_source('search', keyword)
+            source.count()
+            source.fetch_after(None, PAGE_SIZE)
+        source = make_source('all', None)
+        source.count()
+        rows = source.fetch_after(None, PAGE_SIZE)
+        for page in range(LIST_PAGES):
+            rows = source.fetch_after(source.key(rows[-1], 0), PAGE_SIZE)
+    return (time.perf_counter() - start) / ROUNDS * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workdir = tempfile.mkdtemp()
+    try:
+        storage = Storage(build(workdir, count))
+        conn = storage.acquire_reader()
+        ids = [row[0] for row in conn.execute("SELECT id FROM timu ORDER BY random() LIMIT 50")]
+
+        def plain(kind, arg):
+            if kind == 'record':
+                return load_record(conn, arg)
+            return SearchSource(conn, arg) if kind == 'search' else AllTimuSource(conn)
+
+        cache = TimuCache(conn)
+
+        def cached(kind, arg):
+            if kind == 'record':
+                return cache.record(arg)
+            if kind == 'search':
+                return CachedSource(SearchSource(conn, arg), cache, ('search', arg))
+            return CachedSource(AllTimuSource(conn), cache, ('all',))
+
+        print(f"{count} 道题，每轮打开 {len(ids)} 道题目详情、搜索 {len(KEYWORDS)} 个关键字、列表翻 {LIST_PAGES + 1} 页")
+        print(f"不缓存: {browse(conn, ids, plain):.1f} ms/轮")
+        print(f"有缓存: {browse(conn, ids, cached):.1f} ms/轮  {cache.stats()}")
+
+        # 本程序保存一道题：只丢弃这道题的详情，其余仍然命中
+        timu_id = ids[0]
+        with storage.writer() as writer:
+            writer.execute("UPDATE timu SET answer='Z' WHERE id=?", (timu_id,))
+            writer.commit()
+        cache.bump([timu_id])
+        assert cache.record(timu_id)['answer'] == 'Z'
+        assert len(cache.records.items) == len(ids)
+        # 其他连接写入：下次读取时发现 data_version 变化，全部作废
+        with storage.writer() as writer:
+            writer.execute("UPDATE timu SET answer='Y' WHERE id=?", (timu_id,))
+            writer.commit()
+        assert cache.record(timu_id)['answer'] == 'Y'
+        assert len(cache.records.items) == 1 and not cache.pages.items
+        print(f"失效检查通过，写入代数 {cache.generation}")
+        storage.release_reader(conn)
+        storage.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
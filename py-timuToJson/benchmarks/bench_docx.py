@@ -0,0 +1,73 @@
+"""Word 文档导入对比：一次读入整个 document.xml 再解析 vs 边解压边用 iterparse 逐段落解析
+
+用 gen_bank.py 生成同一份题库的 .docx 和 .txt，分别统计两种方案的耗时和内存峰值，
+并核对从 .docx 解析出的题目与从 .txt 解析出的完全相同。
+
+用法：python benchmarks/bench_docx.py [题目数量]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gen_bank import generate
+from timu_docx import W
+from timu_parser import parse_timu, parse_timu_file
+
+
+def whole_document_lines(path):
+    # 整个 document.xml 读进内存建成一棵树，再按段落取文字（不处理自动编号，只用来对比内存）
+    with zipfile.ZipFile(path) as docx:
+        root = ET.fromstring(docx.read('word/document.xml'))
+    for paragraph in root.iter(W + 'p'):
+        yield "".join(t.text or "" for t in paragraph.iter(W + 't'))
+
+
+def measure(func):
+    # tracemalloc 会让逐个回调的解析慢好几倍，所以计时和统计内存分两次运行
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024, result
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workdir = tempfile.mkdtemp()
+    try:
+        docx_path = os.path.join(workdir, 'bank.docx')
+        txt_path = os.path.join(workdir, 'bank.txt')
+        generate(docx_path, count)
+        generate(txt_path, count)
+        with zipfile.ZipFile(docx_path) as docx:
+            xml_size = docx.getinfo('word/document.xml').file_size
+        print(f"{count} 道题，.docx {os.path.getsize(docx_path) / 1024 / 1024:.1f} MB"
+              f"（document.xml {xml_size / 1024 / 1024:.1f} MB）")
+
+        elapsed, peak, questions = measure(lambda: sum(1 for _ in parse_timu(whole_document_lines(docx_path))))
+        print(f"整个读入: {elapsed:.2f} 秒，内存峰值 {peak:.1f} MB")
+        elapsed, peak, questions = measure(lambda: sum(1 for _ in parse_timu_file(docx_path)))
+        print(f"流式解析: {elapsed:.2f} 秒，{questions / elapsed:.0f} 题/秒，内存峰值 {peak:.1f} MB")
+        elapsed, peak, _ = measure(lambda: sum(1 for _ in parse_timu_file(txt_path)))
+        print(f"同样内容的TXT: {elapsed:.2f} 秒，内存峰值 {peak:.1f} MB")
+
+        same = all(a == b for a, b in zip(parse_timu_file(docx_path), parse_timu_file(txt_path)))
+        print(f"与TXT解析结果{'一致' if same and questions == count else '不一致！'}")
+    finally:
+        for filename in os.listdir(workdir):
+            os.remove(os.path.join(workdir, filename))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""导出速度、内存和文件大小对比：旧的 fetchall + indent=4 vs 流式导出（缩进 / 紧凑 / NDJSON）
+
+用法：python benchmarks/bench_export.py [题目数量]
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_db import BulkWriter, add_missing_columns, now_str, txt_row
+from timu_export import EXPORT_FORMATS, write_export
+
+CREATE_SQL = '''
+CREATE TABLE IF NOT EXISTS timu (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    option TEXT,
+    answer TEXT,
+    analysis TEXT,
+    source TEXT,
+    create_time TEXT
+)
+'''
+
+
+def build_database(path, count):
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_SQL)
+    add_missing_columns(conn)
+    create_time = now_str()
+    with BulkWriter(conn) as writer:
+        for i in range(count):
+            timu = {
+                'title': f"第{i}题：下列关于电子商务安全的说法中，正确的是（ ）",
+                'option': [f"{letter}.选项内容{letter}{i}" for letter in "ABCD"],
+                'answer': "ABCD"[i % 4],
+                'analysis': f"本题考察电子商务安全的基础知识{i}",
+            }
+            writer.add(txt_row(timu, f'bench{i % 50}.txt', create_time))
+    return conn
+
+
+def legacy_export(conn, f):
+    # 旧版 export_to_json 的做法
+    timu_list = conn.execute("SELECT id, title, option, answer, analysis FROM timu").fetchall()
+    json_data = []
+    for item in timu_list:
+        try:
+            options = json.loads(item[2])
+        except:
+            options = []
+        json_data.append({"id": item[0], "title": item[1], "option": options, "answer": item[3], "analysis": item[4]})
+    json.dump(json_data, f, ensure_ascii=False, indent=4)
+    return len(json_data)
+
+
+def run(func, conn, out_path):
+    # 计时和内存统计分开跑，tracemalloc 会明显拖慢计时
+    start = time.perf_counter()
+    with open(out_path, 'w', encoding='utf-8') as f:
+        func(conn, f)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    with open(out_path, 'w', encoding='utf-8') as f:
+        func(conn, f)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, os.path.getsize(out_path)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, 'bench.db')
+    out_path = os.path.join(workdir, 'out.json')
+    try:
+        conn = build_database(db_path, count)
+        cases = [('旧版 fetchall', legacy_export)]
+        for fmt in EXPORT_FORMATS:
+            cases.append((f'流式 {fmt}', lambda conn, f, fmt=fmt: write_export(conn, f, fmt)))
+        print(f"{count} 道题")
+        for name, func in cases:
+            seconds, peak, size = run(func, conn, out_path)
+            print(f"{name}: {seconds:.2f} 秒, 峰值内存 {peak / 1024 / 1024:.1f} MB, 文件 {size / 1024 / 1024:.1f} MB")
+        conn.close()
+    finally:
+        for filename in os.listdir(workdir):
+            os.remove(os.path.join(workdir, filename))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""条件导出相关查询的速度对比：旧的全表扫描 vs 来源索引、派生列和来源汇总表
+
+对比来源列表、条件导出题目数、单个来源的导出读取和题型统计，并比较汇总触发器给导入带来的额外耗时。
+"旧"的查询用 NOT INDEXED 强制全表扫描，与升级前的数据库相同。
+
+用法：python benchmarks/bench_filter.py [题目数量]
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_core import open_database, stats
+from timu_db import BulkWriter, now_str, txt_row
+from timu_export import compact_record, count_export_rows, write_export
+
+SOURCES = 200
+
+# 升级前 stats() 的题型统计
+LEGACY_QTYPE_SQL = '''
+CASE
+    WHEN option IS NOT NULL AND option NOT IN ('', '[]') THEN
+        CASE WHEN length(answer) = 1 THEN '单选' ELSE '多选' END
+    WHEN length(answer) > 16 THEN '简答'
+    ELSE '填空'
+END
+'''
+
+
+def make_timu(i):
+    if i % 10 < 8:
+        option = [f"{letter}.选项内容{letter}{i}" for letter in "ABCD"]
+        answer = "ABCD"[i % 4] if i % 10 < 6 else "AC"
+    else:
+        option = []
+        answer = "答案" * (i % 3 * 6 + 1)
+    return {'title': f"第{i}题：下列关于电子商务安全的说法中，正确的是（ ）", 'option': option, 'answer': answer,
+            'analysis': f"本题考察电子商务安全的基础知识{i}"}
+
+
+def fill(conn, count):
+    create_time = now_str()
+    start = time.perf_counter()
+    with BulkWriter(conn) as writer:
+        for i in range(count):
+            writer.add(txt_row(make_timu(i), f'bench{i % SOURCES:03d}.txt', create_time))
+    return time.perf_counter() - start
+
+
+def timed(func, repeat=3):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def legacy_export(conn, source):
+    # 与 write_export 做同样的拼接，只是强制全表扫描
+    f = io.StringIO()
+    cursor = conn.execute("SELECT id, title, option, answer, analysis FROM timu NOT INDEXED WHERE source IN (?)", (source,))
+    count = 0
+    while True:
+        rows = cursor.fetchmany(2000)
+        if not rows:
+            return count
+        f.write(",".join(compact_record(row) for row in rows))
+        count += len(rows)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    workdir = tempfile.mkdtemp()
+    try:
+        # 去掉来源汇总触发器的同一结构（全文索引照常维护），用来衡量汇总表给导入增加的耗时
+        plain = open_database(os.path.join(workdir, 'plain.db'))
+        plain.execute("DROP TRIGGER timu_summary_ai")
+        plain_seconds = fill(plain, count)
+        plain.close()
+        conn = open_database(os.path.join(workdir, 'bench.db'))
+        seconds = fill(conn, count)
+        print(f"{count} 道题，{SOURCES} 个来源")
+        print(f"导入：不维护汇总表 {plain_seconds:.1f} 秒，维护汇总表 {seconds:.1f} 秒")
+
+        source = 'bench007.txt'
+        picked = [f'bench{i:03d}.txt' for i in range(0, SOURCES, 20)]
+        cases = [
+            ("来源列表",
+             lambda: conn.execute("SELECT DISTINCT source FROM timu NOT INDEXED").fetchall(),
+             lambda: conn.execute("SELECT source, SUM(questions) FROM timu_source_summary GROUP BY source").fetchall()),
+            ("条件导出题目数",
+             lambda: conn.execute(f"SELECT COUNT(*) FROM timu NOT INDEXED WHERE source IN ({','.join('?' * len(picked))})",
+                                  picked).fetchone()[0],
+             lambda: count_export_rows(conn, picked)),
+            ("单个来源导出",
+             lambda: legacy_export(conn, source),
+             lambda: write_export(conn, io.StringIO(), sources=[source])),
+            ("题型统计",
+             lambda: conn.execute(f"SELECT {LEGACY_QTYPE_SQL} AS qtype, COUNT(*) FROM timu GROUP BY qtype").fetchall(),
+             lambda: stats(conn)['types']),
+        ]
+        for name, legacy, current in cases:
+            old_ms, old_result = timed(legacy)
+            new_ms, new_result = timed(current)
+            print(f"{name}: 全表扫描 {old_ms:.1f} ms，索引/汇总表 {new_ms:.2f} ms（{old_ms / max(new_ms, 1e-6):.0f} 倍）")
+        conn.close()
+    finally:
+        for filename in os.listdir(workdir):
+            os.remove(os.path.join(workdir, filename))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
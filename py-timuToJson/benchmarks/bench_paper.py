@@ -0,0 +1,93 @@
+"""组卷速度对比：每份试卷把候选题目全部读进 Python 再 random.sample vs 按 (来源, 题型) 分层抽样
+
+用法：python benchmarks/bench_paper.py [题目数量] [试卷份数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_core import open_database
+from timu_db import BulkWriter, now_str, txt_row
+from timu_paper import PaperGenerator, paper_data
+
+SOURCES = 50
+COUNTS = {'单选': 40, '多选': 10, '简答': 5}
+
+
+def make_timu(i, rng):
+    # 题干由随机汉字组成，避免不同题目之间被当作相似题目
+    text = "".join(chr(0x4e00 + rng.randrange(5000)) for _ in range(24))
+    if i % 10 < 8:
+        return {'title': f"{text}（ ）", 'option': [f"{letter}.{text[j * 4:j * 4 + 4]}" for j, letter in enumerate("ABCD")],
+                'answer': "ABCD"[i % 4] if i % 10 < 6 else "AC", 'analysis': ""}
+    return {'title': text, 'option': [], 'answer': text[:20], 'analysis': ""}
+
+
+def build_database(path, count):
+    conn = open_database(path)
+    rng = random.Random(1)
+    create_time = now_str()
+    with BulkWriter(conn) as writer:
+        for i in range(count):
+            writer.add(txt_row(make_timu(i, rng), f'bench{i % SOURCES:02d}.txt', create_time))
+    return conn
+
+
+def legacy_paper(conn, sources, rng):
+    # 每份试卷把所选来源中各题型的候选题目全部读出来再抽
+    rows = []
+    placeholders = ",".join(["?"] * len(sources))
+    for qtype, k in COUNTS.items():
+        candidates = conn.execute(f"SELECT rowid, id, title, option, answer, analysis FROM timu "
+                                  f"WHERE qtype = ? AND source IN ({placeholders})", [qtype] + sources).fetchall()
+        rows.extend(rng.sample(candidates, k))
+    return rows
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    papers = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    workdir = tempfile.mkdtemp()
+    try:
+        conn = build_database(os.path.join(workdir, 'bench.db'), count)
+        sources = [f'bench{i:02d}.txt' for i in range(0, SOURCES, 2)]
+        print(f"{count} 道题，{SOURCES} 个来源，从其中 {len(sources)} 个来源组卷，每份 {sum(COUNTS.values())} 道题")
+
+        legacy_papers = max(1, papers // 20)
+        start = time.perf_counter()
+        for i in range(legacy_papers):
+            paper_data(legacy_paper(conn, sources, random.Random(i)))
+        legacy_ms = (time.perf_counter() - start) / legacy_papers * 1000
+        print(f"全部读出再抽样：{legacy_ms:.1f} ms/份（测 {legacy_papers} 份）")
+
+        start = time.perf_counter()
+        generator = PaperGenerator(conn, sources)
+        paper_data(generator.generate(COUNTS, random.Random(0)))
+        first_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for i in range(1, papers):
+            paper_data(generator.generate(COUNTS, random.Random(i)))
+        seconds = time.perf_counter() - start
+        per_paper = seconds / max(1, papers - 1) * 1000
+        print(f"分层抽样：第一份 {first_ms:.1f} ms（读取分层的 rowid），之后 {per_paper:.2f} ms/份，"
+              f"{papers} 份共 {(first_ms / 1000 + seconds):.1f} 秒（{legacy_ms / per_paper:.0f} 倍）")
+
+        last = [{'id': row[1], 'title': row[2], 'option': row[3]} for row in generator.generate(COUNTS, random.Random(-1))]
+        generator = PaperGenerator(conn, sources, exclude=last)
+        start = time.perf_counter()
+        for i in range(papers):
+            paper_data(generator.generate(COUNTS, random.Random(i)))
+        print(f"排除一份往期试卷及相似题目：{(time.perf_counter() - start) / papers * 1000:.2f} ms/份")
+        conn.close()
+    finally:
+        for filename in os.listdir(workdir):
+            os.remove(os.path.join(workdir, filename))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""TXT题目解析吞吐量对比：旧的整文件正则方案 vs 逐行状态机解析器
+
+用法：python benchmarks/bench_parser.py [重复次数]
+会把示例TXT重复拼接成一个大文件，分别统计两种方案的耗时和内存峰值。
+"""
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_parser import parse_timu_file
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           '将模板内容复制到txt中运行python即可.txt')
+
+
+def legacy_parse(file_path):
+    # 旧版 import_from_txt 的解析流程，仅用于对比
+    with open(file_path, 'r', encoding='UTF-8') as f:
+        data = f.read()
+        data = data.replace('．', '.')
+    pattern = re.compile(r'(?:^|\n\s*)\d+?[\.。]')
+    data_list = pattern.split(data)
+    result = []
+    for item in data_list[1:]:
+        title_match = re.search(r'^(.*?)(?=\n[A-E])', item, re.DOTALL)
+        title = title_match.group(1).strip() if title_match else ""
+        option = re.findall(r'[A-E][\.。]?(.+?)(?=\n[A-E]|\n答案|\n解析|$)', item, re.DOTALL)
+        option = [opt.strip() for opt in option]
+        daan = re.findall(r'答案[:：]([A-E]+)', item)
+        analysis = ''
+        if not daan:
+            daan = re.findall(r'答案[:：]([\s\S]+?)\n解析', item)
+            if daan:
+                daan = daan[0].strip()
+                jiexi = re.findall(r'解析[:：]([\s\S]+)', item)
+                analysis = jiexi[0].strip() if jiexi else ''
+            else:
+                daan = re.findall(r'答案[:：]([\s\S]+)', item)
+                daan = daan[0].strip() if daan else ''
+        else:
+            daan = daan[0].strip()
+            jiexi = re.findall(r'解析[:：]([\s\S]+)', item)
+            analysis = jiexi[0].strip() if jiexi else ''
+        result.append((title, option, daan, analysis))
+    return len(result)
+
+
+def stream_parse(file_path):
+    count = 0
+    for _ in parse_timu_file(file_path):
+        count += 1
+    return count
+
+
+def build_input(repeat):
+    with open(SAMPLE_FILE, 'r', encoding='utf-8') as f:
+        sample = f.read()
+    fd, path = tempfile.mkstemp(suffix='.txt')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        for _ in range(repeat):
+            f.write(sample)
+            f.write('\n')
+    return path
+
+
+def measure(func, file_path):
+    # 计时和内存统计分开跑，避免 tracemalloc 的开销影响耗时
+    start = time.perf_counter()
+    count = func(file_path)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func(file_path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    path = build_input(repeat)
+    try:
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"输入文件: {size_mb:.1f} MB")
+        for name, func in (('旧版正则', legacy_parse), ('流式解析', stream_parse)):
+            count, elapsed, peak = measure(func, path)
+            print(f"{name}: {count} 道题, {elapsed:.2f} 秒, "
+                  f"{size_mb / elapsed:.1f} MB/秒, {count / elapsed:.0f} 题/秒, "
+                  f"内存峰值 {peak / 1024 / 1024:.1f} MB")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""题目搜索速度对比：旧的 LIKE 全表扫描 vs FTS5 trigram 全文索引
+
+用法：python benchmarks/bench_search.py [题目数量]
+"""
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_db import BulkWriter, add_missing_columns, now_str, txt_row
+from timu_search import ensure_fts, search_timu
+
+JSON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'json')
+
+CREATE_SQL = '''
+CREATE TABLE IF NOT EXISTS timu (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    option TEXT,
+    answer TEXT,
+    analysis TEXT,
+    source TEXT,
+    create_time TEXT
+)
+'''
+
+KEYWORDS = ['电子商务', '网络营销', '数字签名', '供应链管理', '云计算 资源', '不存在的关键字']
+
+
+def load_corpus():
+    # 用仓库里的题库作为语料，随机拼接出大量题目
+    corpus = []
+    for filename in sorted(os.listdir(JSON_DIR)):
+        if filename.endswith('.json'):
+            with open(os.path.join(JSON_DIR, filename), 'r', encoding='utf-8') as f:
+                corpus.extend(json.load(f))
+    return corpus
+
+
+def build_database(path, count):
+    corpus = load_corpus()
+    rng = random.Random(1)
+    conn = sqlite3.connect(path)
+    conn.execute(CREATE_SQL)
+    add_missing_columns(conn)
+    create_time = now_str()
+    with BulkWriter(conn) as writer:
+        for i in range(count):
+            a, b = rng.choice(corpus), rng.choice(corpus)
+            timu = {
+                'title': f"{a['title']}（{b['title'][:10]}）{i}",
+                'option': a['option'],
+                'answer': a['answer'],
+                'analysis': b['analysis'],
+            }
+            writer.add(txt_row(timu, f'bench{i % 50}.txt', create_time))
+    return conn
+
+
+def like_query(conn, keyword, limit):
+    # 旧版 search_timu 的查询方式
+    return conn.execute("SELECT id, title, answer, source FROM timu WHERE title LIKE ? OR answer LIKE ? OR source LIKE ?",
+                        (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%")).fetchall()[:limit]
+
+
+def timed(func, *args, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return (time.perf_counter() - start) / repeat * 1000, len(result)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        conn = build_database(path, count)
+        start = time.perf_counter()
+        ensure_fts(conn)
+        print(f"{count} 道题, 建立全文索引耗时 {time.perf_counter() - start:.2f} 秒")
+        for keyword in KEYWORDS:
+            like_ms, like_n = timed(like_query, conn, keyword, 500)
+            fts_ms, fts_n = timed(search_timu, conn, keyword, 500)
+            print(f"{keyword}: LIKE {like_ms:.1f} ms ({like_n} 条), FTS5 {fts_ms:.1f} ms ({fts_n} 条)")
+        conn.close()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""生成用于基准测试的合成题库，支持 TXT 模板格式、Word 文档（.docx，与模板.docx相同的写法）和 JSON 格式
+
+题型比例、题干和解析的长度都可以配置；同样的参数和随机种子总是生成同样的题库。
+题目逐道生成、逐道写出，生成几百万道题也不会占用大量内存。
+
+用法：python benchmarks/gen_bank.py 输出文件(.txt/.docx/.json) [--count 100000] [--mix single=6,multiple=2,blank=1,essay=1]
+                                   [--title-len 30] [--option-len 8] [--analysis-len 60] [--seed 1]
+"""
+import argparse
+import json
+import os
+import random
+import zipfile
+from xml.sax.saxutils import escape
+
+# 常用汉字，生成的文字不会以题号、选项字母开头，不会被解析器误认
+CHARS = ("的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所"
+         "民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表"
+         "间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文"
+         "总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处理世车电子商务网络")
+PUNCTUATION = "，、；"
+
+TYPE_SINGLE = 'single'
+TYPE_MULTIPLE = 'multiple'
+TYPE_BLANK = 'blank'
+TYPE_ESSAY = 'essay'
+DEFAULT_MIX = {TYPE_SINGLE: 6, TYPE_MULTIPLE: 2, TYPE_BLANK: 1, TYPE_ESSAY: 1}
+LETTERS = "ABCDE"
+
+
+def parse_mix(text):
+    # "single=6,multiple=2" -> {'single': 6, 'multiple': 2}
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in DEFAULT_MIX:
+            raise ValueError(f"未知题型: {name}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class BankGenerator:
+    def __init__(self, mix=None, title_len=30, option_len=8, analysis_len=60, seed=1):
+        self.mix = mix or DEFAULT_MIX
+        self.types = list(self.mix)
+        self.weights = [self.mix[t] for t in self.types]
+        self.title_len = title_len
+        self.option_len = option_len
+        self.analysis_len = analysis_len
+        self.rng = random.Random(seed)
+
+    def text(self, mean):
+        # 长度在平均值的一半到1.5倍之间，每隔几个字插入标点
+        length = max(2, int(mean * self.rng.uniform(0.5, 1.5)))
+        chars = self.rng.choices(CHARS, k=length)
+        for i in range(self.rng.randint(6, 12), length - 1, self.rng.randint(6, 12)):
+            chars[i] = self.rng.choice(PUNCTUATION)
+        return "".join(chars)
+
+    def question(self, number):
+        qtype = self.rng.choices(self.types, self.weights)[0]
+        title = f"{self.text(self.title_len)}（{number}）"
+        option = []
+        if qtype == TYPE_SINGLE:
+            option = [self.text(self.option_len) for _ in range(4)]
+            answer = self.rng.choice(LETTERS[:4])
+        elif qtype == TYPE_MULTIPLE:
+            option = [self.text(self.option_len) for _ in range(self.rng.choice((4, 5)))]
+            answer = "".join(sorted(self.rng.sample(LETTERS[:len(option)], self.rng.randint(2, len(option)))))
+        elif qtype == TYPE_BLANK:
+            answer = self.text(6)[:16]
+        else:
+            answer = "\n".join(self.text(self.analysis_len // 2) for _ in range(self.rng.randint(2, 4)))
+        analysis = self.text(self.analysis_len) if self.rng.random() < 0.7 else ""
+        return {'title': title, 'option': option, 'answer': answer, 'analysis': analysis}
+
+    def questions(self, count):
+        for i in range(count):
+            yield self.question(i + 1)
+
+
+def write_txt(path, questions):
+    # 按仓库中的TXT模板格式写出：题号、选项、答案、解析各占一行，简答题答案可以有多行
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for count, timu in enumerate(questions, 1):
+            lines = [f"{count}.{timu['title']}"]
+            lines.extend(f"{LETTERS[i]}.{option}" for i, option in enumerate(timu['option']))
+            lines.append(f"答案：{timu['answer']}")
+            if timu['analysis']:
+                lines.append(f"解析：{timu['analysis']}")
+            f.write("\n".join(lines) + "\n")
+    return count
+
+
+DOCX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        '<Override PartName="/word/numbering.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="word/document.xml"/></Relationships>'),
+    'word/_rels/document.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering" '
+        'Target="numbering.xml"/></Relationships>'),
+    # 题号用 Word 自动编号 "1."，与模板.docx相同
+    'word/numbering.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:numbering xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        '<w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="decimal"/>'
+        '<w:lvlText w:val="%1."/><w:suff w:val="nothing"/></w:lvl></w:abstractNum>'
+        '<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num></w:numbering>'),
+}
+DOCX_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+             '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>')
+DOCX_TAIL = '<w:sectPr/></w:body></w:document>'
+
+
+def docx_paragraph(text, numbered=False):
+    # 多行文字用手动换行（w:br）分隔，和在 Word 中按 Shift+Enter 相同
+    runs = '<w:r><w:br/></w:r>'.join(f'<w:r><w:t xml:space="preserve">{escape(line)}</w:t></w:r>'
+                                      for line in text.split('\n'))
+    num_pr = '<w:pPr><w:numPr><w:ilvl w:val="0"/><w:numId w:val="1"/></w:numPr></w:pPr>' if numbered else ''
+    return f'<w:p>{num_pr}{runs}</w:p>'
+
+
+def write_docx(path, questions):
+    # 内容与 write_txt 相同，解析结果应当一致；document.xml 逐道题写入 zip，不在内存中拼出整个文档
+    count = 0
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as docx:
+        for name, xml in DOCX_PARTS.items():
+            docx.writestr(name, xml)
+        with docx.open('word/document.xml', 'w') as f:
+            f.write(DOCX_HEAD.encode('utf-8'))
+            for count, timu in enumerate(questions, 1):
+                parts = [docx_paragraph(timu['title'], numbered=True)]
+                parts.extend(docx_paragraph(f" {LETTERS[i]}.{option}") for i, option in enumerate(timu['option']))
+                parts.append(docx_paragraph(f"答案：{timu['answer']}"))
+                if timu['analysis']:
+                    parts.append(docx_paragraph(f"解析：{timu['analysis']}"))
+                f.write("".join(parts).encode('utf-8'))
+            f.write(DOCX_TAIL.encode('utf-8'))
+    return count
+
+
+def write_json(path, questions, id_start=202001010000000000):
+    # 与导出的题库格式相同，ID 为18位数字
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("[")
+        for count, timu in enumerate(questions, 1):
+            item = dict(timu, id=str(id_start + count))
+            f.write(("," if count > 1 else "") + json.dumps(item, ensure_ascii=False))
+        f.write("]")
+    return count
+
+
+def generate(path, count, **options):
+    generator = BankGenerator(**options)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.txt':
+        return write_txt(path, generator.questions(count))
+    if ext == '.docx':
+        return write_docx(path, generator.questions(count))
+    return write_json(path, generator.questions(count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成题库")
+    parser.add_argument('path', help="输出文件，扩展名为 .txt、.docx 或 .json")
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help="题型比例，如 single=6,multiple=2,blank=1,essay=1")
+    parser.add_argument('--title-len', type=int, default=30)
+    parser.add_argument('--option-len', type=int, default=8)
+    parser.add_argument('--analysis-len', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    count = generate(args.path, args.count, mix=args.mix, title_len=args.title_len, option_len=args.option_len,
+                     analysis_len=args.analysis_len, seed=args.seed)
+    print(f"已生成 {count} 道题目: {args.path}（{os.path.getsize(args.path) / 1024 / 1024:.1f} MB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""题库服务器压力测试：模拟很多学生同时打开页面、下载题库
+
+每个虚拟用户用一个长连接依次请求 --paths 中的地址（默认是刷题页面、脚本和 json/ 下的题库），
+请求带 Accept-Encoding: gzip；加 --revalidate 时第二轮起带上次收到的 ETag，模拟浏览器缓存验证（应得到 304），
+加 --range 时题库用 Range 分两段下载。结束后输出每秒请求数、吞吐量、延迟分位数和状态码分布，
+以及服务器 /__stats 的统计。
+
+默认在本进程中启动 timu_server（--url 指定已运行的服务器时不启动）：
+    python benchmarks/load_test.py --users 300 --rounds 5
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --users 500 --revalidate
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import time
+import urllib.parse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from timu_server import ROOT_DIR, STATS_PATH, BankServer
+
+DEFAULT_PATHS = ['/index.html', '/timu.html', '/js/vue.min.js', '/js/public.js']
+
+
+def default_paths(root):
+    # 页面和脚本，加上 json/ 下的全部题库文件
+    paths = list(DEFAULT_PATHS)
+    json_dir = os.path.join(root, 'json')
+    if os.path.isdir(json_dir):
+        for name in sorted(os.listdir(json_dir)):
+            if name.endswith(('.json', '.tmb')):
+                paths.append('/json/' + urllib.parse.quote(name))
+    return paths
+
+
+async def read_response(reader):
+    # 读取一个响应，返回 (状态码, 头, 正文长度)
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0)) if status != 304 else 0
+    if length:
+        await reader.readexactly(length)
+    return status, headers, length
+
+
+class LoadTest:
+    def __init__(self, host, port, paths, users, rounds, revalidate=False, use_range=False):
+        self.host = host
+        self.port = port
+        self.paths = paths
+        self.users = users
+        self.rounds = rounds
+        self.revalidate = revalidate
+        self.use_range = use_range
+        self.latencies = []
+        self.status = collections.Counter()
+        self.bytes = 0
+        self.errors = 0
+
+    async def request(self, reader, writer, path, headers):
+        lines = [f"GET {path} HTTP/1.1", f"Host: {self.host}:{self.port}", "Accept-Encoding: gzip"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        start = time.perf_counter()
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        status, response_headers, length = await read_response(reader)
+        self.latencies.append(time.perf_counter() - start)
+        self.status[status] += 1
+        self.bytes += length
+        return status, response_headers
+
+    async def user(self):
+        etags = {}
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port, limit=1024 * 1024)
+        except OSError:
+            self.errors += 1
+            return
+        try:
+            for _ in range(self.rounds):
+                for path in self.paths:
+                    headers = {}
+                    if self.revalidate and path in etags:
+                        headers['If-None-Match'] = etags[path]
+                    if self.use_range and path.startswith('/json/') and not headers:
+                        # 题库分两段下载
+                        status, response_headers = await self.request(reader, writer, path, {'Range': 'bytes=0-65535'})
+                        total = response_headers.get('content-range', '/0').rpartition('/')[2]
+                        if status == 206 and int(total) > 65536:
+                            await self.request(reader, writer, path, {'Range': 'bytes=65536-'})
+                        etags[path] = response_headers.get('etag')
+                        continue
+                    status, response_headers = await self.request(reader, writer, path, headers)
+                    if response_headers.get('etag'):
+                        etags[path] = response_headers['etag']
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            self.errors += 1
+        finally:
+            writer.close()
+
+    async def run(self):
+        start = time.perf_counter()
+        await asyncio.gather(*(self.user() for _ in range(self.users)))
+        return time.perf_counter() - start
+
+    def report(self, seconds):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+
+        requests = len(latencies)
+        print(f"{self.users} 个用户 × {self.rounds} 轮 × {len(self.paths)} 个地址，共 {requests} 个请求，"
+              f"耗时 {seconds:.2f} 秒，失败连接 {self.errors} 个")
+        print(f"每秒请求数: {requests / seconds:.0f}，吞吐量: {self.bytes / seconds / 1024 / 1024:.1f} MB/秒")
+        print(f"延迟(毫秒): p50 {percentile(0.5):.1f}  p90 {percentile(0.9):.1f}  p99 {percentile(0.99):.1f}  "
+              f"最大 {percentile(1.0):.1f}")
+        print("状态码: " + "，".join(f"{code} × {count}" for code, count in sorted(self.status.items())))
+
+
+async def fetch_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {STATS_PATH} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+    await reader.readuntil(b'\r\n\r\n')
+    body = await reader.read()
+    writer.close()
+    return json.loads(body)
+
+
+async def main_async(args):
+    server = listener = None
+    if args.url:
+        parts = urllib.parse.urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+    else:
+        server = BankServer(args.root, args.cache_mb * 1024 * 1024)
+        listener = await server.start('127.0.0.1', 0)
+        host, port = listener.sockets[0].getsockname()[:2]
+        print(f"已在本进程启动服务器: http://{host}:{port}/")
+    paths = args.paths.split(',') if args.paths else default_paths(args.root)
+
+    test = LoadTest(host, port, paths, args.users, args.rounds, args.revalidate, args.range)
+    seconds = await test.run()
+    test.report(seconds)
+    stats = await fetch_stats(host, port)
+    print("服务器统计: " + json.dumps(stats, ensure_ascii=False))
+    if listener is not None:
+        listener.close()
+        await listener.wait_closed()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="题库服务器压力测试")
+    parser.add_argument('--url', help="已运行的服务器地址，不指定时在本进程中启动")
+    parser.add_argument('--root', default=ROOT_DIR, help="本进程启动服务器时的仓库根目录")
+    parser.add_argument('--cache-mb', type=int, default=256)
+    parser.add_argument('--paths', help="逗号分隔的请求地址，默认是页面、脚本和全部题库")
+    parser.add_argument('--users', type=int, default=200, help="同时在线的用户数（连接数）")
+    parser.add_argument('--rounds', type=int, default=3, help="每个用户把地址列表请求几轮")
+    parser.add_argument('--revalidate', action='store_true', help="第二轮起带 If-None-Match，模拟浏览器缓存验证")
+    parser.add_argument('--range', action='store_true', help="题库用 Range 分段下载")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
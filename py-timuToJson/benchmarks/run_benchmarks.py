@@ -0,0 +1,205 @@
+"""导入、搜索、列表、导出全流程基准测试，不需要图形界面
+
+对每个题库规模生成合成题库，然后依次测量：
+    parse_txt    流式解析TXT文件
+    import_txt   导入TXT（与"从TXT文件导入"相同的后台任务）
+    import_json  导入JSON（与"从JSON文件导入"相同的后台任务）
+    search       搜索（与题目管理页的搜索相同）
+    list         题目列表首屏和向下翻页（与题目管理页的分页列表相同）
+    export       流式导出紧凑JSON
+每个阶段在单独的子进程中运行，分别统计耗时、每秒处理题目数和峰值内存（RSS），
+最后输出各阶段随题库规模变化的表格，可选写出JSON报告。
+
+用法：python benchmarks/run_benchmarks.py [--sizes 10000,100000,1000000] [--stages import_txt,search]
+                                         [--workdir 目录] [--report report.json]
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from gen_bank import generate
+
+STAGES = ['parse_txt', 'import_txt', 'import_json', 'search', 'list', 'export']
+DEFAULT_SIZES = [10000, 100000, 1000000]
+KEYWORDS = ['电子商务', '网络', '管理 发展', '不存在的关键字']
+# 列表阶段向下翻的页数
+LIST_PAGES = 50
+
+class NullQueue:
+    # 基准测试不需要进度事件
+    def put(self, item):
+        pass
+
+
+def bench_job():
+    from timu_jobs import Job
+    job = Job(0, 'bench', None, (), {}, NullQueue())
+    job.started = time.time()
+    return job
+
+
+def stage_parse_txt(workdir, size):
+    from timu_parser import parse_timu_file
+    count = 0
+    for _ in parse_timu_file(os.path.join(workdir, 'bank.txt')):
+        count += 1
+    return count
+
+
+def stage_import_txt(workdir, size):
+    from timu_core import open_database
+    from timu_tasks import import_txt
+    path = os.path.join(workdir, 'txt.db')
+    conn = open_database(path)
+    result = import_txt(bench_job(), conn, os.path.join(workdir, 'bank.txt'))
+    conn.close()
+    return result['count']
+
+
+def stage_import_json(workdir, size):
+    from timu_core import open_database
+    from timu_tasks import import_json
+    conn = open_database(os.path.join(workdir, 'json.db'))
+    result = import_json(bench_job(), conn, os.path.join(workdir, 'bank.json'))
+    conn.close()
+    return result['count']
+
+
+def stage_search(workdir, size):
+    from timu_search import search_timu
+    conn = sqlite3.connect(os.path.join(workdir, 'txt.db'))
+    count = 0
+    for keyword in KEYWORDS:
+        count += len(search_timu(conn, keyword))
+    conn.close()
+    return count
+
+
+def stage_list(workdir, size):
+    from timu_listview import PAGE_SIZE, AllTimuSource
+    conn = sqlite3.connect(os.path.join(workdir, 'txt.db'))
+    source = AllTimuSource(conn)
+    source.count()
+    rows = source.fetch_after(None, PAGE_SIZE)
+    count = len(rows)
+    for _ in range(LIST_PAGES):
+        if not rows:
+            break
+        rows = source.fetch_after(source.key(rows[-1], count - 1), PAGE_SIZE)
+        count += len(rows)
+    conn.close()
+    return count
+
+
+def stage_export(workdir, size):
+    from timu_export import EXPORT_COMPACT, write_export
+    conn = sqlite3.connect(os.path.join(workdir, 'txt.db'))
+    with open(os.path.join(workdir, 'export.json'), 'w', encoding='utf-8') as f:
+        count = write_export(conn, f, EXPORT_COMPACT)
+    conn.close()
+    return count
+
+
+def peak_rss_mb():
+    # Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+def run_stage(stage, workdir, size):
+    # 在子进程中执行：运行一个阶段，把结果以一行JSON输出
+    func = globals()['stage_' + stage]
+    start = time.perf_counter()
+    count = func(workdir, size)
+    seconds = time.perf_counter() - start
+    print(json.dumps({'stage': stage, 'size': size, 'count': count, 'seconds': seconds,
+                      'per_sec': count / seconds if seconds > 0 else 0, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def spawn_stage(stage, workdir, size):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-stage', stage,
+                             '--workdir', workdir, '--sizes', str(size)],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_table(results, sizes):
+    print()
+    print("阶段".ljust(12) + "".join(f"{size:>24}" for size in sizes))
+    for stage in dict.fromkeys(result['stage'] for result in results):
+        cells = []
+        for size in sizes:
+            found = [r for r in results if r['stage'] == stage and r['size'] == size]
+            if found:
+                r = found[0]
+                cells.append(f"{r['seconds']:.2f}s {r['per_sec']:.0f}/s {r['peak_rss_mb']:.0f}MB")
+            else:
+                cells.append("-")
+        print(stage.ljust(12) + "".join(f"{cell:>24}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入、搜索、列表、导出全流程基准测试")
+    parser.add_argument('--sizes', default=",".join(map(str, DEFAULT_SIZES)), help="题库规模，逗号分隔")
+    parser.add_argument('--stages', default=",".join(STAGES), help="要运行的阶段，逗号分隔")
+    parser.add_argument('--workdir', help="存放合成题库和数据库的目录，默认使用临时目录并在结束后删除")
+    parser.add_argument('--report', help="把结果写入这个JSON文件")
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    if args.run_stage:
+        run_stage(args.run_stage, args.workdir, sizes[0])
+        return
+
+    stages = [stage for stage in args.stages.split(',') if stage]
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f"未知阶段: {stage}")
+    # 搜索、列表、导出使用 import_txt 阶段生成的数据库
+    if any(stage in ('search', 'list', 'export') for stage in stages) and 'import_txt' not in stages:
+        stages.insert(0, 'import_txt')
+
+    base = args.workdir or tempfile.mkdtemp(prefix='timu_bench_')
+    results = []
+    try:
+        for size in sizes:
+            workdir = os.path.join(base, str(size))
+            os.makedirs(workdir, exist_ok=True)
+            for name in ('bank.txt', 'bank.json'):
+                path = os.path.join(workdir, name)
+                if not os.path.exists(path):
+                    start = time.perf_counter()
+                    generate(path, size)
+                    print(f"生成 {name}（{size} 道题）: {time.perf_counter() - start:.1f} 秒")
+            for name in ('txt.db', 'json.db'):
+                for suffix in ('', '-wal', '-shm'):
+                    if os.path.exists(os.path.join(workdir, name + suffix)):
+                        os.remove(os.path.join(workdir, name + suffix))
+            for stage in stages:
+                result = spawn_stage(stage, workdir, size)
+                results.append(result)
+                print(f"{size} {stage}: {result['seconds']:.2f} 秒, {result['per_sec']:.0f} 条/秒, "
+                      f"峰值内存 {result['peak_rss_mb']:.0f} MB")
+        print_table(results, sizes)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=2)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""多进程压力测试：一个进程批量导入时，其他进程的列表、搜索和统计查询能否照常进行
+
+先在没有写入的情况下测出几个读进程的查询速度，再让一个进程用 BulkWriter 导入一大批题目（一个事务，
+最后统一提交），同时测量读进程的查询速度、最慢一次查询的耗时和 "database is locked" 错误数。
+依次测试 WAL（当前默认）和 DELETE 日志（升级前的默认）两种模式，并检查读进程在导入提交后能看到新题目。
+CPU 核数少于读进程数时，读进程和导入进程争用 CPU，WAL 下的导入耗时会明显变长。
+
+用法：python benchmarks/stress_concurrency.py [已有题目数] [导入题目数] [读进程数]
+"""
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timu_core import open_database
+from timu_db import BulkWriter, now_str, txt_row
+from timu_listview import PAGE_SIZE, AllTimuSource
+from timu_search import search_timu
+from timu_storage import connect_readonly
+
+# 没有写入时每个读进程测量的秒数
+BASELINE_SECONDS = 3
+# 读进程的忙等待时间：超过它仍拿不到锁就记为一次错误
+READER_TIMEOUT = 5
+# 都不少于3个字，走全文索引
+KEYWORDS = ["电子商务", "网络协议", "数据库", "基础知识", "第12题"]
+
+
+def make_timu(i):
+    if i % 10 < 8:
+        option = [f"{letter}.选项内容{letter}{i}" for letter in "ABCD"]
+        answer = "ABCD"[i % 4] if i % 10 < 6 else "AC"
+    else:
+        option = []
+        answer = "答案" * (i % 3 * 6 + 1)
+    return {'title': f"第{i}题：下列关于电子商务安全和网络协议的说法中，正确的是（ ）", 'option': option,
+            'answer': answer, 'analysis': f"本题考察数据库和电子商务安全的基础知识{i}"}
+
+
+def fill(conn, start, count, profile=True):
+    create_time = now_str()
+    with BulkWriter(conn, profile=profile) as writer:
+        for i in range(start, start + count):
+            writer.add(txt_row(make_timu(i), f'bench{i % 20:02d}.txt', create_time))
+
+
+def query(conn, rng):
+    # 交替执行题目管理器最常用的三种查询：打开列表并向后翻几页、全文搜索、读取题目总数
+    kind = rng.randrange(3)
+    if kind == 0:
+        source = AllTimuSource(conn)
+        rows = source.fetch_after(None, PAGE_SIZE)
+        for _ in range(rng.randrange(4)):
+            rows = source.fetch_after(source.key(rows[-1], 0), PAGE_SIZE)
+        return len(rows)
+    if kind == 1:
+        return len(search_timu(conn, rng.choice(KEYWORDS), PAGE_SIZE))
+    return AllTimuSource(conn).count()
+
+
+def reader(path, stop, results, seed):
+    conn = connect_readonly(path, READER_TIMEOUT)
+    rng = random.Random(seed)
+    queries = errors = 0
+    slowest = 0
+    start = time.perf_counter()
+    while not stop.is_set():
+        began = time.perf_counter()
+        try:
+            query(conn, rng)
+            queries += 1
+        except sqlite3.OperationalError:
+            errors += 1
+        slowest = max(slowest, time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    total = AllTimuSource(conn).count()
+    conn.close()
+    results.put((queries, errors, slowest, elapsed, total))
+
+
+def writer(path, start, count, journal_mode, done):
+    conn = open_database(path, journal_mode=journal_mode)
+    began = time.perf_counter()
+    # DELETE 模式下不套用 bulk_load_profile（它会切换到 WAL）
+    fill(conn, start, count, profile=journal_mode == 'WAL')
+    done.put(time.perf_counter() - began)
+    conn.close()
+
+
+def run_readers(path, readers, seconds=None, import_args=None):
+    # 启动读进程；import_args 不为空时同时启动一个导入进程，导入结束后再停止读进程
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    done = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=reader, args=(path, stop, results, i)) for i in range(readers)]
+    for process in processes:
+        process.start()
+    import_seconds = None
+    if import_args is None:
+        time.sleep(seconds)
+    else:
+        time.sleep(0.5)
+        importer = multiprocessing.Process(target=writer, args=(path,) + import_args + (done,))
+        importer.start()
+        import_seconds = done.get()
+        importer.join()
+        time.sleep(0.2)
+    stop.set()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    queries = sum(row[0] for row in rows)
+    elapsed = max(row[3] for row in rows)
+    return {'qps': queries / elapsed, 'errors': sum(row[1] for row in rows),
+            'slowest': max(row[2] for row in rows), 'total': min(row[4] for row in rows), 'import': import_seconds}
+
+
+def main():
+    existing = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    readers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"已有 {existing} 道题，导入 {count} 道题，{readers} 个读进程")
+        for journal_mode in ('WAL', 'DELETE'):
+            path = os.path.join(workdir, f'{journal_mode.lower()}.db')
+            conn = open_database(path, journal_mode=journal_mode)
+            fill(conn, 0, existing, profile=journal_mode == 'WAL')
+            conn.close()
+            idle = run_readers(path, readers, BASELINE_SECONDS)
+            busy = run_readers(path, readers, import_args=(existing, count, journal_mode))
+            print(f"{journal_mode}: 无写入 {idle['qps']:.0f} 次查询/秒，最慢 {idle['slowest'] * 1000:.0f} ms；"
+                  f"导入期间（{busy['import']:.1f} 秒）{busy['qps']:.0f} 次查询/秒（{busy['qps'] / idle['qps']:.0%}），"
+                  f"最慢 {busy['slowest'] * 1000:.0f} ms，锁错误 {busy['errors']} 次；"
+                  f"导入后读到 {busy['total']} 道题{'' if busy['total'] == existing + count else '（不完整！）'}")
+    finally:
+        for filename in os.listdir(workdir):
+            os.remove(os.path.join(workdir, filename))
+        os.rmdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""题库发布构建：扫描 json/ 目录，生成带内容哈希的发布文件和 .gz 压缩文件，并重新生成 js/public.js
+
+用法：python build_banks.py [--root 仓库根目录] [--force]
+
+- json/ 下的每个 .json 文件是一个题库，压缩成紧凑格式后发布；.tmb 二进制题库原样发布；
+  每个包含 manifest.json 的子目录是一个分块导出或增量发布（timu_delta）的题库，
+  清单中引用的分块、完整题库和补丁的文件名也会换成带哈希的文件名
+- 发布文件写到 json/build/，文件名带内容哈希（如 build/2017.3f2a9c1d.json），可以设置永久缓存
+- 每个发布文件旁边生成 gzip 最高压缩级别的 .gz 文件，供支持预压缩文件的服务器直接发送
+- js/public.js 中的 JSONList 按题库重新生成，保留已有的 id、name、describe，补上题目数、大小和哈希
+- 输入文件的哈希记录在 json/build/.build_cache.json，内容没有变化的题库不重新构建
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+
+from timu_binfmt import BankReader
+from timu_delta import DELTA_FORMAT
+from timu_export import MANIFEST_NAME
+
+BUILD_DIR = 'build'
+CACHE_NAME = '.build_cache.json'
+CACHE_VERSION = 1
+# 文件名中保留的哈希长度
+HASH_LENGTH = 8
+# 引用 public.js 的页面，构建后更新 ?version= 参数
+HTML_PAGES = ['index.html', 'timu.html']
+
+ENTRY_RE = re.compile(r'\{(.*?)\}\s*,?\s*$', re.M)
+FIELD_RE = re.compile(r'''(\w+)\s*:\s*(?:"((?:[^"\\]|\\.)*)"|'((?:[^'\\]|\\.)*)'|(-?\d+))''')
+VERSION_RE = re.compile(r'(js/public\.js\?version=)[^"\']*')
+
+
+def file_hash(data):
+    return hashlib.sha1(data).hexdigest()
+
+
+def hashed_name(name, data):
+    # 2017.json -> 2017.<哈希>.json
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{file_hash(data)[:HASH_LENGTH]}{ext}"
+
+
+def js_string(value, quote='"'):
+    value = str(value).replace('\\', '\\\\').replace(quote, '\\' + quote).replace('\n', '\\n')
+    return quote + value + quote
+
+
+def unescape_js(value):
+    return re.sub(r'\\(.)', lambda m: {'n': '\n'}.get(m.group(1), m.group(1)), value)
+
+
+def read_json_list(path):
+    """读取 public.js 中已有的 JSONList，返回字段字典的列表
+
+    只支持本仓库 public.js 的写法：每个题库一行对象字面量，值为字符串或整数。
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    entries = []
+    for match in ENTRY_RE.finditer(text):
+        entry = {}
+        for key, double, single, number in FIELD_RE.findall(match.group(1)):
+            if number:
+                entry[key] = int(number)
+            else:
+                entry[key] = unescape_js(double or single)
+        if 'file' in entry:
+            entries.append(entry)
+    return entries
+
+
+# JSONList 每条记录的字段顺序，字符串字段用哪种引号；没有构建过的记录缺少后面几个字段时省略
+ENTRY_FIELDS = [('id', '"'), ('name', "'"), ('describe', "'"), ('file', '"'), ('source', '"'), ('count', None),
+                ('size', None), ('gzipSize', None), ('hash', '"')]
+
+
+def write_json_list(path, entries):
+    lines = []
+    for entry in entries:
+        fields = [f"{key}: {entry[key] if quote is None else js_string(entry[key], quote)}"
+                  for key, quote in ENTRY_FIELDS if key in entry]
+        lines.append("    { " + ", ".join(fields) + " }")
+    text = "const JSONList = [\n" + ",\n".join(lines) + "\n]"
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return text.encode('utf-8')
+
+
+def add_json_list_entries(path, entries):
+    """把新题库（如组卷生成的试卷）加入 public.js 的 JSONList，返回写入的内容
+
+    来源或 id 相同的已有记录被替换（调用方应先用 json_list_conflicts 确认可以覆盖），其余记录原样保留，新记录追加在末尾。
+    """
+    entries = list(entries)
+    sources = {entry['source'] for entry in entries}
+    ids = {entry['id'] for entry in entries}
+    kept = [entry for entry in read_json_list(path)
+            if entry.get('source', entry['file']) not in sources and entry.get('id') not in ids]
+    return write_json_list(path, kept + entries)
+
+
+def json_list_conflicts(path, sources):
+    # JSONList 中来源（或 id，即去掉扩展名的来源）与 sources 相同的已有记录的 id
+    stems = {os.path.splitext(source)[0] for source in sources}
+    return [entry.get('id', entry['file']) for entry in read_json_list(path)
+            if entry.get('source', entry['file']) in sources or entry.get('id') in stems]
+
+
+def bank_entry(source, data, name=None, describe=''):
+    # 直接放在 json/ 下、还没有经过构建的单文件题库的 JSONList 记录；构建后 file 会换成带哈希的发布文件
+    stem = os.path.splitext(source)[0]
+    return {'id': stem, 'name': name or stem, 'describe': describe, 'file': source, 'source': source,
+            'count': len(json.loads(data)), 'size': len(data), 'gzipSize': len(gzip.compress(data, 9, mtime=0)),
+            'hash': file_hash(data)}
+
+
+def scan_sources(json_dir):
+    # 题库来源：json/ 下的 .json 文件和包含清单的子目录，返回相对 json/ 的路径
+    sources = []
+    for name in sorted(os.listdir(json_dir)):
+        path = os.path.join(json_dir, name)
+        if name == BUILD_DIR or name.startswith('.'):
+            continue
+        if os.path.isdir(path):
+            if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+                sources.append(name)
+        elif name.lower().endswith(('.json', '.tmb')):
+            sources.append(name)
+    return sources
+
+
+def source_files(json_dir, source):
+    path = os.path.join(json_dir, source)
+    if os.path.isdir(path):
+        return [os.path.join(source, name) for name in sorted(os.listdir(path)) if name.endswith('.json')]
+    return [source]
+
+
+def source_stat(json_dir, source):
+    # 用于快速判断：大小和修改时间都没变时不必重新计算哈希
+    return [[rel, os.path.getsize(os.path.join(json_dir, rel)), os.stat(os.path.join(json_dir, rel)).st_mtime_ns]
+            for rel in source_files(json_dir, source)]
+
+
+def source_hash(json_dir, source):
+    digest = hashlib.sha1()
+    for rel in source_files(json_dir, source):
+        digest.update(rel.encode('utf-8') + b'\0')
+        with open(os.path.join(json_dir, rel), 'rb') as f:
+            digest.update(file_hash(f.read()).encode('ascii'))
+    return digest.hexdigest()
+
+
+class BankBuilder:
+    """构建 json/ 下的全部题库
+
+    每个题库构建后得到一条 JSONList 记录和它生成的发布文件列表（相对 json/ 的路径）。
+    """
+
+    def __init__(self, root, force=False, log=print):
+        self.root = root
+        self.json_dir = os.path.join(root, 'json')
+        self.build_dir = os.path.join(self.json_dir, BUILD_DIR)
+        self.cache_path = os.path.join(self.build_dir, CACHE_NAME)
+        self.public_js = os.path.join(root, 'js', 'public.js')
+        self.force = force
+        self.log = log
+        self.built = 0
+        self.reused = 0
+
+    def load_cache(self):
+        if self.force or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except ValueError:
+            return {}
+        if cache.get('version') != CACHE_VERSION:
+            return {}
+        return cache.get('banks', {})
+
+    def save_cache(self, banks):
+        with open(self.cache_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CACHE_VERSION, 'banks': banks}, f, ensure_ascii=False, indent=1)
+
+    def write_output(self, rel_path, data):
+        # 写出发布文件及其 .gz 文件，返回 (原始大小, 压缩后大小)
+        path = os.path.join(self.json_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        # mtime=0 保证内容相同时 .gz 文件也完全相同
+        compressed = gzip.compress(data, 9, mtime=0)
+        with open(path + '.gz', 'wb') as f:
+            f.write(compressed)
+        return len(data), len(compressed)
+
+    def build_file(self, source):
+        # 单文件题库：JSON去掉缩进重新编码，二进制题库原样发布，统计题目数
+        path = os.path.join(self.json_dir, source)
+        if source.lower().endswith('.tmb'):
+            with open(path, 'rb') as f:
+                encoded = f.read()
+            count = len(BankReader(encoded))
+        else:
+            with open(path, 'r', encoding='utf-8-sig') as f:
+                data = json.load(f)
+            encoded = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            count = len(data)
+        rel = os.path.join(BUILD_DIR, hashed_name(source, encoded)).replace(os.sep, '/')
+        size, gzip_size = self.write_output(rel, encoded)
+        return {'file': rel, 'count': count, 'size': size, 'gzipSize': gzip_size,
+                'hash': file_hash(encoded)}, [rel]
+
+    def build_chunked(self, source):
+        # 分块题库：分块和索引文件原样发布，清单改为引用带哈希的文件名；增量发布的题库同样处理完整题库和补丁
+        source_dir = os.path.join(self.json_dir, source)
+        with open(os.path.join(source_dir, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        outputs = []
+        size = gzip_size = 0
+        renamed = {}
+        if manifest.get('format') == DELTA_FORMAT:
+            parts = [manifest['base']] + manifest['patches']
+        else:
+            parts = manifest['chunks']
+        names = [part['file'] for part in parts]
+        if manifest.get('index'):
+            names.append(manifest['index'])
+        for name in names:
+            with open(os.path.join(source_dir, name), 'rb') as f:
+                data = f.read()
+            renamed[name] = hashed_name(name, data)
+            rel = '/'.join([BUILD_DIR, source, renamed[name]])
+            file_size, file_gzip_size = self.write_output(rel, data)
+            size += file_size
+            gzip_size += file_gzip_size
+            outputs.append(rel)
+        for part in parts:
+            part['file'] = renamed[part['file']]
+        if manifest.get('index'):
+            manifest['index'] = renamed[manifest['index']]
+        encoded = json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        rel = '/'.join([BUILD_DIR, source, hashed_name(MANIFEST_NAME, encoded)])
+        file_size, file_gzip_size = self.write_output(rel, encoded)
+        outputs.append(rel)
+        return {'file': rel, 'count': manifest['count'], 'size': size + file_size,
+                'gzipSize': gzip_size + file_gzip_size, 'hash': file_hash(encoded)}, outputs
+
+    def build_source(self, source, cached):
+        # 大小和修改时间没变，或内容哈希没变，并且发布文件都还在时直接沿用上次的结果
+        stat = source_stat(self.json_dir, source)
+        if cached and cached['stat'] == stat:
+            input_hash = cached['input_hash']
+        else:
+            input_hash = source_hash(self.json_dir, source)
+        if cached and cached['input_hash'] == input_hash and all(
+                os.path.exists(os.path.join(self.json_dir, rel)) and os.path.exists(os.path.join(self.json_dir, rel + '.gz'))
+                for rel in cached['outputs']):
+            self.reused += 1
+            return dict(cached, stat=stat)
+
+        if os.path.isdir(os.path.join(self.json_dir, source)):
+            result, outputs = self.build_chunked(source)
+        else:
+            result, outputs = self.build_file(source)
+        self.built += 1
+        self.log(f"已构建: {source} -> {result['file']}（{result['count']} 道题目）")
+        return {'stat': stat, 'input_hash': input_hash, 'result': result, 'outputs': outputs}
+
+    def remove_stale(self, outputs):
+        # 删除不再被引用的旧版本发布文件
+        keep = set()
+        for rel in outputs:
+            keep.add(os.path.normpath(os.path.join(self.json_dir, rel)))
+            keep.add(os.path.normpath(os.path.join(self.json_dir, rel + '.gz')))
+        keep.add(os.path.normpath(self.cache_path))
+        removed = 0
+        for dirpath, dirnames, filenames in os.walk(self.build_dir, topdown=False):
+            for name in filenames:
+                path = os.path.normpath(os.path.join(dirpath, name))
+                if path not in keep:
+                    os.remove(path)
+                    removed += 1
+            if dirpath != self.build_dir and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+        return removed
+
+    def merge_entries(self, banks):
+        # 按 public.js 中原有的顺序输出，保留人工填写的 id、name、describe；新题库追加在末尾
+        existing = read_json_list(self.public_js)
+        entries = []
+        seen = set()
+        for entry in existing:
+            source = entry.get('source', entry['file'])
+            if source in banks and source not in seen:
+                seen.add(source)
+                entries.append(dict(entry, source=source))
+        for source in banks:
+            if source not in seen:
+                stem = os.path.splitext(source)[0]
+                entries.append({'id': stem, 'name': stem, 'describe': '', 'source': source})
+        for entry in entries:
+            entry.update(banks[entry['source']]['result'])
+        return entries
+
+    def update_pages(self, public_js_data):
+        # 页面引用 public.js 时带上它的哈希，public.js 变化后浏览器不会继续用旧缓存
+        version = file_hash(public_js_data)[:HASH_LENGTH]
+        for page in HTML_PAGES:
+            path = os.path.join(self.root, page)
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+            updated = VERSION_RE.sub(lambda m: m.group(1) + version, text)
+            if updated != text:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(updated)
+
+    def build(self):
+        os.makedirs(self.build_dir, exist_ok=True)
+        cache = self.load_cache()
+        banks = {}
+        for source in scan_sources(self.json_dir):
+            banks[source] = self.build_source(source, cache.get(source))
+        entries = self.merge_entries(banks)
+        public_js_data = write_json_list(self.public_js, entries)
+        self.update_pages(public_js_data)
+        removed = self.remove_stale([rel for bank in banks.values() for rel in bank['outputs']])
+        self.save_cache(banks)
+        self.log(f"构建完成：共 {len(banks)} 个题库，重新构建 {self.built} 个，未变化 {self.reused} 个，清理旧文件 {removed} 个")
+        return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建题库发布文件并重新生成 js/public.js")
+    parser.add_argument('--root', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help="仓库根目录（包含 json/、js/ 的目录）")
+    parser.add_argument('--force', action='store_true', help="忽略缓存，全部重新构建")
+    args = parser.parse_args()
+    BankBuilder(args.root, force=args.force).build()
+
+
+if __name__ == "__main__":
+    main()
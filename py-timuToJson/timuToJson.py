@@ -1,55 +1,57 @@
-import tkinter as tk
-from tkinter import filedialog
-import re,time,random,json
-
-root = tk.Tk()
-root.withdraw()
-
-# 获取选择好的文件  读取文件
-filePath = filedialog.askopenfilename(filetypes=[('txt', '*.txt')])
-f = open(filePath, 'r', encoding='UTF-8')
-data = f.read()
-data=data.replace('．','.')
-f.close()
-# 不同题目分割
-pattern = re.compile(r'(?:^|\n\s*)\d+?[\.\。]')
-data = pattern.split(data)
-# 将每个题目分为题目、选项、答案
-result = []
-for i in data:
-    pattern = re.compile(r'\n')
-    # 题目
-    title = pattern.split(i)[0]
-    # 选项
-    option = re.findall(r'[A-E][\.\。]?(.+?)\s+[\n]?', i)
-    # 答案
-    daan = re.findall(r'答案[:：]([A-E]+)[\n]?', i)
-    analysis = ''
-    if len(daan) == 0:
-        daan = re.findall(r'答案[:：]([\s\S]+)', i)
-        if len(daan):
-            pattern = re.compile(r'解析[:：]')
-            daanList=pattern.split(daan[0])
-            if len(daanList)>1:
-                analysis=daanList[1]
-                daan=[daanList[0]]
-    else:
-        # 选择题获取解析
-        jiexi = re.findall(r'解析[:：]([\s\S]+)', i)
-        analysis = jiexi[0] if len(jiexi) else ''
-    daan = daan[0] if len(daan) else ''
+import os
+import sys
+import time,random,json
+
+from timu_metrics import Metrics
+from timu_parser import parse_timu_file
+
 
-# 格式化成2016-03-20 11:45:39形式
-    result.append({
+def txt_to_json(filePath, metrics=None):
+    # 逐行解析题目，写出到当前目录下以时间命名的JSON文件，返回文件名；metrics 记录解析、生成ID和写出的耗时
+    metrics = metrics or Metrics('转换')
+    timus = metrics.iterate(parse_timu_file(filePath), '解析', 'questions')
+    # 格式化成2016-03-20 11:45:39形式
+    result = list(metrics.iterate(({
         'id': time.strftime("%Y%m%d%H%M", time.localtime())+str(random.randint(0,1000000)),
-        'title': title,
-        'option': option,
-        'answer': daan,
-        'analysis': analysis
-    })
-
-del(result[0])
-f = open(time.strftime("%Y%m%d%H%M%S", time.localtime())+'.json', 'w',encoding = 'utf-8')
-f.write(json.dumps(result,ensure_ascii=False,indent = 4))
-f.close()
-print("执行完成")
\ No newline at end of file
+        'title': timu['title'],
+        'option': timu['option'],
+        'answer': timu['answer'],
+        'analysis': timu['analysis']
+    } for timu in timus), '生成ID'))
+    metrics.add('bytes_read', os.path.getsize(filePath))
+
+    outPath = time.strftime("%Y%m%d%H%M%S", time.localtime())+'.json'
+    with metrics.stage('写出JSON'):
+        f = open(outPath, 'w',encoding = 'utf-8')
+        f.write(json.dumps(result,ensure_ascii=False,indent = 4))
+        f.close()
+    metrics.add('rows', len(result))
+    return outPath
+
+
+def main():
+    # 命令行传入文件路径时不需要图形界面，否则弹出文件选择框
+    if len(sys.argv) > 1:
+        filePath = sys.argv[1]
+    else:
+        import tkinter as tk
+        from tkinter import filedialog
+        root = tk.Tk()
+        root.withdraw()
+        # 获取选择好的文件
+        filePath = filedialog.askopenfilename(filetypes=[('TXT或Word文档', '*.txt *.docx')])
+        if not filePath:
+            return
+    # 性能报告的目录和是否开启 cProfile/tracemalloc 见 timu_metrics 中的环境变量
+    metrics = Metrics('转换')
+    with metrics.profiling():
+        txt_to_json(filePath, metrics)
+    metrics.status = '已完成'
+    report_path = metrics.save()
+    print("执行完成，" + metrics.summary())
+    if report_path:
+        print("性能报告: " + report_path)
+
+
+if __name__ == "__main__":
+    main()
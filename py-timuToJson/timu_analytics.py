@@ -0,0 +1,549 @@
+"""答题统计：从答题记录中批量计算每道题的难度指标，写回数据库供题目管理标签页排序
+
+输入可以是：
+- timu_progress.py 保存的答题日志（<题库ID>.log），每个答题事件包括用户、题目ID、是否答对和选择的选项
+- 从浏览器导出的错题记录（.json）：题目ID列表、{"wrong_<题库ID>": [题目ID...]} 形式的 localStorage 内容，
+  或多个学生的记录组成的列表。错题记录只有错题没有答题次数，只计入"错题集人数"
+
+日志按块读入，每块在字节数组上用 numpy 定位换行和逗号，直接切出用户、题目ID、是否答对和选项，
+用户和题目ID按64位散列编码成整数，之后的统计都是整块的数组运算，不对每个事件执行 Python 代码：
+- 错误率：每道题的答题次数和答错次数
+- 选项选择次数：选择的选项压成5位掩码，按选项分别计数，同时统计答错时的选择次数，找出最吸引错答的干扰项
+- 区分度：每个学生（题库+用户）按每道题的首次作答计算得分率，取得分率最高和最低各 27% 的学生（与分界线同分的学生归入该组），
+  区分度 = 高分组答对率 - 低分组答对率，两组答过该题的人数都不少于 MIN_GROUP 才计算
+- 按来源汇总：题目数、有答题记录的题目数、答题次数、错误率、平均区分度和错误率最高的题目
+
+结果写入 timu_stats、timu_option_stats、timu_source_stats 三张表，每次全部重新计算。
+压缩过的答题日志中，快照之前的事件只剩每道题的答题和答错次数，只计入错误率。
+
+依赖 numpy；没有安装时 analytics_available() 返回 False。
+"""
+import collections
+import importlib.util
+import json
+import os
+import re
+
+# 只检查 numpy 是否安装，不导入，见 _np()
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+from timu_db import now_str
+
+# 每次读入的日志字节数
+READ_BLOCK = 64 * 1024 * 1024
+# 高分组、低分组各占的比例
+GROUP_FRACTION = 0.27
+# 学生至少答过这么多道题才参与分组；每组至少这么多人答过才计算区分度
+MIN_USER_ANSWERS = 5
+MIN_GROUP = 5
+# 来源中错误率最高的题目至少要有这么多次作答
+HARDEST_MIN_ATTEMPTS = 10
+# 选项字母，与 timu.html 的 zidian 一致
+LETTERS = 'ABCDE'
+# 题目管理标签页可以排序的列
+SORT_COLUMNS = ('error_rate', 'discrimination', 'attempts')
+
+STATS_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS timu_stats (
+        id TEXT PRIMARY KEY,
+        attempts INTEGER,
+        wrong INTEGER,
+        users INTEGER,
+        error_rate REAL,
+        discrimination REAL,
+        marked INTEGER,
+        distractor TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS timu_option_stats (
+        id TEXT,
+        option TEXT,
+        picks INTEGER,
+        wrong_picks INTEGER,
+        PRIMARY KEY (id, option)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS timu_source_stats (
+        source TEXT PRIMARY KEY,
+        questions INTEGER,
+        answered INTEGER,
+        attempts INTEGER,
+        wrong INTEGER,
+        error_rate REAL,
+        discrimination REAL,
+        hardest_id TEXT,
+        update_time TEXT
+    )
+    ''',
+] + [f"CREATE INDEX IF NOT EXISTS idx_timu_stats_{column} ON timu_stats({column}, id)" for column in SORT_COLUMNS]
+
+COMMA = ord(',')
+NEWLINE = ord('\n')
+# 每块末尾补8个字节，按8字节读取时不会越界
+PADDING = bytes(8)
+# 字符串散列的乘数（FNV 素数），以及按剩余字节数截取低位字节的掩码
+HASH_MULT = 1099511628211
+WORD_MASKS = [(1 << (8 * n)) - 1 for n in range(9)]
+SNAPSHOT_PREFIX = b'{"c":'
+ANSWER_LETTERS_RE = re.compile(r'^[A-E]{1,5}$')
+
+
+def analytics_available():
+    return NUMPY_AVAILABLE
+
+
+def _np():
+    # numpy 在第一次计算时才导入（加载要0.1秒左右），打开数据库、搜索、统计等用不到它的命令不必等待
+    import numpy
+    return numpy
+
+
+def ensure_stats(conn):
+    for sql in STATS_SCHEMA:
+        conn.execute(sql)
+    conn.commit()
+
+
+class Factorizer:
+    """把分块出现的字符串编码成整数
+
+    每块传入字符串的64位散列，块内先去重，finish 时合并各块的去重结果，得到全部块统一的编码；
+    names 为真时记录每个散列第一次出现时的原字符串，只对新出现的散列切片，次数与不同字符串的个数相同。
+    """
+
+    def __init__(self, names=False):
+        self.parts = []
+        self.names = {} if names else None
+
+    def add(self, hashes, name_of=None):
+        np = _np()
+        uniq, inverse = np.unique(hashes, return_inverse=True)
+        self.parts.append((uniq, inverse))
+        if self.names is not None:
+            names = self.names
+            for h, i in zip(uniq.tolist(), first_occurrence(inverse, len(uniq)).tolist()):
+                if h not in names:
+                    names[h] = name_of(i)
+
+    def finish(self):
+        """返回 (编码数, 每个事件的编码, 按编码排列的原字符串列表)"""
+        np = _np()
+        if not self.parts:
+            return 0, np.array([], dtype=np.int64), []
+        labels = np.unique(np.concatenate([uniq for uniq, _ in self.parts]))
+        codes = np.concatenate([np.searchsorted(labels, uniq)[inverse] for uniq, inverse in self.parts])
+        names = [self.names[h] for h in labels.tolist()] if self.names is not None else []
+        return len(labels), codes, names
+
+
+def first_occurrence(inverse, count):
+    # np.unique 的 return_index 需要稳定排序，用 inverse 取每个值第一次出现的位置更快
+    np = _np()
+    first = np.full(count, len(inverse), dtype=np.int64)
+    np.minimum.at(first, inverse, np.arange(len(inverse)))
+    return first
+
+
+def choice_masks(choices):
+    # b"AC" -> 0b00101，没有记录选项的为 0
+    np = _np()
+    letters = np.array(choices, dtype='S5').view(np.uint8).reshape(-1, 5).astype(np.int32)
+    bits = np.where(letters >= ord('A'), np.left_shift(1, np.maximum(letters - ord('A'), 0)), 0)
+    return bits.sum(axis=1).astype(np.uint8)
+
+
+def slice_hashes(words, starts, ends):
+    """每个字符串 block[start:end] 的64位散列
+
+    words[i] 是从第 i 个字节开始的8个字节（小端），每次取8个字节，循环次数只和最长的字符串有关。
+    不超过8字节的字符串散列是一一对应的，更长的字符串冲突的概率可以忽略。
+    """
+    np = _np()
+    lengths = ends - starts
+    word_masks = np.array(WORD_MASKS, dtype=np.uint64)
+    hashes = np.zeros(len(starts), dtype=np.uint64)
+    last = len(words) - 1
+    for offset in range(0, int(lengths.max()) if len(lengths) else 0, 8):
+        remaining = np.clip(lengths - offset, 0, 8)
+        word = words[np.minimum(starts + offset, last)] & word_masks[remaining]
+        hashes = np.where(remaining > 0, hashes * np.uint64(HASH_MULT) + word, hashes)
+    return hashes * np.uint64(HASH_MULT) + lengths.astype(np.uint64)
+
+
+def parse_answers(block):
+    """从一块日志中取出全部答题事件，返回 (字节数组, 用户区间, 题目ID区间, 是否答对, 选项掩码)
+
+    答题事件由 timu_progress 按固定的键顺序写入：{"t":时间,"u":"用户","q":"题目ID","r":结果[,"a":"选项"]}，
+    用户和题目ID中没有逗号和引号，所以每个字段的位置都可以从行内逗号的位置算出：
+    第1个逗号后是 "u":"用户"，第2个后是 "q":"题目ID"，第3个后是 "r":结果，有第4个逗号时后面是 "a":"选项"}。
+    其他事件（删除错题、进度）和快照在这些位置上的键不同，会被排除。
+    """
+    np = _np()
+    size = len(block)
+    buf = np.frombuffer(block + PADDING, dtype=np.uint8)
+    words = np.ndarray((size + 1,), dtype='<u8', buffer=buf, strides=(1,))
+    ends = np.flatnonzero(buf[:size] == NEWLINE)
+    if size and block[-1] != NEWLINE:
+        ends = np.append(ends, size)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    commas = np.flatnonzero(buf[:size] == COMMA)
+    first = np.searchsorted(commas, starts)
+    count = np.searchsorted(commas, ends) - first
+    keep = (count == 3) | (count == 4)
+    starts, ends, first, count = starts[keep], ends[keep], first[keep], count[keep]
+    c0, c1, c2 = commas[first], commas[first + 1], commas[first + 2]
+    keep = ((buf[starts + 2] == ord('t')) & (buf[c0 + 2] == ord('u')) & (buf[c1 + 2] == ord('q'))
+            & (buf[c2 + 2] == ord('r')))
+    ends, first, count, c0, c1, c2 = ends[keep], first[keep], count[keep], c0[keep], c1[keep], c2[keep]
+    correct = buf[c2 + 5] == ord('1')
+
+    # 选项字母在第4个逗号后6个字节开始，到行尾的 "} 之前
+    c3 = commas[np.minimum(first + 3, len(commas) - 1)]
+    has_choice = (count == 4) & (buf[c3 + 2] == ord('a'))
+    choice_length = np.where(has_choice, np.clip(ends - 2 - (c3 + 6), 0, len(LETTERS)), 0)
+    letters = words[np.minimum(c3 + 6, size)]
+    masks = np.zeros(len(ends), dtype=np.uint8)
+    for k in range(len(LETTERS)):
+        letter = ((letters >> np.uint64(8 * k)) & np.uint64(0xFF)).astype(np.int32) - ord('A')
+        valid = (choice_length > k) & (letter >= 0) & (letter < len(LETTERS))
+        masks |= np.where(valid, np.left_shift(1, np.maximum(letter, 0)), 0).astype(np.uint8)
+    return words, (c0 + 6, c1 - 1), (c1 + 6, c2 - 1), correct, masks
+
+
+def snapshot_lines(block):
+    # 压缩日志中的每题统计快照，独占一行，以 {"c": 开头
+    position = 0 if block.startswith(SNAPSHOT_PREFIX) else block.find(b'\n' + SNAPSHOT_PREFIX)
+    while position >= 0:
+        if block[position] == NEWLINE:
+            position += 1
+        end = block.find(b'\n', position)
+        yield block[position:end if end >= 0 else len(block)]
+        position = block.find(b'\n' + SNAPSHOT_PREFIX, position)
+
+
+def iter_blocks(path, block_size=READ_BLOCK):
+    # 按块读取文件，每块都在换行处结束
+    with open(path, 'rb') as f:
+        rest = b''
+        while True:
+            data = f.read(block_size)
+            if not data:
+                break
+            data = rest + data
+            end = data.rfind(b'\n') + 1
+            rest = data[end:]
+            if end:
+                yield data[:end], f.tell()
+        if rest:
+            yield rest, f.tell()
+
+
+class AnswerEvents:
+    """从多个答题日志中收集的答题事件，按列保存为 numpy 数组"""
+
+    def __init__(self):
+        self.questions = Factorizer(names=True)
+        self.user_codes = []
+        self.correct = []
+        self.masks = []
+        self.users = 0
+        # 题目ID -> [答题次数, 答错次数, 错题集人数]，来自日志快照和错题记录，不是逐个事件
+        self.extra = collections.defaultdict(lambda: [0, 0, 0])
+        self.count = 0
+
+    def add_log(self, path, on_block=None):
+        # 一个日志文件是一个题库，用户编码在文件内唯一，再加上之前文件的用户数作为偏移
+        users = Factorizer()
+        for block, position in iter_blocks(path):
+            words, (user_start, user_end), (qid_start, qid_end), correct, masks = parse_answers(block)
+            if len(correct):
+                users.add(slice_hashes(words, user_start, user_end))
+                self.questions.add(slice_hashes(words, qid_start, qid_end),
+                                   lambda i: block[qid_start[i]:qid_end[i]])
+                self.correct.append(correct)
+                self.masks.append(masks)
+                self.count += len(correct)
+            for line in snapshot_lines(block):
+                for qid, (attempts, wrong) in json.loads(line)['c'].items():
+                    counts = self.extra[qid.encode('utf-8')]
+                    counts[0] += attempts
+                    counts[1] += wrong
+            if on_block is not None:
+                on_block(position)
+        count, codes, _ = users.finish()
+        self.user_codes.append(codes + self.users)
+        self.users += count
+
+    def add_wrong_export(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for wrong in iter_wrong_lists(data):
+            for qid in set(map(str, wrong)):
+                self.extra[qid.encode('utf-8')][2] += 1
+
+    def arrays(self):
+        """返回 (题目ID数组, 每个事件的题目编码, 学生编码, 是否答对, 选项掩码, 额外计数)
+
+        题目ID数组包括日志快照和错题记录中出现的题目，额外计数是与之对应的 N×3 数组。
+        """
+        np = _np()
+        _, qcodes, names = self.questions.finish()
+        # 题目ID按字节排序，便于与错题记录、题库中的ID对应
+        labels = np.array(names) if names else np.array([], dtype='S1')
+        order = np.argsort(labels, kind='stable')
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        labels = labels[order]
+        qcodes = rank[qcodes]
+        if self.extra:
+            extra_ids = np.array(list(self.extra))
+            all_labels = np.union1d(labels, extra_ids)
+            qcodes = np.searchsorted(all_labels, labels)[qcodes]
+            labels = all_labels
+        extra = np.zeros((len(labels), 3), dtype=np.int64)
+        if self.extra:
+            extra[np.searchsorted(labels, extra_ids)] = np.array(list(self.extra.values()), dtype=np.int64)
+        if self.count:
+            ucodes = np.concatenate(self.user_codes)
+            correct = np.concatenate(self.correct)
+            masks = np.concatenate(self.masks)
+        else:
+            ucodes = np.array([], dtype=np.int64)
+            correct = np.array([], dtype=bool)
+            masks = np.array([], dtype=np.uint8)
+        return labels, qcodes.astype(np.int64), ucodes.astype(np.int64), correct, masks, extra
+
+
+def iter_wrong_lists(data):
+    # 错题记录的几种形式：题目ID列表；localStorage 内容（wrong_ 开头的键，值可能是JSON字符串）；多个学生的列表
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if not key.startswith('wrong_'):
+                continue
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    continue
+            if isinstance(value, list):
+                yield value
+    elif isinstance(data, list):
+        if all(isinstance(item, (dict, list)) for item in data) and data:
+            for item in data:
+                yield from iter_wrong_lists(item)
+        else:
+            yield data
+
+
+def question_metrics(nq, nu, qcodes, ucodes, correct, masks):
+    """每道题的答题次数、答错次数、答题人数、区分度，以及每个选项的选择次数和答错时的选择次数"""
+    np = _np()
+    attempts = np.bincount(qcodes, minlength=nq)
+    wrong = np.bincount(qcodes[~correct], minlength=nq)
+
+    # 同一学生同一题只取第一次作答，日志按时间顺序写入，第一次出现的就是首次作答
+    pairs, inverse = np.unique(ucodes * nq + qcodes, return_inverse=True)
+    first = first_occurrence(inverse, len(pairs))
+    fq, fu, fc = qcodes[first], ucodes[first], correct[first]
+    users = np.bincount(fq, minlength=nq)
+
+    # 按得分率取两端各 GROUP_FRACTION 的学生作为高分组、低分组，与分界线得分率相同的学生都归入该组
+    answered = np.bincount(fu, minlength=nu)
+    scored = np.bincount(fu[fc], minlength=nu)
+    ranked = np.flatnonzero(answered >= MIN_USER_ANSWERS)
+    score = scored[ranked] / np.maximum(answered[ranked], 1)
+    size = int(len(ranked) * GROUP_FRACTION)
+    group = np.zeros(nu, dtype=np.int8)
+    if size:
+        sorted_score = np.sort(score)
+        low, high = sorted_score[size - 1], sorted_score[-size]
+        if low < high:
+            group[ranked[score <= low]] = -1
+            group[ranked[score >= high]] = 1
+    event_group = group[fu]
+    upper = event_group == 1
+    lower = event_group == -1
+    upper_n = np.bincount(fq[upper], minlength=nq)
+    lower_n = np.bincount(fq[lower], minlength=nq)
+    upper_c = np.bincount(fq[upper & fc], minlength=nq)
+    lower_c = np.bincount(fq[lower & fc], minlength=nq)
+    valid = (upper_n >= MIN_GROUP) & (lower_n >= MIN_GROUP)
+    discrimination = np.full(nq, np.nan)
+    discrimination[valid] = upper_c[valid] / upper_n[valid] - lower_c[valid] / lower_n[valid]
+
+    picks = np.zeros((nq, len(LETTERS)), dtype=np.int64)
+    wrong_picks = np.zeros((nq, len(LETTERS)), dtype=np.int64)
+    for k in range(len(LETTERS)):
+        chosen = (masks >> k) & 1 == 1
+        picks[:, k] = np.bincount(qcodes[chosen], minlength=nq)
+        wrong_picks[:, k] = np.bincount(qcodes[chosen & ~correct], minlength=nq)
+    return attempts, wrong, users, discrimination, picks, wrong_picks
+
+
+def answer_masks(answers):
+    # 选择题答案的选项掩码，其他题型为 0
+    return choice_masks([answer.encode('ascii') if answer and ANSWER_LETTERS_RE.match(answer) else b''
+                         for answer in answers])
+
+
+def load_questions(conn):
+    # 题库中全部题目的 (ID数组, 来源, 答案)，ID 按字节排序，便于和日志中的题目ID对应
+    np = _np()
+    rows = conn.execute("SELECT id, source, answer FROM timu").fetchall()
+    ids = np.array([row[0].encode('utf-8') for row in rows]) if rows else np.array([], dtype='S1')
+    order = np.argsort(ids, kind='stable')
+    return ids[order], [rows[i][1] or '' for i in order], [rows[i][2] or '' for i in order]
+
+
+def compute_stats(conn, events):
+    """计算全部指标，返回 (题目统计行, 选项统计行, 来源汇总行, 未在题库中找到的题目数)"""
+    np = _np()
+    labels, qcodes, ucodes, correct, masks, extra = events.arrays()
+    nq = len(labels)
+    attempts, wrong, users, discrimination, picks, wrong_picks = question_metrics(
+        nq, events.users, qcodes, ucodes, correct, masks)
+    attempts = attempts + extra[:, 0]
+    wrong = wrong + extra[:, 1]
+    marked = extra[:, 2]
+
+    # 日志中的题目对应到题库中的题目，不在题库中的题目不保存
+    db_ids, db_sources, db_answers = load_questions(conn)
+    if not len(db_ids):
+        return [], [], [], nq
+    position = np.searchsorted(db_ids, labels)
+    position[position >= len(db_ids)] = 0
+    matched = db_ids[position] == labels
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        error_rate = np.where(attempts > 0, wrong / np.maximum(attempts, 1), np.nan)
+
+    # 最吸引错答的干扰项：不在正确答案中、答错时被选得最多的选项
+    answer_bits = answer_masks(db_answers)[position]
+    not_answer = ((answer_bits[:, None] >> np.arange(len(LETTERS))) & 1) == 0
+    distractor_picks = np.where(not_answer, wrong_picks, -1)
+    best = distractor_picks.argmax(axis=1)
+    has_distractor = distractor_picks[np.arange(nq), best] > 0
+
+    rows = []
+    index = np.flatnonzero(matched)
+    ids = [label.decode('utf-8') for label in labels[index]]
+    for timu_id, a, w, u, e, d, m, has, k in zip(
+            ids, attempts[index].tolist(), wrong[index].tolist(), users[index].tolist(), error_rate[index].tolist(),
+            discrimination[index].tolist(), marked[index].tolist(), has_distractor[index].tolist(),
+            best[index].tolist()):
+        rows.append((timu_id, a, w, u, None if e != e else round(e, 4), None if d != d else round(d, 4), m,
+                     LETTERS[k] if has else None))
+
+    option_rows = []
+    picked_q, picked_k = np.nonzero(picks[index] > 0)
+    for i, k, p, w in zip(picked_q.tolist(), picked_k.tolist(), picks[index][picked_q, picked_k].tolist(),
+                          wrong_picks[index][picked_q, picked_k].tolist()):
+        option_rows.append((ids[i], LETTERS[k], p, w))
+
+    source_rows = source_summary(db_sources, position[index], attempts[index], wrong[index],
+                                 error_rate[index], discrimination[index], ids)
+    return rows, option_rows, source_rows, int(nq - len(index))
+
+
+def source_summary(db_sources, db_position, attempts, wrong, error_rate, discrimination, ids):
+    # 按来源汇总，每个数组的下标与 ids 对应
+    np = _np()
+    names, source_codes = np.unique(np.array(db_sources, dtype=str), return_inverse=True)
+    ns = len(names)
+    questions = np.bincount(source_codes, minlength=ns)
+    src = source_codes[db_position]
+    answered = np.bincount(src[attempts > 0], minlength=ns)
+    total_attempts = np.bincount(src, weights=attempts, minlength=ns).astype(np.int64)
+    total_wrong = np.bincount(src, weights=wrong, minlength=ns).astype(np.int64)
+    has_disc = ~np.isnan(discrimination)
+    disc_sum = np.bincount(src[has_disc], weights=discrimination[has_disc], minlength=ns)
+    disc_n = np.bincount(src[has_disc], minlength=ns)
+
+    # 每个来源中作答次数足够、错误率最高的题目
+    hardest = [None] * ns
+    candidates = np.flatnonzero(attempts >= HARDEST_MIN_ATTEMPTS)
+    if len(candidates):
+        order = candidates[np.lexsort((-error_rate[candidates], src[candidates]))]
+        sources, first = np.unique(src[order], return_index=True)
+        for s, i in zip(sources.tolist(), order[first].tolist()):
+            hardest[s] = ids[i]
+
+    update_time = now_str()
+    rows = []
+    for s in range(ns):
+        a, w = int(total_attempts[s]), int(total_wrong[s])
+        rows.append((str(names[s]), int(questions[s]), int(answered[s]), a, w,
+                     round(w / a, 4) if a else None,
+                     round(float(disc_sum[s] / disc_n[s]), 4) if disc_n[s] else None,
+                     hardest[s], update_time))
+    return rows
+
+
+def write_stats(conn, rows, option_rows, source_rows):
+    # 每次全部重新计算，旧的统计整体替换
+    ensure_stats(conn)
+    conn.execute("DELETE FROM timu_stats")
+    conn.execute("DELETE FROM timu_option_stats")
+    conn.execute("DELETE FROM timu_source_stats")
+    conn.executemany("INSERT INTO timu_stats (id, attempts, wrong, users, error_rate, discrimination, marked, distractor) "
+                     "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    conn.executemany("INSERT INTO timu_option_stats (id, option, picks, wrong_picks) VALUES (?, ?, ?, ?)", option_rows)
+    conn.executemany("INSERT INTO timu_source_stats (source, questions, answered, attempts, wrong, error_rate, "
+                     "discrimination, hardest_id, update_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", source_rows)
+    conn.commit()
+
+
+def input_files(paths):
+    # 展开目录：.log 为答题日志，.json 为错题记录
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(('.log', '.json')):
+                    files.append(os.path.join(path, name))
+        else:
+            files.append(path)
+    return files
+
+
+def analyze(conn, paths, on_progress=None, check_cancel=None):
+    """读取答题日志和错题记录，计算统计并写入数据库，返回汇总字典
+
+    on_progress(已读字节数, 总字节数) 汇报读取进度。
+    """
+    files = input_files(paths)
+    total = sum(os.path.getsize(path) for path in files)
+    events = AnswerEvents()
+    done = 0
+    for path in files:
+        if path.endswith('.json'):
+            events.add_wrong_export(path)
+        elif on_progress is not None:
+            events.add_log(path, on_block=lambda position, base=done: on_progress(base + position, total))
+        else:
+            events.add_log(path)
+        done += os.path.getsize(path)
+        if on_progress is not None:
+            on_progress(done, total)
+        if check_cancel is not None:
+            check_cancel()
+    rows, option_rows, source_rows, unmatched = compute_stats(conn, events)
+    write_stats(conn, rows, option_rows, source_rows)
+    return {
+        'files': len(files),
+        'events': events.count,
+        'users': events.users,
+        'questions': len(rows),
+        'sources': len(source_rows),
+        'unmatched': unmatched,
+    }
+
+
+def source_stats(conn):
+    # 按来源汇总的统计，用于统计窗口和命令行
+    ensure_stats(conn)
+    return conn.execute("SELECT source, questions, answered, attempts, wrong, error_rate, discrimination, hardest_id "
+                        "FROM timu_source_stats ORDER BY source").fetchall()
@@ -0,0 +1,268 @@
+"""紧凑的二进制列式题库格式（.tmb）
+
+文件结构（全部为小端序）：
+    文件头    4字节魔数 b'TMB1'，随后 u32 版本、题目数、ID类型、字符串数、选项数，
+              以及 8 个 u32 分段偏移（ids、titles、analyses、answers、option_offsets、options、
+              string_offsets、string_data）
+    ids             ID类型为数字或16位十六进制时是 u64[题目数]，否则是 u32[题目数] 字符串序号
+    titles          u32[题目数]         题干的字符串序号
+    analyses        u32[题目数]         解析的字符串序号
+    answers         u32[题目数]         最高位为1时低位是答案位图（A=第0位），否则是答案的字符串序号
+    option_offsets  u32[题目数+1]       第 i 题的选项是 options[option_offsets[i]:option_offsets[i+1]]
+    options         u32[选项数]         选项的字符串序号
+    string_offsets  u32[字符串数+1]     第 i 个字符串是 string_data[string_offsets[i]:string_offsets[i+1]]
+    string_data     UTF-8 字节
+字符串序号 0xFFFFFFFF 表示 null。相同的字符串只保存一份。
+所有分段按8字节对齐，读取时可以直接在文件内容上按序号随机访问，不需要先解析整个文件。
+"""
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from timu_export import iter_export_batches, timed_batches
+
+MAGIC = b'TMB1'
+VERSION = 1
+
+# ID 的保存方式
+ID_DECIMAL = 0   # 不以0开头的十进制数字，保存为 u64
+ID_HEX = 1       # 16位小写十六进制（按内容生成的ID），保存为 u64
+ID_STRING = 2    # 其他情况，保存为字符串序号
+
+NULL_INDEX = 0xFFFFFFFF
+ANSWER_MASK_FLAG = 0x80000000
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+HEADER = struct.Struct('<4s5I8I')
+SECTIONS = ['ids', 'titles', 'analyses', 'answers', 'option_offsets', 'options', 'string_offsets', 'string_data']
+
+U64_MAX = (1 << 64) - 1
+
+
+def id_kind(ids):
+    # 全部ID都能无损转成 u64 时用整数保存
+    if all(timu_id.isdigit() and timu_id.isascii() and (timu_id == '0' or timu_id[0] != '0') and int(timu_id) <= U64_MAX
+           for timu_id in ids):
+        return ID_DECIMAL
+    if all(len(timu_id) == 16 and all(c in '0123456789abcdef' for c in timu_id) for timu_id in ids):
+        return ID_HEX
+    return ID_STRING
+
+
+def answer_mask(answer):
+    # 答案是按顺序排列、不重复的大写字母（如 "ABD"）时编码为位图，解码后得到完全相同的字符串
+    if not answer or len(answer) > len(LETTERS) or answer != "".join(sorted(set(answer))):
+        return None
+    mask = 0
+    for letter in answer:
+        index = LETTERS.find(letter)
+        if index < 0:
+            return None
+        mask |= 1 << index
+    return mask
+
+
+def mask_answer(mask):
+    return "".join(letter for i, letter in enumerate(LETTERS) if mask & (1 << i))
+
+
+class StringTable:
+    def __init__(self):
+        self.index = {}
+        self.offsets = array('I', [0])
+        self.data = bytearray()
+
+    def add(self, value):
+        if value is None:
+            return NULL_INDEX
+        value = str(value)
+        i = self.index.get(value)
+        if i is None:
+            i = len(self.offsets) - 1
+            self.index[value] = i
+            self.data += value.encode('utf-8')
+            self.offsets.append(len(self.data))
+        return i
+
+
+def little_endian(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def decode_options(option):
+    try:
+        options = json.loads(option) if option else []
+    except ValueError:
+        options = []
+    return options if isinstance(options, list) else []
+
+
+def encode_bank(rows):
+    """把 (id, title, option, answer, analysis) 行编码成 .tmb 内容，option 为库中保存的JSON文本
+
+    需要先收集全部行才能确定ID的保存方式和字符串表，适合单个题库的大小。
+    """
+    rows = list(rows)
+    strings = StringTable()
+    ids = [str(row[0]) for row in rows]
+    kind = id_kind(ids)
+    if kind == ID_STRING:
+        id_column = little_endian(array('I', [strings.add(timu_id) for timu_id in ids]))
+    else:
+        base = 10 if kind == ID_DECIMAL else 16
+        id_column = little_endian(array('Q', [int(timu_id, base) for timu_id in ids]))
+
+    titles = array('I')
+    analyses = array('I')
+    answers = array('I')
+    option_offsets = array('I', [0])
+    options = array('I')
+    for row in rows:
+        titles.append(strings.add(row[1] or ""))
+        analyses.append(strings.add(row[4]))
+        mask = answer_mask(row[3])
+        answers.append(ANSWER_MASK_FLAG | mask if mask is not None else strings.add(row[3]))
+        for option in decode_options(row[2]):
+            options.append(strings.add(option))
+        option_offsets.append(len(options))
+
+    sections = [id_column, little_endian(titles), little_endian(analyses), little_endian(answers),
+                little_endian(option_offsets), little_endian(options), little_endian(strings.offsets),
+                bytes(strings.data)]
+    offsets = []
+    position = HEADER.size
+    body = bytearray()
+    for section in sections:
+        padding = -position % 8
+        body += b'\0' * padding
+        position += padding
+        offsets.append(position)
+        body += section
+        position += len(section)
+    header = HEADER.pack(MAGIC, VERSION, len(rows), kind, len(strings.offsets) - 1, len(options), *offsets)
+    return header + bytes(body)
+
+
+def write_bank(conn, f, sources=None, on_batch=None, metrics=None):
+    # 从数据库导出 .tmb 到以二进制方式打开的文件 f，返回题目数量；metrics 的用法同 write_export
+    rows = []
+    for batch in timed_batches(iter_export_batches(conn, sources), metrics):
+        rows.extend(batch)
+        if on_batch is not None:
+            on_batch(len(rows))
+    f.write(encode_bank(rows))
+    return len(rows)
+
+
+class BankReader:
+    """按序号随机读取 .tmb 题库，只在访问时解码对应的字符串
+
+    用法：
+        with BankReader.open('2017.tmb') as bank:
+            timu = bank[10]
+    """
+
+    def __init__(self, data):
+        self.data = memoryview(data)
+        magic, version, self.count, self.id_kind, self.string_count, self.option_count, *offsets = \
+            HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError("不是 .tmb 题库文件")
+        if version != VERSION:
+            raise ValueError(f"不支持的 .tmb 版本: {version}")
+        self.offsets = dict(zip(SECTIONS, offsets))
+        id_type = 'I' if self.id_kind == ID_STRING else 'Q'
+        id_size = 4 if self.id_kind == ID_STRING else 8
+        self.ids = self._column('ids', id_type, self.count * id_size)
+        self.titles = self._column('titles', 'I', self.count * 4)
+        self.analyses = self._column('analyses', 'I', self.count * 4)
+        self.answers = self._column('answers', 'I', self.count * 4)
+        self.option_offsets = self._column('option_offsets', 'I', (self.count + 1) * 4)
+        self.options = self._column('options', 'I', self.option_count * 4)
+        self.string_offsets = self._column('string_offsets', 'I', (self.string_count + 1) * 4)
+        start = self.offsets['string_data']
+        self.string_data = self.data[start:start + self.string_offsets[self.string_count]]
+        self._file = None
+        self._mmap = None
+
+    @classmethod
+    def open(cls, path):
+        # 用 mmap 打开，只有被访问到的部分才会读入内存
+        f = open(path, 'rb')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        reader = cls(mapped)
+        reader._file = f
+        reader._mmap = mapped
+        return reader
+
+    def close(self):
+        for name in ('ids', 'titles', 'analyses', 'answers', 'option_offsets', 'options', 'string_offsets'):
+            column = getattr(self, name)
+            if isinstance(column, memoryview):
+                column.release()
+        self.string_data.release()
+        self.data.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _column(self, section, typecode, size):
+        start = self.offsets[section]
+        raw = self.data[start:start + size]
+        if sys.byteorder == 'little':
+            return raw.cast(typecode)
+        values = array(typecode, raw.tobytes())
+        values.byteswap()
+        return values
+
+    def string(self, i):
+        if i == NULL_INDEX:
+            return None
+        return str(self.string_data[self.string_offsets[i]:self.string_offsets[i + 1]], 'utf-8')
+
+    def timu_id(self, i):
+        value = self.ids[i]
+        if self.id_kind == ID_DECIMAL:
+            return str(value)
+        if self.id_kind == ID_HEX:
+            return format(value, '016x')
+        return self.string(value)
+
+    def answer(self, i):
+        value = self.answers[i]
+        if value != NULL_INDEX and value & ANSWER_MASK_FLAG:
+            return mask_answer(value & ~ANSWER_MASK_FLAG)
+        return self.string(value)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        start, end = self.option_offsets[i], self.option_offsets[i + 1]
+        return {
+            "id": self.timu_id(i),
+            "title": self.string(self.titles[i]),
+            "option": [self.string(self.options[k]) for k in range(start, end)],
+            "answer": self.answer(i),
+            "analysis": self.string(self.analyses[i]),
+        }
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
@@ -0,0 +1,159 @@
+"""题目管理器的读缓存：最近查看过的题目详情，以及列表、搜索、统计排序的分页结果
+
+- 题目详情按ID放在一个LRU中，选项JSON只在第一次读取时解析
+- 列表的每一页（以及总数）按 (数据源, 查询参数, 分页键, 行数) 缓存，重复搜索同一个关键字、来回滚动不再查询数据库
+- 两者都按行数限制大小，超出时丢弃最久没有用到的；大小可以用环境变量或 timu_manager.py 的参数指定，为 0 时不缓存
+
+失效靠写入代数（generation）：本程序保存、删除、合并题目和导入完成后调用 bump()，代数加一，
+所有分页结果作废，题目详情只丢弃写入涉及的题目。其他程序（命令行导入、同步）写入数据库时，
+只读连接的 PRAGMA data_version 会变化，下次读取缓存前发现后同样作废全部缓存。
+缓存只在界面线程中使用，不加锁。
+"""
+import json
+import os
+from collections import OrderedDict
+
+# 最多缓存的题目详情条数
+CACHE_RECORDS = int(os.environ.get('TIMU_CACHE_RECORDS', 2000))
+# 分页结果最多缓存的总行数（一页 timu_listview.PAGE_SIZE 行）
+CACHE_ROWS = int(os.environ.get('TIMU_CACHE_ROWS', 20000))
+
+DETAIL_COLUMNS = "id, title, option, answer, analysis"
+
+
+def option_text(option):
+    # 选项JSON -> "A. ...\nB. ..."，不是JSON数组时原样显示
+    try:
+        options = json.loads(option)
+        return "\n".join(f"{chr(65 + i)}. {opt}" for i, opt in enumerate(options))
+    except (TypeError, ValueError):
+        return option or ""
+
+
+def load_record(conn, timu_id):
+    # 读取题目详情，选项同时保留原文（计算内容摘要要用）和解析后的显示文字
+    row = conn.execute(f"SELECT {DETAIL_COLUMNS} FROM timu WHERE id=?", (timu_id,)).fetchone()
+    if row is None:
+        return None
+    return {'id': row[0], 'title': row[1], 'option': row[2], 'option_text': option_text(row[2]),
+            'answer': row[3], 'analysis': row[4]}
+
+
+class LRU:
+    """按权重（行数）限制大小的LRU，超出 capacity 时丢弃最久没有用到的项"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        item = self.items.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value, weight=1):
+        if weight > self.capacity:
+            return
+        self.pop(key)
+        self.items[key] = (value, weight)
+        self.weight += weight
+        while self.weight > self.capacity:
+            _, (_, dropped) = self.items.popitem(last=False)
+            self.weight -= dropped
+
+    def pop(self, key):
+        item = self.items.pop(key, None)
+        if item is not None:
+            self.weight -= item[1]
+
+    def clear(self):
+        self.items.clear()
+        self.weight = 0
+
+
+class TimuCache:
+    def __init__(self, conn, records=CACHE_RECORDS, rows=CACHE_ROWS):
+        self.conn = conn
+        self.records = LRU(records)
+        self.pages = LRU(rows)
+        self.generation = 0
+        self.data_version = self._data_version()
+
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def validate(self):
+        # 其他连接（后台任务的写连接、其他程序）提交过修改时作废全部缓存
+        if self._data_version() != self.data_version:
+            self.bump()
+
+    def bump(self, ids=None):
+        """写入之后调用：代数加一，分页结果全部作废；ids 不为空时只丢弃这些题目的详情，否则丢弃全部详情"""
+        self.generation += 1
+        self.pages.clear()
+        if ids is None:
+            self.records.clear()
+        else:
+            for timu_id in ids:
+                self.records.pop(timu_id)
+        # 本次写入已经处理过，validate() 不再重复作废
+        self.data_version = self._data_version()
+
+    def record(self, timu_id):
+        # 读取题目详情，先查缓存；题目不存在时返回 None，不缓存
+        self.validate()
+        record = self.records.get(timu_id)
+        if record is None:
+            record = load_record(self.conn, timu_id)
+            if record is not None:
+                self.records.put(timu_id, record)
+        return record
+
+    def put_record(self, record):
+        # 本程序修改题目后把新内容放回缓存（在 bump() 之后调用），下次打开详情不用重新查询
+        self.records.put(record['id'], record)
+
+    def page(self, key, load):
+        """分页结果的读缓存：key 对应的结果不在缓存中时调用 load() 读取并缓存"""
+        self.validate()
+        result = self.pages.get(key)
+        if result is None:
+            result = load()
+            self.pages.put(key, result, len(result) if isinstance(result, list) else 1)
+        return result
+
+    def stats(self):
+        return {'generation': self.generation,
+                'records': len(self.records.items), 'record_hits': self.records.hits, 'record_misses': self.records.misses,
+                'page_rows': self.pages.weight, 'page_hits': self.pages.hits, 'page_misses': self.pages.misses}
+
+
+class CachedSource:
+    """给 timu_listview 的数据源加上分页缓存，query 是区分不同查询的键，如 ('search', 关键字, 条数)"""
+
+    def __init__(self, source, cache, query):
+        self.source = source
+        self.cache = cache
+        self.query = query
+
+    def __getattr__(self, name):
+        return getattr(self.source, name)
+
+    def count(self):
+        return self.cache.page(self.query + ('count',), self.source.count)
+
+    def key(self, row, position):
+        return self.source.key(row, position)
+
+    def fetch_after(self, key, limit):
+        return self.cache.page(self.query + ('after', key, limit), lambda: self.source.fetch_after(key, limit))
+
+    def fetch_before(self, key, limit):
+        return self.cache.page(self.query + ('before', key, limit), lambda: self.source.fetch_before(key, limit))
@@ -0,0 +1,287 @@
+"""题目管理命令行工具，不依赖图形界面，可在服务器和定时任务中使用
+
+用法：
+    python timu_cli.py import 文件或文件夹... [--parallel] [--no-content-id]
+    python timu_cli.py sync 文件夹...
+    python timu_cli.py export 输出文件 [--format compact|pretty|ndjson|tmb] [--source 来源...]
+    python timu_cli.py export 输出目录 --chunks [--chunk-size 500]
+    python timu_cli.py export 输出目录 --delta [--source 来源...]
+    python timu_cli.py dedupe [--threshold 0.6] [--output clusters.json]
+    python timu_cli.py analyze 答题日志或目录... [--top 20] [--sort error_rate|discrimination|attempts]
+    python timu_cli.py paper 名称 --counts 单选=40,多选=10,简答=5 [--source 来源...] [--exclude 往期试卷.json...]
+                             [--copies 1] [--seed 1] [--root 仓库根目录] [--no-register] [--overwrite]
+    python timu_cli.py search 关键字 [--limit 20]
+    python timu_cli.py stats [--json]
+所有子命令都可以用 --db 指定数据库文件，默认是当前目录下的 timu_database.db。
+导入、同步、导出等任务结束后输出各阶段耗时的摘要，并把完整的性能报告保存到 --metrics-dir（默认 metrics/）；
+--profile cpu,memory 同时开启 cProfile 和 tracemalloc，结果写进报告。
+"""
+import argparse
+import json
+import os
+import sys
+
+from timu_analytics import SORT_COLUMNS
+from timu_core import DB_PATH
+from timu_dedupe import THRESHOLD
+from timu_db import BATCH_SIZE
+from timu_export import CHUNK_QUESTIONS, EXPORT_BINARY, EXPORT_COMPACT, EXPORT_FORMATS
+from timu_metrics import PROFILE_KINDS, parse_profile, settings
+from timu_paper import DEFAULT_ROOT
+
+
+class Progress:
+    # 在终端的同一行刷新进度，输出被重定向或指定 --quiet 时不显示
+    def __init__(self, quiet=False):
+        self.enabled = not quiet and sys.stderr.isatty()
+        self.width = 0
+
+    def __call__(self, progress):
+        if not self.enabled:
+            return
+        from timu_jobs import format_progress
+        text = format_progress(progress)
+        sys.stderr.write("\r" + text.ljust(self.width))
+        sys.stderr.flush()
+        self.width = len(text)
+
+    def clear(self):
+        if self.enabled and self.width:
+            sys.stderr.write("\r" + " " * self.width + "\r")
+            sys.stderr.flush()
+            self.width = 0
+
+
+def profile_kinds(text):
+    # 让 argparse 直接显示 parse_profile 的错误说明
+    try:
+        return parse_profile(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def print_result(result):
+    # 结果中的 message 用于提示框，命令行只输出一行状态
+    print(result['status'])
+    for failed in result.get('failed_files') or []:
+        print(f"  导入失败: {failed}", file=sys.stderr)
+    metrics = result.get('metrics')
+    if metrics is not None:
+        saved = f"（报告: {metrics.report_path}）" if metrics.report_path else ""
+        print(f"  {metrics.summary()}{saved}")
+
+
+def cmd_import(conn, args, progress):
+    from timu_core import import_file, import_folder
+    failed = 0
+    for path in args.paths:
+        try:
+            if os.path.isdir(path):
+                result = import_folder(conn, path, use_content_id=args.content_id, parallel=args.parallel,
+                                       batch_size=args.batch_size, on_progress=progress)
+            else:
+                result = import_file(conn, path, use_content_id=args.content_id, batch_size=args.batch_size,
+                                     on_progress=progress)
+        except Exception as e:
+            progress.clear()
+            print(f"{path}: 导入失败: {str(e)}", file=sys.stderr)
+            failed += 1
+            continue
+        progress.clear()
+        print(f"{path}: ", end="")
+        print_result(result)
+        failed += len(result.get('failed_files') or [])
+    return 1 if failed else 0
+
+
+def cmd_sync(conn, args, progress):
+    from timu_core import sync_folder
+    failed = 0
+    for folder in args.folders:
+        result = sync_folder(conn, folder, on_progress=progress)
+        progress.clear()
+        print(f"{folder}: ", end="")
+        print_result(result)
+        failed += len(result['failed_files'])
+    return 1 if failed else 0
+
+
+def cmd_export(conn, args, progress):
+    from timu_core import export_chunks, export_delta, export_file
+    sources = args.source or None
+    if args.delta:
+        result = export_delta(conn, args.output, sources=sources, on_progress=progress)
+    elif args.chunks:
+        result = export_chunks(conn, args.output, chunk_size=args.chunk_size, sources=sources, on_progress=progress)
+    else:
+        result = export_file(conn, args.output, fmt=args.format, sources=sources, on_progress=progress)
+    progress.clear()
+    print_result(result)
+    return 0
+
+
+def cmd_dedupe(conn, args, progress):
+    from timu_core import find_duplicates
+    from timu_dedupe import write_clusters
+    result = find_duplicates(conn, threshold=args.threshold, on_progress=progress)
+    progress.clear()
+    print(result['status'])
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            write_clusters(f, result['clusters'], result['threshold'])
+        print(f"相似题目组已保存至: {args.output}")
+    else:
+        for i, cluster in enumerate(result['clusters'], 1):
+            print(f"第 {i} 组（{len(cluster)} 道）")
+            for timu in cluster:
+                title = (timu['title'] or "").replace("\n", " ")
+                print(f"  {timu['similarity']:.2f}\t{timu['id']}\t{timu['source']}\t{title}")
+    return 0
+
+
+def cmd_analyze(conn, args, progress):
+    from timu_analytics import source_stats
+    from timu_core import analyze_answers
+    result = analyze_answers(conn, args.paths, on_progress=progress)
+    progress.clear()
+    print(result['status'])
+    print("来源\t题目数\t有作答\t作答次数\t错误率\t平均区分度\t错误率最高的题目")
+    for row in source_stats(conn):
+        print("\t".join("" if value is None else str(value) for value in row))
+    if args.top:
+        # 区分度升序列出，区分度低（甚至为负）的题目最值得检查
+        order = "ASC" if args.sort == 'discrimination' else "DESC"
+        print(f"\n按 {args.sort} 排列的前 {args.top} 道题目：")
+        print("ID\t作答次数\t错误率\t区分度\t错题集人数\t最多人选的错误选项\t题目")
+        for row in conn.execute(f"SELECT s.id, s.attempts, s.error_rate, s.discrimination, s.marked, s.distractor, t.title "
+                                f"FROM timu_stats s JOIN timu t ON t.id = s.id WHERE s.{args.sort} IS NOT NULL "
+                                f"ORDER BY s.{args.sort} {order} LIMIT ?", (args.top,)):
+            print("\t".join("" if value is None else str(value).replace("\n", " ") for value in row))
+    return 0
+
+
+def cmd_paper(conn, args, progress):
+    from timu_core import generate_papers
+    from timu_paper import parse_counts
+    try:
+        result = generate_papers(conn, args.name, parse_counts(args.counts), copies=args.copies, sources=args.source,
+                                 exclude_paths=args.exclude, seed=args.seed, root=args.root, register=args.register,
+                                 overwrite=args.overwrite, on_progress=progress)
+    except ValueError as e:
+        progress.clear()
+        print(f"组卷失败: {str(e)}", file=sys.stderr)
+        return 1
+    progress.clear()
+    print_result(result)
+    return 0
+
+
+def cmd_search(conn, args, progress):
+    from timu_core import search
+    for timu_id, title, answer, source in search(conn, args.keyword, args.limit):
+        print("\t".join(str(value or "").replace("\n", " ") for value in (timu_id, title, answer, source)))
+    return 0
+
+
+def cmd_stats(conn, args, progress):
+    from timu_core import stats
+    result = stats(conn)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return 0
+    print(f"题目总数: {result['total']}")
+    print(f"全文索引: {'已启用' if result['fts'] else '不可用'}")
+    print(f"同步记录的文件数: {result['source_files']}")
+    print("题型:")
+    for qtype, count in result['types']:
+        print(f"  {qtype}: {count}")
+    print("来源:")
+    for source, count in result['sources']:
+        print(f"  {source}: {count}")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="题目管理命令行工具")
+    parser.add_argument('--db', default=DB_PATH, help=f"数据库文件（默认 {DB_PATH}，也可以用环境变量 TIMU_DB 指定）")
+    parser.add_argument('-q', '--quiet', action='store_true', help="不显示进度")
+    parser.add_argument('--metrics-dir', default=settings['report_dir'],
+                        help="性能报告的保存目录（默认 metrics，也可以用环境变量 TIMU_METRICS_DIR 指定），为空时不保存")
+    parser.add_argument('--profile', type=profile_kinds, default=settings['profile'],
+                        help=f"开启性能分析，可选 {','.join(PROFILE_KINDS)}（cProfile / tracemalloc），用逗号分隔")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    p = commands.add_parser('import', help="导入TXT/Word(.docx)/JSON文件或文件夹")
+    p.add_argument('paths', nargs='+', help="文件或文件夹，可以一次传入多个")
+    p.add_argument('--no-content-id', dest='content_id', action='store_false', help="不按内容生成ID")
+    p.add_argument('--parallel', action='store_true', help="导入文件夹时多进程并行解析")
+    p.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="每批写入的行数")
+    p.set_defaults(func=cmd_import)
+
+    p = commands.add_parser('sync', help="增量同步文件夹，只导入有变化的文件")
+    p.add_argument('folders', nargs='+')
+    p.set_defaults(func=cmd_sync)
+
+    p = commands.add_parser('export', help="导出题库")
+    p.add_argument('output', help="输出文件；使用 --chunks 或 --delta 时为输出目录")
+    p.add_argument('--format', choices=EXPORT_FORMATS + [EXPORT_BINARY], default=EXPORT_COMPACT)
+    p.add_argument('--source', action='append', help="只导出指定来源的题目，可以指定多次")
+    p.add_argument('--chunks', action='store_true', help="分块导出，供 timu.html 按需加载")
+    p.add_argument('--chunk-size', type=int, default=CHUNK_QUESTIONS, help="分块导出时每块的题目数")
+    p.add_argument('--delta', action='store_true',
+                   help="增量发布到输出目录，timu.html 缓存题库后只下载上次发布以来变化的题目")
+    p.set_defaults(func=cmd_export)
+
+    p = commands.add_parser('dedupe', help="查找不同来源中的相似题目")
+    p.add_argument('--threshold', type=float, default=THRESHOLD, help="相似度阈值，0到1之间")
+    p.add_argument('--output', help="把相似题目组保存为JSON文件，不指定时输出到终端")
+    p.set_defaults(func=cmd_dedupe)
+
+    p = commands.add_parser('analyze', help="从答题日志和错题记录计算每道题的错误率、选项选择次数和区分度")
+    p.add_argument('paths', nargs='+', help="答题日志（.log）、错题记录（.json）或包含它们的目录")
+    p.add_argument('--top', type=int, default=20, help="列出的题目数，0 表示不列出")
+    p.add_argument('--sort', choices=SORT_COLUMNS, default='error_rate', help="列出题目时的排序依据")
+    p.set_defaults(func=cmd_analyze)
+
+    p = commands.add_parser('paper', help="按题型题数和来源随机组卷，生成题库文件并加入 JSONList")
+    p.add_argument('name', help="试卷名称，也是生成的文件名（不含扩展名）")
+    p.add_argument('--counts', required=True, help="各题型的题数，如 单选=40,多选=10,简答=5 或 single=40,essay=5")
+    p.add_argument('--source', action='append', help="只从指定来源抽题，可以指定多次，默认全部来源")
+    p.add_argument('--exclude', action='append', help="往期试卷（JSON题库），其中的题目和相似题目不会被抽到，可以指定多次")
+    p.add_argument('--copies', type=int, default=1, help="生成的份数，多份时文件名加序号")
+    p.add_argument('--seed', type=int, help="随机种子，相同时生成的试卷相同")
+    p.add_argument('--root', default=DEFAULT_ROOT, help="仓库根目录，试卷写到其中的 json/ 下")
+    p.add_argument('--no-register', dest='register', action='store_false', help="不加入 js/public.js 的 JSONList")
+    p.add_argument('--overwrite', action='store_true', help="覆盖同名的已有题库文件和 JSONList 记录，默认遇到同名时报错")
+    p.set_defaults(func=cmd_paper)
+
+    p = commands.add_parser('search', help="搜索题目")
+    p.add_argument('keyword')
+    p.add_argument('--limit', type=int, default=20)
+    p.set_defaults(func=cmd_search)
+
+    p = commands.add_parser('stats', help="题库统计")
+    p.add_argument('--json', action='store_true', help="以JSON格式输出")
+    p.set_defaults(func=cmd_stats)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    settings.update(report_dir=args.metrics_dir, profile=args.profile)
+    from timu_core import open_database
+    from timu_storage import retry_busy
+    conn = retry_busy(open_database, args.db)
+    progress = Progress(args.quiet)
+    try:
+        return args.func(conn, args, progress)
+    except KeyboardInterrupt:
+        progress.clear()
+        print("已中断", file=sys.stderr)
+        return 130
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""题目管理的核心功能：打开数据库、导入、同步、导出、查找相似题目、答题统计、组卷、搜索、统计
+
+不依赖 tkinter，图形界面（timu_manager.py）和命令行（timu_cli.py）都基于这里的函数。
+导入、导出函数在当前线程中同步执行，on_progress(进度字典) 用于汇报进度，
+进度字典的字段见 timu_jobs.Job.report。
+"""
+import os
+
+from timu_analytics import ensure_stats
+from timu_db import BATCH_SIZE, migrate
+from timu_dedupe import THRESHOLD, ensure_minhash
+from timu_export import CHUNK_QUESTIONS, EXPORT_COMPACT
+from timu_jobs import run_job
+from timu_paper import DEFAULT_ROOT
+from timu_search import SEARCH_LIMIT, ensure_fts, fts_available, search_timu
+from timu_storage import BUSY_TIMEOUT, DB_PATH, JOURNAL_MODE, connect
+from timu_sync import ensure_source_files
+
+TIMU_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS timu (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    option TEXT,
+    answer TEXT,
+    analysis TEXT,
+    source TEXT,
+    create_time TEXT
+)
+'''
+
+
+def open_database(db_path=DB_PATH, timeout=BUSY_TIMEOUT, journal_mode=JOURNAL_MODE):
+    """创建或连接到SQLite数据库，并把旧数据库升级到当前结构"""
+    # 默认使用 WAL 日志，其他程序导入时也能继续读取，见 timu_storage
+    conn = connect(db_path, timeout, journal_mode)
+    # 创建题目表
+    conn.execute(TIMU_SCHEMA)
+    conn.commit()
+    # 按 PRAGMA user_version 执行尚未执行的结构升级：新增的列、索引、派生列和来源汇总表
+    migrate(conn)
+    # 建立全文索引，旧数据库第一次打开时会为已有题目补建索引
+    ensure_fts(conn)
+    # 文件夹同步记录
+    ensure_source_files(conn)
+    # 相似题目签名
+    ensure_minhash(conn)
+    # 答题统计
+    ensure_stats(conn)
+    return conn
+
+
+def import_file(conn, file_path, use_content_id=True, batch_size=BATCH_SIZE, on_progress=None):
+    # 按扩展名导入单个TXT、Word（.docx）或JSON文件
+    from timu_tasks import import_json, import_txt
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext in ('.txt', '.docx'):
+        func = import_txt
+    elif ext == '.json':
+        func = import_json
+    else:
+        raise ValueError(f"不支持的文件类型: {file_path}")
+    return run_job("导入", func, conn, file_path, use_content_id=use_content_id, batch_size=batch_size,
+                   on_progress=on_progress)
+
+
+def import_folder(conn, folder_path, use_content_id=True, parallel=False, batch_size=BATCH_SIZE, on_progress=None):
+    from timu_tasks import import_folder as import_folder_task
+    return run_job("批量导入", import_folder_task, conn, folder_path, use_content_id=use_content_id,
+                   parallel=parallel, batch_size=batch_size, on_progress=on_progress)
+
+
+def sync_folder(conn, folder_path, on_progress=None):
+    from timu_tasks import sync_folder as sync_folder_task
+    return run_job("同步", sync_folder_task, conn, folder_path, on_progress=on_progress)
+
+
+def export_file(conn, file_path, fmt=EXPORT_COMPACT, sources=None, on_progress=None):
+    from timu_tasks import export_json
+    return run_job("导出", export_json, conn, file_path, sources=sources, fmt=fmt, on_progress=on_progress)
+
+
+def export_chunks(conn, out_dir, chunk_size=CHUNK_QUESTIONS, sources=None, on_progress=None):
+    from timu_tasks import export_chunks as export_chunks_task
+    return run_job("分块导出", export_chunks_task, conn, out_dir, chunk_size=chunk_size, sources=sources,
+                   on_progress=on_progress)
+
+
+def export_delta(conn, out_dir, sources=None, on_progress=None):
+    # 增量发布，发布目录的内容见 timu_delta
+    from timu_tasks import export_delta as export_delta_task
+    return run_job("增量发布", export_delta_task, conn, out_dir, sources=sources, on_progress=on_progress)
+
+
+def find_duplicates(conn, threshold=THRESHOLD, on_progress=None):
+    # 返回任务结果，其中 clusters 为相似题目组列表，格式见 timu_dedupe.find_clusters
+    from timu_tasks import find_duplicates as find_duplicates_task
+    return run_job("查找相似题目", find_duplicates_task, conn, threshold=threshold, on_progress=on_progress)
+
+
+def analyze_answers(conn, paths, on_progress=None):
+    # paths 为答题日志（.log）、错题记录（.json）或包含它们的目录，结果写入 timu_stats 等统计表
+    from timu_tasks import analyze_answers as analyze_answers_task
+    return run_job("答题统计", analyze_answers_task, conn, paths, on_progress=on_progress)
+
+
+def generate_papers(conn, name, counts, copies=1, sources=None, exclude_paths=None, seed=None, root=DEFAULT_ROOT,
+                    register=True, overwrite=False, on_progress=None):
+    # counts 为 {题型: 题数}，试卷写到 root/json/ 下，register 时加入 root/js/public.js 的 JSONList；
+    # 与已有题库同名时报错，overwrite 为真时覆盖
+    from timu_tasks import generate_papers as generate_papers_task
+    return run_job("组卷", generate_papers_task, conn, root, name, counts, copies=copies, sources=sources,
+                   exclude_paths=exclude_paths, seed=seed, register=register, overwrite=overwrite,
+                   on_progress=on_progress)
+
+
+def search(conn, keyword, limit=SEARCH_LIMIT, offset=0):
+    # 返回 (id, title, answer, source) 列表，按相关度排序
+    return search_timu(conn, keyword, limit, offset)
+
+
+def stats(conn):
+    """题库统计：题目总数、各来源和各题型的题目数、同步记录的文件数"""
+    # 都从触发器维护的来源汇总表中读取，不扫描题目表
+    total = conn.execute("SELECT ifnull(SUM(questions), 0) FROM timu_source_summary").fetchone()[0]
+    sources = conn.execute("SELECT source, SUM(questions) AS n FROM timu_source_summary "
+                           "GROUP BY source ORDER BY n DESC").fetchall()
+    types = conn.execute("SELECT qtype, SUM(questions) AS n FROM timu_source_summary "
+                         "GROUP BY qtype ORDER BY n DESC").fetchall()
+    source_files = conn.execute("SELECT COUNT(*) FROM source_files").fetchone()[0]
+    return {
+        'total': total,
+        'sources': sources,
+        'types': types,
+        'source_files': source_files,
+        'fts': fts_available(conn),
+    }
@@ -0,0 +1,564 @@
+import hashlib
+import json
+import random
+import re
+import time
+import unicodedata
+from contextlib import contextmanager, nullcontext
+
+from timu_export import (ESSAY_ANSWER_LENGTH, TYPE_BLANK, TYPE_ESSAY, TYPE_MULTIPLE, TYPE_SINGLE, option_count,
+                         option_list, qtype_of)
+from timu_search import FTS_UPDATE_TRIGGER
+from timu_storage import JOURNAL_MODE
+
+# 每次 executemany 写入的行数
+BATCH_SIZE = 5000
+# IN (...) 查询每次最多带的参数个数
+IN_CHUNK_SIZE = 500
+
+INSERT_SQL = ("INSERT INTO timu (id, title, option, answer, analysis, source, create_time, digest, "
+              "qtype, option_count, answer_len, text_len) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+# 冲突时不更新题型等派生列，内容有变化时由 timu_derive_au 触发器重新计算
+UPDATE_SET_SQL = (" ON CONFLICT(id) DO UPDATE SET title=excluded.title, option=excluded.option, answer=excluded.answer, "
+                  "analysis=excluded.analysis, source=excluded.source, digest=excluded.digest")
+
+# 不同的ID冲突处理方式
+CONFLICT_NEW_ID = 'new_id'    # 重新生成ID后插入（TXT导入）
+CONFLICT_UPDATE = 'update'    # 更新已有记录（JSON导入）
+CONFLICT_IGNORE = 'ignore'    # 跳过已有记录（批量导入JSON）
+CONFLICT_SYNC = 'sync'        # 内容未变化的跳过，变化的更新，新题目插入（按内容生成ID时使用）
+
+CONFLICT_SQL = {
+    CONFLICT_NEW_ID: INSERT_SQL + " ON CONFLICT(id) DO NOTHING",
+    CONFLICT_IGNORE: INSERT_SQL + " ON CONFLICT(id) DO NOTHING",
+    CONFLICT_UPDATE: INSERT_SQL + UPDATE_SET_SQL,
+    CONFLICT_SYNC: INSERT_SQL + UPDATE_SET_SQL,
+}
+
+# 导入时计算好的派生列：题型、选项个数、答案长度、题干长度，列表显示和导出时不必再解析选项
+DERIVED_COLUMNS = [
+    ('qtype', 'TEXT'),
+    ('option_count', 'INTEGER'),
+    ('answer_len', 'INTEGER'),
+    ('text_len', 'INTEGER'),
+]
+
+# 后来新增的列，旧数据库打开时自动补上
+EXTRA_COLUMNS = [
+    ('digest', 'TEXT'),
+    # 文件夹同步时记录题目来自哪个文件
+    ('src_path', 'TEXT'),
+] + DERIVED_COLUMNS
+
+# 题目列表按 (create_time, id) 倒序分页，需要对应的联合索引
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_timu_create_time ON timu(create_time, id)",
+    # 文件夹同步时按来源文件查找题目
+    "CREATE INDEX IF NOT EXISTS idx_timu_src_path ON timu(src_path)",
+]
+
+# 与 timu_export.option_count / qtype_of 的计算方式相同，用于补算旧数据和其他程序写入的题目
+OPTION_COUNT_SQL = ("CASE WHEN json_valid(option) THEN "
+                    "CASE WHEN json_type(option) = 'array' THEN json_array_length(option) ELSE 0 END ELSE 0 END")
+DERIVE_SQL = f'''
+UPDATE timu SET
+    option_count = {OPTION_COUNT_SQL},
+    answer_len = length(ifnull(answer, '')),
+    text_len = length(ifnull(title, '')),
+    qtype = CASE
+        WHEN {OPTION_COUNT_SQL} > 0 THEN
+            CASE WHEN length(ifnull(answer, '')) = 1 THEN '{TYPE_SINGLE}' ELSE '{TYPE_MULTIPLE}' END
+        WHEN length(ifnull(answer, '')) >= {ESSAY_ANSWER_LENGTH} THEN '{TYPE_ESSAY}'
+        ELSE '{TYPE_BLANK}'
+    END
+'''
+
+# 每个来源、每种题型的题目数，由触发器维护；来源列表、条件导出的题目数和统计直接读这张小表
+SUMMARY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS timu_source_summary (
+    source TEXT NOT NULL,
+    qtype TEXT NOT NULL,
+    questions INTEGER NOT NULL,
+    PRIMARY KEY (source, qtype)
+) WITHOUT ROWID
+'''
+
+SUMMARY_ADD = '''
+    INSERT INTO timu_source_summary (source, qtype, questions)
+    SELECT ifnull(new.source, ''), new.qtype, 1 WHERE new.qtype IS NOT NULL
+    ON CONFLICT(source, qtype) DO UPDATE SET questions = questions + 1;
+'''
+SUMMARY_REMOVE = '''
+    UPDATE timu_source_summary SET questions = questions - 1
+    WHERE source = ifnull(old.source, '') AND qtype = old.qtype;
+    DELETE FROM timu_source_summary WHERE source = ifnull(old.source, '') AND qtype = old.qtype AND questions <= 0;
+'''
+
+# qtype 为空的题目（其他程序直接写入的）先补算派生列，补算时再由更新触发器计入汇总表
+DERIVED_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_derive_ai AFTER INSERT ON timu WHEN new.qtype IS NULL BEGIN
+        {DERIVE_SQL} WHERE rowid = new.rowid;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_derive_au AFTER UPDATE OF title, option, answer ON timu
+    WHEN new.title IS NOT old.title OR new.option IS NOT old.option OR new.answer IS NOT old.answer BEGIN
+        {DERIVE_SQL} WHERE rowid = new.rowid;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_summary_ai AFTER INSERT ON timu BEGIN
+        {SUMMARY_ADD}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_summary_ad AFTER DELETE ON timu BEGIN
+        {SUMMARY_REMOVE}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_summary_au AFTER UPDATE OF source, qtype ON timu
+    WHEN new.source IS NOT old.source OR new.qtype IS NOT old.qtype BEGIN
+        {SUMMARY_REMOVE}
+        {SUMMARY_ADD}
+    END
+    ''',
+]
+
+# 变更记录：每个来源有一个单调递增的版本号，题目每次插入、修改、删除都让所在来源的版本号加一，
+# 并在 timu_changes 中记下这道题最后一次变更时的版本号和变更类型（同一道题只保留最后一次，记录不会随修改次数增长）。
+# 增量发布（timu_delta）按版本号找出两次发布之间变化的题目
+CHANGE_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS timu_versions (
+        source TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS timu_changes (
+        source TEXT NOT NULL,
+        id TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        op TEXT NOT NULL,
+        PRIMARY KEY (source, id)
+    ) WITHOUT ROWID
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_timu_changes_version ON timu_changes(source, version)",
+]
+
+# 变更类型
+CHANGE_INSERT = 'insert'
+CHANGE_UPDATE = 'update'
+CHANGE_DELETE = 'delete'
+
+
+def change_sql(row, op):
+    # 触发器中记录一次变更：row 为 new 或 old
+    return f'''
+        INSERT INTO timu_versions (source, version) VALUES (ifnull({row}.source, ''), 1)
+        ON CONFLICT(source) DO UPDATE SET version = version + 1;
+        INSERT INTO timu_changes (source, id, version, op)
+        SELECT source, {row}.id, version, '{op}' FROM timu_versions WHERE source = ifnull({row}.source, '')
+        ON CONFLICT(source, id) DO UPDATE SET version = excluded.version, op = excluded.op;
+    '''
+
+
+# 只有导出的内容或来源变化时才记录；改了来源或ID的题目在原来源记为删除，在新来源记为插入
+CHANGE_CONTENT = "new.title IS NOT old.title OR new.option IS NOT old.option OR new.answer IS NOT old.answer " \
+                 "OR new.analysis IS NOT old.analysis"
+CHANGE_MOVED = "new.source IS NOT old.source OR new.id IS NOT old.id"
+CHANGE_UPDATE_TRIGGER = f'''
+    CREATE TRIGGER IF NOT EXISTS timu_change_au AFTER UPDATE OF title, option, answer, analysis ON timu
+    WHEN ({CHANGE_CONTENT}) AND NOT ({CHANGE_MOVED}) BEGIN
+        {change_sql('new', CHANGE_UPDATE)}
+    END
+    '''
+CHANGE_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_change_ai AFTER INSERT ON timu BEGIN
+        {change_sql('new', CHANGE_INSERT)}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_change_ad AFTER DELETE ON timu BEGIN
+        {change_sql('old', CHANGE_DELETE)}
+    END
+    ''',
+    CHANGE_UPDATE_TRIGGER,
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_change_move AFTER UPDATE OF id, source ON timu WHEN {CHANGE_MOVED} BEGIN
+        {change_sql('old', CHANGE_DELETE)}
+        {change_sql('new', CHANGE_INSERT)}
+    END
+    ''',
+]
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def add_columns(conn, columns):
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(timu)")}
+    for name, col_type in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE timu ADD COLUMN {name} {col_type}")
+
+
+def add_missing_columns(conn):
+    # 只补列，不建触发器和汇总表，供基准测试等直接建表的场合使用
+    add_columns(conn, EXTRA_COLUMNS)
+    conn.commit()
+
+
+def migrate_1(conn):
+    # 摘要和来源文件列、题目列表分页索引；create_time 为空的旧数据无法参与分页比较，统一补成空字符串
+    add_columns(conn, EXTRA_COLUMNS[:2])
+    conn.execute("UPDATE timu SET create_time='' WHERE create_time IS NULL")
+    for sql in INDEXES:
+        conn.execute(sql)
+
+
+def migrate_2(conn):
+    # 派生列、来源索引、来源汇总表及维护它们的触发器
+    # 全文索引的更新触发器改为只在索引的列变化时执行，否则下面补算派生列时会重写整个全文索引
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='timu_fts_au'").fetchone():
+        conn.execute("DROP TRIGGER timu_fts_au")
+        conn.execute(FTS_UPDATE_TRIGGER)
+    add_columns(conn, DERIVED_COLUMNS)
+    conn.execute(DERIVE_SQL)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_timu_source ON timu(source)")
+    conn.execute(SUMMARY_SCHEMA)
+    conn.execute("DELETE FROM timu_source_summary")
+    conn.execute("INSERT INTO timu_source_summary (source, qtype, questions) "
+                 "SELECT ifnull(source, ''), qtype, COUNT(*) FROM timu GROUP BY 1, 2")
+    for sql in DERIVED_TRIGGERS:
+        conn.execute(sql)
+
+
+def migrate_3(conn):
+    # 组卷按 (来源, 题型) 分层抽题，换成联合索引；它的前缀也能用于按来源过滤，原来的单列索引不再需要
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_timu_source_qtype ON timu(source, qtype)")
+    conn.execute("DROP INDEX IF EXISTS idx_timu_source")
+
+
+def unescape_options(conn):
+    # 旧版本按 ASCII 转义保存的选项无法按中文检索，转成原文并重新计算内容摘要；
+    # 题目内容没有变化，已有变更记录的触发器时先删除、改写后重建（同一事务中），不把改写记为题目修改
+    rows = conn.execute("SELECT rowid, title, option, answer, analysis FROM timu WHERE option LIKE '%\\u%'").fetchall()
+    if not rows:
+        return
+    has_trigger = conn.execute("SELECT 1 FROM sqlite_master WHERE type='trigger' AND name='timu_change_au'").fetchone()
+    if has_trigger:
+        conn.execute("DROP TRIGGER timu_change_au")
+    for rowid, title, option, answer, analysis in rows:
+        try:
+            option = json.dumps(json.loads(option), ensure_ascii=False)
+        except ValueError:
+            continue
+        conn.execute("UPDATE timu SET option=?, digest=? WHERE rowid=?",
+                     (option, content_digest(title, option, answer, analysis), rowid))
+    if has_trigger:
+        conn.execute(CHANGE_UPDATE_TRIGGER)
+
+
+def migrate_4(conn):
+    # 选项转成原文，在建立变更记录之前执行
+    unescape_options(conn)
+
+
+def migrate_5(conn):
+    # 变更记录表和记录变更的触发器；已有的题目在第一次增量发布时整体导出，不需要补记录
+    for sql in CHANGE_SCHEMA + CHANGE_TRIGGERS:
+        conn.execute(sql)
+
+
+def migrate_6(conn):
+    # 按以前的编号，版本4就是变更记录，这样的数据库跳过了上面的选项改写，这里补做；其他数据库中已经没有要改写的选项
+    unescape_options(conn)
+
+
+# 题目表的结构升级，按顺序执行；数据库当前的版本号保存在 PRAGMA user_version 中
+MIGRATIONS = [migrate_1, migrate_2, migrate_3, migrate_4, migrate_5, migrate_6]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """把题目表升级到 SCHEMA_VERSION，返回升级前的版本号
+
+    每一步升级和版本号的修改在同一个 BEGIN IMMEDIATE 事务中提交，中途失败时停留在上一个版本；
+    多个进程同时打开旧数据库时，拿到写锁后重新读取版本号，同一步不会执行两次。
+    """
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"数据库结构版本为 {version}，比程序支持的版本 {SCHEMA_VERSION} 新，请更新程序")
+    start = version
+    if conn.in_transaction:
+        conn.commit()
+    while version < SCHEMA_VERSION:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < SCHEMA_VERSION:
+                MIGRATIONS[version](conn)
+                version += 1
+                conn.execute(f"PRAGMA user_version={version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    return start
+
+
+def normalize_text(text):
+    # 全角半角统一、合并连续空白，保证同一道题重新排版后哈希不变
+    text = unicodedata.normalize('NFKC', str(text or ''))
+    return WHITESPACE_RE.sub(' ', text).strip()
+
+
+def normalize_option(option):
+    if isinstance(option, str):
+        try:
+            option = json.loads(option)
+        except ValueError:
+            return normalize_text(option)
+    return '\x1f'.join(normalize_text(opt) for opt in option or [])
+
+
+def content_id(source, title, option):
+    """按内容生成的稳定ID：同一来源中题干和选项相同的题目ID相同
+
+    答案和解析不参与ID计算，修正答案后重新导入会更新原题，而不是新增一道题。
+    """
+    key = '\x1e'.join((normalize_text(source), normalize_text(title), normalize_option(option)))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def content_digest(title, option, answer, analysis):
+    # 题目内容摘要，重新导入时用来判断题目是否有变化
+    key = '\x1e'.join((normalize_text(title), normalize_option(option), normalize_text(answer), normalize_text(analysis)))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def new_timu_id(prefix=None):
+    # prefix 为时间前缀，批量生成时由调用方传入，避免每行都调用 strftime
+    if prefix is None:
+        prefix = time.strftime("%Y%m%d%H%M", time.localtime())
+    return prefix + str(random.randint(0, 1000000))
+
+
+def now_str():
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def derived_columns(title, option, answer):
+    # (qtype, option_count, answer_len, text_len)，与 DERIVE_SQL 的结果相同
+    options = option_count(option)
+    answer_len = len(str(answer)) if answer is not None else 0
+    return qtype_of(options, answer_len), options, answer_len, len(str(title or ''))
+
+
+def txt_row(timu, source, create_time, use_content_id=False):
+    # TXT解析结果转换为数据库行，不按内容生成ID时由 BulkWriter 生成随机ID
+    timu_id = content_id(source, timu['title'], timu['option']) if use_content_id else None
+    digest = content_digest(timu['title'], timu['option'], timu['answer'], timu['analysis'])
+    return (timu_id, timu['title'], json.dumps(timu['option'], ensure_ascii=False), timu['answer'], timu['analysis'],
+            source, create_time, digest) + derived_columns(timu['title'], timu['option'], timu['answer'])
+
+
+def json_row(item, source, create_time, use_content_id=False):
+    # JSON题目转换为数据库行，优先使用题目自带的ID
+    # 选项统一保存为JSON数组文本，不是列表的选项见 option_list
+    options = option_list(item.get('option'))
+    option = json.dumps(options, ensure_ascii=False)
+    title = item.get('title', '')
+    answer = item.get('answer', '')
+    analysis = item.get('analysis', '')
+    timu_id = item.get('id')
+    if not timu_id and use_content_id:
+        timu_id = content_id(source, title, option)
+    return (timu_id, title, option, answer, analysis, source, create_time,
+            content_digest(title, option, answer, analysis)) + derived_columns(title, options, answer)
+
+
+@contextmanager
+def bulk_load_profile(conn, cache_size=-262144):
+    """大批量导入时使用的数据库参数：WAL日志（或 TIMU_JOURNAL_MODE 指定的模式）、synchronous=NORMAL、更大的页缓存、临时表放内存
+
+    cache_size 为负数时单位是KB，默认256MB。退出时恢复原来的 synchronous 和缓存设置。
+    """
+    old_synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    old_cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    old_temp_store = conn.execute("PRAGMA temp_store").fetchone()[0]
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute(f"PRAGMA journal_mode={JOURNAL_MODE}")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size={int(cache_size)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    try:
+        yield conn
+    finally:
+        conn.execute(f"PRAGMA synchronous={int(old_synchronous)}")
+        conn.execute(f"PRAGMA cache_size={int(old_cache_size)}")
+        conn.execute(f"PRAGMA temp_store={int(old_temp_store)}")
+
+
+class BulkWriter:
+    """批量写入题目
+
+    行先攒在内存里，每满 batch_size 行用一次 executemany 写入；整个导入放在一个显式事务中，
+    正常结束时提交，出错时回滚。ID冲突交给 INSERT ... ON CONFLICT 处理，不再逐行捕获异常。
+    用法：
+        with BulkWriter(conn, conflict=CONFLICT_UPDATE) as writer:
+            for item in data:
+                writer.add(json_row(item, source, create_time))
+    """
+
+    def __init__(self, conn, batch_size=BATCH_SIZE, conflict=CONFLICT_NEW_ID, profile=True):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.conflict = conflict
+        self.profile = profile
+        self.rows = []
+        # 成功写入（插入或更新）的行数
+        self.written = 0
+        # 按内容同步时分别统计新增、更新、未变化跳过的行数
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        # 因ID冲突被跳过或重新生成ID的行数
+        self.conflicts = 0
+        self._profile_cm = None
+        # 每写入一批后调用的回调，用于汇报进度
+        self.on_flush = None
+        # timu_metrics.Metrics，设置后分别统计生成ID、比对摘要、写入和提交的耗时
+        self.metrics = None
+
+    def __enter__(self):
+        if self.profile:
+            self._profile_cm = bulk_load_profile(self.conn)
+            self._profile_cm.__enter__()
+        if self.conn.in_transaction:
+            self.conn.commit()
+        # 一开始就取得写锁：BEGIN 延迟到第一次写入才加锁，若其间其他连接已提交，WAL 下会直接报 SQLITE_BUSY 而不等待
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.flush()
+                with self.stage('提交'):
+                    self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            if self._profile_cm is not None:
+                self._profile_cm.__exit__(None, None, None)
+                self._profile_cm = None
+        return False
+
+    @property
+    def sql(self):
+        return CONFLICT_SQL[self.conflict]
+
+    def stage(self, name):
+        return nullcontext() if self.metrics is None else self.metrics.stage(name)
+
+    def add(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def add_many(self, rows):
+        for row in rows:
+            self.add(row)
+
+    def flush(self):
+        if not self.rows:
+            return
+        with self.stage('生成ID'):
+            rows = self._assign_ids(self.rows)
+        self.rows = []
+        if self.conflict == CONFLICT_SYNC:
+            with self.stage('比对摘要'):
+                rows = self._changed_rows(rows)
+            if not rows:
+                return
+        # rowcount 只统计语句本身写入的行，不含全文索引等触发器产生的改动
+        with self.stage('写入'):
+            changed = self.conn.executemany(self.sql, rows).rowcount
+        self.written += changed
+        if self.conflict not in (CONFLICT_UPDATE, CONFLICT_SYNC):
+            self.conflicts += len(rows) - changed
+        if self.on_flush is not None:
+            self.on_flush()
+
+    def _assign_ids(self, rows):
+        # 给没有ID的行生成ID；TXT导入模式下还要保证新ID不和本批次及库中已有的ID重复
+        prefix = time.strftime("%Y%m%d%H%M", time.localtime())
+        if self.conflict != CONFLICT_NEW_ID:
+            return [row if row[0] else (new_timu_id(prefix),) + row[1:] for row in rows]
+
+        ids = set()
+        result = []
+        for row in rows:
+            timu_id = row[0] or new_timu_id(prefix)
+            while timu_id in ids:
+                timu_id = new_timu_id(prefix)
+            ids.add(timu_id)
+            result.append((timu_id,) + row[1:])
+
+        taken = self.existing_ids(ids)
+        if not taken:
+            return result
+        self.conflicts += len(taken)
+        for i, row in enumerate(result):
+            if row[0] in taken:
+                timu_id = new_timu_id(prefix)
+                while timu_id in ids or self.existing_ids([timu_id]):
+                    timu_id = new_timu_id(prefix)
+                ids.add(timu_id)
+                result[i] = (timu_id,) + row[1:]
+        return result
+
+    def _changed_rows(self, rows):
+        # 和库中的内容摘要比较，只保留新题目和内容有变化的题目
+        latest = {}
+        for row in rows:
+            latest[row[0]] = row
+        digests = self.existing_digests(latest)
+        result = []
+        for timu_id, row in latest.items():
+            if timu_id not in digests:
+                self.inserted += 1
+            elif digests[timu_id] != row[7]:
+                self.updated += 1
+            else:
+                self.skipped += 1
+                continue
+            result.append(row)
+        self.skipped += len(rows) - len(latest)
+        return result
+
+    def existing_digests(self, ids):
+        ids = list(ids)
+        digests = {}
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            placeholders = ",".join(["?"] * len(chunk))
+            for timu_id, digest in self.conn.execute(f"SELECT id, digest FROM timu WHERE id IN ({placeholders})", chunk):
+                digests[timu_id] = digest
+        return digests
+
+    def existing_ids(self, ids):
+        # 查询这些ID中哪些已经在库中，按块拼 IN 查询，走主键索引
+        ids = list(ids)
+        taken = set()
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            placeholders = ",".join(["?"] * len(chunk))
+            for (timu_id,) in self.conn.execute(f"SELECT id FROM timu WHERE id IN ({placeholders})", chunk):
+                taken.add(timu_id)
+        return taken
@@ -0,0 +1,257 @@
+"""查找不同来源中措辞略有差别的重复题目
+
+题干加选项规范化后切成连续3个字的片段（shingle），用 MinHash 把每道题压缩成 NUM_PERM 个整数的签名，
+两道题签名中相等位置的比例就是它们片段集合 Jaccard 相似度的估计。签名在导入时计算并保存在 timu_minhash 表中。
+查找时用 LSH 分桶：签名切成 BANDS 段，任意一段完全相同的题目落进同一个桶，只有同桶的题目才比较签名，
+耗时与题目数大致成线性关系，不需要两两比较。
+
+依赖 numpy；没有安装时 dedupe_available() 返回 False，导入时不计算签名。
+"""
+import importlib.util
+import json
+import re
+
+# 只检查 numpy 是否安装，不导入，见 _np()
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+from timu_db import IN_CHUNK_SIZE, content_digest, normalize_text
+
+# 每个片段的字数
+SHINGLE_SIZE = 3
+# 签名长度 = 分段数 × 每段行数；16段×4行时相似度约0.5以上的题目大概率落进同一个桶
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# 默认的相似度阈值，签名相等位置的比例不低于它才算相似
+THRESHOLD = 0.6
+# 每批计算签名的题目数
+SIGN_BATCH = 1000
+
+MINHASH_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS timu_minhash (
+    id TEXT PRIMARY KEY,
+    digest TEXT,
+    sig BLOB
+)
+'''
+
+# 去掉标点和空白后再切片段，只改了标点或排版的题目签名相同
+STRIP_RE = re.compile(r'[\W_]+')
+# 比所有片段值都大的素数，以及固定的随机种子，保证不同时间计算的签名可以比较
+PRIME = 4294967311
+SEED = 20160101
+# 乘法散列常数（2^64 / 黄金分割比）
+MIX = 0x9E3779B97F4A7C15
+
+
+def dedupe_available():
+    return NUMPY_AVAILABLE
+
+
+def _np():
+    # numpy 在第一次计算时才导入（加载要0.1秒左右），打开数据库、搜索、统计等用不到它的命令不必等待
+    import numpy
+    return numpy
+
+
+def ensure_minhash(conn):
+    conn.execute(MINHASH_SCHEMA)
+    conn.commit()
+
+
+def shingle_text(title, option):
+    # 参与比较的文字：题干加全部选项，统一全角半角和大小写，去掉标点和空白
+    if isinstance(option, str):
+        try:
+            option = json.loads(option)
+        except ValueError:
+            option = [option]
+    text = normalize_text(title) + "".join(normalize_text(opt) for opt in option or [])
+    return STRIP_RE.sub('', text.lower())
+
+
+def permutations():
+    # 模拟 NUM_PERM 个随机排列的散列函数 (a*x + b) mod PRIME
+    np = _np()
+    rng = np.random.RandomState(SEED)
+    a = rng.randint(1, 2 ** 31, NUM_PERM).astype(np.uint64)
+    b = rng.randint(0, 2 ** 31, NUM_PERM).astype(np.uint64)
+    return a[:, None], b[:, None]
+
+
+def compute_signatures(texts, perms=None):
+    """批量计算签名，返回 len(texts) × NUM_PERM 的 uint32 数组
+
+    一批文字拼接成一个码点数组，所有片段的散列和 MinHash 都是整块的数组运算，
+    再按每道题的片段区间用 minimum.reduceat 取最小值。不足一个片段长度的题目补零后当作一个片段。
+    """
+    np = _np()
+    a, b = perms or permutations()
+    texts = [text.ljust(SHINGLE_SIZE, '\0') for text in texts]
+    lengths = np.array([len(text) for text in texts], dtype=np.int64)
+    codes = np.frombuffer("".join(texts).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    counts = lengths - SHINGLE_SIZE + 1
+    # 每道题的第 j 个片段从 offsets[i] + j 开始
+    starts = np.repeat(offsets - np.concatenate(([0], np.cumsum(counts)[:-1])), counts) + np.arange(counts.sum())
+    # 码点不超过21位，3个码点拼成一个不会冲突的整数，再混合成32位
+    values = np.zeros(len(starts), dtype=np.uint64)
+    for k in range(SHINGLE_SIZE):
+        values = (values << np.uint64(21)) | codes[starts + k]
+    hashed = (values * np.uint64(MIX)) >> np.uint64(32)
+    minhash = np.minimum.reduceat((a * hashed[None, :] + b) % np.uint64(PRIME),
+                                  np.concatenate(([0], np.cumsum(counts)[:-1])), axis=1)
+    return (minhash.T & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def update_signatures(conn, on_progress=None):
+    """为还没有签名或内容有变化的题目计算签名，并删除已删除题目的签名，返回新计算的数量
+
+    用题目的内容摘要判断签名是否过期，导入、同步、手工修改之后都只需要补算有变化的题目。
+    """
+    ensure_minhash(conn)
+    perms = permutations()
+    rows = conn.execute("SELECT t.id, t.title, t.option, t.digest FROM timu t LEFT JOIN timu_minhash m ON m.id = t.id "
+                        "WHERE m.id IS NULL OR m.digest IS NOT t.digest").fetchall()
+    for i in range(0, len(rows), SIGN_BATCH):
+        batch = rows[i:i + SIGN_BATCH]
+        sigs = compute_signatures([shingle_text(title, option) for _, title, option, _ in batch], perms)
+        conn.executemany("INSERT OR REPLACE INTO timu_minhash (id, digest, sig) VALUES (?, ?, ?)",
+                         [(row[0], row[3], sig.tobytes()) for row, sig in zip(batch, sigs)])
+        if on_progress is not None:
+            on_progress(i + len(batch), len(rows))
+    conn.execute("DELETE FROM timu_minhash WHERE NOT EXISTS (SELECT 1 FROM timu WHERE timu.id = timu_minhash.id)")
+    conn.commit()
+    return len(rows)
+
+
+def load_signatures(conn):
+    np = _np()
+    ids = []
+    blobs = []
+    for timu_id, sig in conn.execute("SELECT m.id, m.sig FROM timu_minhash m JOIN timu t ON t.id = m.id"):
+        ids.append(timu_id)
+        blobs.append(sig)
+    sigs = np.frombuffer(b"".join(blobs), dtype=np.uint32).reshape(len(ids), NUM_PERM)
+    return ids, sigs
+
+
+def band_keys(sigs, band):
+    # 一段签名合成一个64位整数作为桶号，溢出回绕不影响相等比较
+    np = _np()
+    keys = np.zeros(len(sigs), dtype=np.uint64)
+    for col in sigs[:, band * ROWS:(band + 1) * ROWS].T:
+        keys = keys * np.uint64(MIX) + col.astype(np.uint64)
+    return keys
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, i, j):
+        i, j = self.find(i), self.find(j)
+        if i != j:
+            self.parent[max(i, j)] = min(i, j)
+
+
+def find_clusters(conn, threshold=THRESHOLD, check_cancel=None):
+    """查找相似题目组，返回题目组列表，按组大小从大到小排列
+
+    每组是题目字典的列表：id、title、answer、analysis、source、similarity（与组内第一道题的估计相似度）。
+    每个桶里的题目只和桶内第一道题比较，一组相似题目在不同的段里会以不同的题目为代表，合起来仍能连成一组。
+    """
+    np = _np()
+    ids, sigs = load_signatures(conn)
+    n = len(ids)
+    groups = UnionFind(n)
+    for band in range(BANDS):
+        keys = band_keys(sigs, band)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        bounds = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [n]))
+        multi = ends - starts > 1
+        for start, end in zip(starts[multi], ends[multi]):
+            members = order[start:end]
+            first = members[0]
+            similar = (sigs[members[1:]] == sigs[first]).mean(axis=1) >= threshold
+            for member in members[1:][similar]:
+                groups.union(first, member)
+        if check_cancel is not None:
+            check_cancel()
+
+    # 只为多于一道题的组建立列表
+    roots = np.array([groups.find(i) for i in range(n)], dtype=np.int64)
+    sizes = np.bincount(roots, minlength=n)
+    clusters = {}
+    for i in np.flatnonzero(sizes[roots] > 1):
+        clusters.setdefault(roots[i], []).append(i)
+    return load_cluster_rows(conn, ids, sigs, list(clusters.values()))
+
+
+def load_cluster_rows(conn, ids, sigs, indexes):
+    member_ids = [ids[i] for members in indexes for i in members]
+    rows = {}
+    for i in range(0, len(member_ids), IN_CHUNK_SIZE):
+        chunk = member_ids[i:i + IN_CHUNK_SIZE]
+        placeholders = ",".join(["?"] * len(chunk))
+        for row in conn.execute(f"SELECT id, title, answer, analysis, source FROM timu WHERE id IN ({placeholders})", chunk):
+            rows[row[0]] = row
+    result = []
+    for members in indexes:
+        # 组内按来源、ID排列，第一道题作为合并时默认保留的题目
+        members.sort(key=lambda i: (rows[ids[i]][4] or '', ids[i]))
+        first = sigs[members[0]]
+        cluster = []
+        for i in members:
+            timu_id, title, answer, analysis, source = rows[ids[i]]
+            cluster.append({'id': timu_id, 'title': title, 'answer': answer, 'analysis': analysis, 'source': source,
+                            'similarity': round(float((sigs[i] == first).mean()), 3)})
+        result.append(cluster)
+    result.sort(key=lambda cluster: (-len(cluster), cluster[0]['id']))
+    return result
+
+
+def merge_cluster(conn, keep_id, remove_ids):
+    """合并一组相似题目：保留 keep_id，删除其余题目
+
+    保留的题目没有解析时，取被删除题目中最长的解析补上。返回删除的题目数。
+    """
+    remove_ids = [timu_id for timu_id in remove_ids if timu_id != keep_id]
+    title, option, answer, analysis = conn.execute("SELECT title, option, answer, analysis FROM timu WHERE id=?",
+                                                   (keep_id,)).fetchone()
+    if not (analysis or '').strip():
+        best = ''
+        for i in range(0, len(remove_ids), IN_CHUNK_SIZE):
+            chunk = remove_ids[i:i + IN_CHUNK_SIZE]
+            placeholders = ",".join(["?"] * len(chunk))
+            for (text,) in conn.execute(f"SELECT analysis FROM timu WHERE id IN ({placeholders})", chunk):
+                if text and len(text.strip()) > len(best):
+                    best = text.strip()
+        if best:
+            conn.execute("UPDATE timu SET analysis=?, digest=? WHERE id=?",
+                         (best, content_digest(title, option, answer, best), keep_id))
+    deleted = 0
+    for i in range(0, len(remove_ids), IN_CHUNK_SIZE):
+        chunk = remove_ids[i:i + IN_CHUNK_SIZE]
+        placeholders = ",".join(["?"] * len(chunk))
+        deleted += conn.execute(f"DELETE FROM timu WHERE id IN ({placeholders})", chunk).rowcount
+        conn.execute(f"DELETE FROM timu_minhash WHERE id IN ({placeholders})", chunk)
+    conn.commit()
+    return deleted
+
+
+def write_clusters(f, clusters, threshold=THRESHOLD):
+    # 相似题目组导出为JSON，便于人工核对或交给其他工具处理
+    json.dump({'threshold': threshold, 'count': len(clusters),
+               'clusters': [{'size': len(cluster), 'questions': cluster} for cluster in clusters]},
+              f, ensure_ascii=False, indent=2)
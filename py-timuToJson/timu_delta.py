@@ -0,0 +1,163 @@
+"""增量发布：题库只在第一次整体下载，之后 timu.html 只下载两次发布之间变化的题目
+
+发布目录中的文件：
+    manifest.json         最新的发布号、各来源的版本号、题目数、完整题库和补丁列表
+    base_000003.json      最新一次发布的完整题库（紧凑JSON数组），没有缓存或落后太多的浏览器下载它
+    patch_000003.json     从第2次发布到第3次发布的补丁：{"from": 2, "to": 3, "upsert": [题目...], "delete": [ID...]}
+
+每次发布时比较各来源在变更记录（timu_db.CHANGE_SCHEMA）中的版本号和上次发布时的版本号，
+版本号有变化的来源中，上次发布后变更过的题目按当前内容写进补丁：仍在题库中的整条写入 upsert，已不在的写入 delete。
+完整题库每次发布都重写（上一次的保留到下次发布，正在下载它的浏览器不受影响），补丁只保留最近 KEEP_PATCHES 个；
+浏览器缓存的发布号更早，或需要下载的补丁比完整题库还大时，直接下载完整题库。
+清单最后写入并整体替换，发布中途出错不会影响正在使用的旧版本。
+"""
+import json
+import os
+
+from timu_db import IN_CHUNK_SIZE
+from timu_export import EXPORT_COLUMNS, compact_record, json_value, write_export
+
+MANIFEST_NAME = 'manifest.json'
+DELTA_FORMAT = 'delta'
+DELTA_VERSION = 1
+# 保留的补丁个数
+KEEP_PATCHES = 30
+
+
+def base_name(release):
+    return f"base_{release:06d}.json"
+
+
+def patch_name(release):
+    return f"patch_{release:06d}.json"
+
+
+def read_manifest(out_dir):
+    # 读取上次发布的清单；目录中没有清单，或是其他导出方式（如分块导出）写的清单时返回 None
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != DELTA_FORMAT:
+        raise ValueError(f"{out_dir} 中已有其他格式的 {MANIFEST_NAME}，请换一个目录")
+    return manifest
+
+
+def source_versions(conn, sources=None):
+    # 各来源当前的版本号；sources 为空时取全部来源
+    if sources:
+        placeholders = ",".join(["?"] * len(sources))
+        rows = conn.execute(f"SELECT source, version FROM timu_versions WHERE source IN ({placeholders})",
+                            list(sources))
+    else:
+        rows = conn.execute("SELECT source, version FROM timu_versions")
+    return dict(rows)
+
+
+def changed_ids(conn, previous, current):
+    # 上次发布后有变更的题目ID（按来源的版本号比较）
+    ids = []
+    for source, version in current.items():
+        since = previous.get(source, 0)
+        if version > since:
+            ids.extend(row[0] for row in conn.execute(
+                "SELECT id FROM timu_changes WHERE source = ? AND version > ?", (source, since)))
+    return list(dict.fromkeys(ids))
+
+
+def current_rows(conn, ids, sources=None):
+    # 这些ID中仍在本题库（指定的来源）中的题目，按 rowid 排列，与完整题库中的顺序一致
+    rows = []
+    where = ""
+    params = []
+    if sources:
+        where = f" AND source IN ({','.join(['?'] * len(sources))})"
+        params = list(sources)
+    for i in range(0, len(ids), IN_CHUNK_SIZE):
+        chunk = ids[i:i + IN_CHUNK_SIZE]
+        rows.extend(conn.execute(f"SELECT rowid, {EXPORT_COLUMNS} FROM timu WHERE id IN ({','.join(['?'] * len(chunk))})"
+                                 f"{where}", chunk + params))
+    rows.sort()
+    return [row[1:] for row in rows]
+
+
+def write_patch(path, previous_release, release, rows, deleted):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f'{{"from":{previous_release},"to":{release},"upsert":[')
+        f.write(",".join(compact_record(row) for row in rows))
+        f.write('],"delete":[' + ",".join(json_value(timu_id) for timu_id in deleted) + ']}')
+
+
+def publish(conn, out_dir, sources=None, keep=KEEP_PATCHES, on_batch=None, metrics=None):
+    """把题库增量发布到 out_dir，返回 (清单, 本次是否有变化)
+
+    sources 为空时发布全部题目；同一个目录每次发布的来源应当相同，来源变化时重新整体发布。
+    on_batch、metrics 传给写完整题库的 write_export。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    sources = sorted(sources) if sources else None
+    previous = read_manifest(out_dir)
+    # 发布号在同一个目录中一直递增，来源变化后重新整体发布时也不会和浏览器缓存的旧发布号重复
+    last_release = previous['release'] if previous is not None else 0
+    if previous is not None and previous.get('sources') != sources:
+        previous = None
+
+    # 版本号、变更记录和完整题库在同一个读事务中读取，发布期间其他程序的修改留到下次发布
+    began = not conn.in_transaction
+    if began:
+        conn.execute("BEGIN")
+    written = []
+    try:
+        versions = source_versions(conn, sources)
+        if previous is not None and previous['versions'] == versions:
+            return previous, False
+
+        release = last_release + 1
+        patches = list(previous['patches']) if previous is not None else []
+        if previous is not None:
+            ids = changed_ids(conn, previous['versions'], versions)
+            rows = current_rows(conn, ids, sources)
+            present = {row[0] for row in rows}
+            deleted = [timu_id for timu_id in ids if timu_id not in present]
+            path = os.path.join(out_dir, patch_name(release))
+            written.append(path)
+            write_patch(path, previous['release'], release, rows, deleted)
+            patches.append({"file": patch_name(release), "from": previous['release'], "to": release,
+                            "size": os.path.getsize(path), "upsert": len(rows), "delete": len(deleted)})
+
+        path = os.path.join(out_dir, base_name(release))
+        written.append(path)
+        with open(path, 'w', encoding='utf-8') as f:
+            count = write_export(conn, f, sources=sources, on_batch=on_batch, metrics=metrics)
+        manifest = {
+            "format": DELTA_FORMAT,
+            "version": DELTA_VERSION,
+            "release": release,
+            "sources": sources,
+            "versions": versions,
+            "count": count,
+            "base": {"file": base_name(release), "size": os.path.getsize(path)},
+            "patches": patches[-keep:] if keep else [],
+        }
+        tmp_path = os.path.join(out_dir, MANIFEST_NAME + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, os.path.join(out_dir, MANIFEST_NAME))
+    except BaseException:
+        for path in written:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        if began:
+            conn.rollback()
+
+    # 清单已指向新文件，删除更早的完整题库和不再列出的补丁
+    keep_files = {manifest['base']['file']} | {patch['file'] for patch in manifest['patches']}
+    if previous is not None:
+        keep_files.add(previous['base']['file'])
+    for filename in os.listdir(out_dir):
+        if filename.startswith(('base_', 'patch_')) and filename.endswith('.json') and filename not in keep_files:
+            os.remove(os.path.join(out_dir, filename))
+    return manifest, True
@@ -0,0 +1,217 @@
+"""直接读取 Word 文档（.docx），按段落产出与 TXT 题库相同的文本行，交给 timu_parser.parse_timu 解析
+
+.docx 是一个 zip 包，正文在 word/document.xml 中。这里从 zip 中分块解压 document.xml，交给 expat
+边读边解析，不建立元素树，每读完一个段落就产出文本，文档再大内存占用也基本不变。
+- Word 自动编号（题号 "1."、选项 "A." 等）不在段落文字中，按 numbering.xml 的编号格式补出来，
+  效果与把文档内容复制到TXT中相同
+- 段落内的手动换行（w:br、w:cr）拆成多行，制表符保留为 \\t
+- 带下划线的空白（填空题的横线）转成同样长度的下划线 "_"，复制到TXT时它们会变成看不见的空格
+- 修订中删除的文字（w:delText）、域代码和文本框的兼容副本（mc:Fallback）不会重复读入
+"""
+import xml.etree.ElementTree as ET
+import zipfile
+from xml.parsers import expat
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+DOCUMENT_XML = 'word/document.xml'
+# 每次解压、解析的字节数
+READ_SIZE = 64 * 1024
+
+# expat 产出的标签名为 "命名空间}标签"（见 ParagraphReader 中的 namespace_separator），比 ElementTree 少一个 "{"
+XW = W[1:]
+P, R, T, U, VAL = XW + 'p', XW + 'r', XW + 't', XW + 'u', XW + 'val'
+NUM_ID, ILVL, P_STYLE = XW + 'numId', XW + 'ilvl', XW + 'pStyle'
+PARAGRAPH_PROPS = (NUM_ID, ILVL, P_STYLE)
+MC_FALLBACK = 'http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+# 文字块中代表特殊字符的元素：手动换行、回车、制表符和不间断连字符
+RUN_TEXT = {XW + 'br': '\n', XW + 'cr': '\n', XW + 'tab': '\t', XW + 'noBreakHyphen': '-'}
+
+# 编号后的分隔符，对应 w:suff，默认是制表符
+NUMBER_SUFFIX = {'tab': '\t', 'space': ' ', 'nothing': ''}
+
+
+def letters(n):
+    # 1 -> A, 26 -> Z, 27 -> AA，与 Word 的字母编号一致
+    return chr(65 + (n - 1) % 26) * ((n - 1) // 26 + 1)
+
+
+NUMBER_FORMATS = {
+    'decimal': str,
+    'upperLetter': letters,
+    'lowerLetter': lambda n: letters(n).lower(),
+}
+
+
+def attr(elem, name):
+    return elem.get(W + name) if elem is not None else None
+
+
+class Numbering:
+    """Word 自动编号：读取 numbering.xml 和 styles.xml，按段落的 (numId, ilvl) 计数并生成编号文字"""
+
+    def __init__(self, docx):
+        # numId -> {ilvl: (编号格式, 编号文字模板, 起始值, 分隔符)}
+        self.levels = {}
+        # 样式ID -> (numId, ilvl)，段落通过样式使用编号时用到
+        self.style_numbers = {}
+        # numId -> 各级当前的序号
+        self.counters = {}
+        names = set(docx.namelist())
+        if 'word/numbering.xml' in names:
+            self.load_numbering(ET.parse(docx.open('word/numbering.xml')).getroot())
+        if 'word/styles.xml' in names:
+            for style in ET.parse(docx.open('word/styles.xml')).getroot().iter(W + 'style'):
+                num_pr = style.find(f'{W}pPr/{W}numPr')
+                if num_pr is not None:
+                    self.style_numbers[attr(style, 'styleId')] = (attr(num_pr.find(W + 'numId'), 'val'),
+                                                                  attr(num_pr.find(W + 'ilvl'), 'val'))
+
+    def load_numbering(self, root):
+        abstract = {}
+        for abstract_num in root.iter(W + 'abstractNum'):
+            abstract[attr(abstract_num, 'abstractNumId')] = self.read_levels(abstract_num)
+        for num in root.iter(W + 'num'):
+            levels = dict(abstract.get(attr(num.find(W + 'abstractNumId'), 'val'), {}))
+            for override in num.iter(W + 'lvlOverride'):
+                ilvl = int(attr(override, 'ilvl') or 0)
+                start = attr(override.find(W + 'startOverride'), 'val')
+                if start is not None and ilvl in levels:
+                    levels[ilvl] = levels[ilvl][:2] + (int(start),) + levels[ilvl][3:]
+            self.levels[attr(num, 'numId')] = levels
+
+    @staticmethod
+    def read_levels(abstract_num):
+        levels = {}
+        for lvl in abstract_num.iter(W + 'lvl'):
+            levels[int(attr(lvl, 'ilvl') or 0)] = (
+                attr(lvl.find(W + 'numFmt'), 'val') or 'decimal',
+                attr(lvl.find(W + 'lvlText'), 'val') or '',
+                int(attr(lvl.find(W + 'start'), 'val') or 1),
+                NUMBER_SUFFIX.get(attr(lvl.find(W + 'suff'), 'val'), '\t'),
+            )
+        return levels
+
+    def label(self, num_id, ilvl, style):
+        """返回段落的编号文字（含分隔符），没有编号时返回空字符串
+
+        num_id、ilvl 来自段落自身的 w:numPr，没有时使用段落样式的编号；numId 为 0 表示取消编号。
+        """
+        if num_id is None and style in self.style_numbers:
+            num_id, style_ilvl = self.style_numbers[style]
+            ilvl = ilvl if ilvl is not None else style_ilvl
+        levels = self.levels.get(num_id)
+        ilvl = int(ilvl or 0)
+        if not levels or ilvl not in levels:
+            return ''
+        counters = self.counters.setdefault(num_id, {})
+        counters[ilvl] = counters[ilvl] + 1 if ilvl in counters else levels[ilvl][2]
+        # 上一级编号前进时，下级重新计数
+        for deeper in [level for level in counters if level > ilvl]:
+            del counters[deeper]
+        fmt, text, _, suffix = levels[ilvl]
+        if fmt == 'bullet':
+            return ''
+        for level, (level_fmt, _, start, _) in levels.items():
+            if f'%{level + 1}' in text:
+                value = counters.get(level, start)
+                text = text.replace(f'%{level + 1}', NUMBER_FORMATS.get(level_fmt, str)(value))
+        return text + suffix
+
+
+def iter_docx_lines(docx_file, on_read=None):
+    """逐段落读取 Word 文档的文字，产出文本行（不含换行符）
+
+    docx_file 可以是文件路径或二进制文件对象。on_read(已解压字节数, 总字节数) 用于汇报进度。
+    """
+    with zipfile.ZipFile(docx_file) as docx:
+        numbering = Numbering(docx)
+        total = docx.getinfo(DOCUMENT_XML).file_size
+        reader = ParagraphReader(numbering)
+        done = 0
+        with docx.open(DOCUMENT_XML) as f:
+            for chunk in iter(lambda: f.read(READ_SIZE), b''):
+                reader.parser.Parse(chunk, False)
+                done += len(chunk)
+                if on_read is not None:
+                    on_read(done, total)
+                yield from reader.take_lines()
+            reader.parser.Parse(b'', True)
+            yield from reader.take_lines()
+
+
+class ParagraphReader:
+    """用 expat 按 SAX 方式解析 document.xml，不建立元素树；每读完一个段落，把它的文字放进 lines
+
+    文本框中的段落嵌套在外层段落里，所以段落用栈保存：每个段落记录文字、编号属性，
+    以及各层文字块（w:r）是否带下划线。
+    """
+
+    def __init__(self, numbering):
+        self.numbering = numbering
+        self.lines = []
+        self.paragraphs = []
+        # 处在 mc:Fallback 中的层数，这部分内容是 mc:Choice 的副本
+        self.fallback = 0
+        # 正在读取的 w:t 的文字
+        self.text = None
+        self.parser = expat.ParserCreate(namespace_separator='}')
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+        self.parser.CharacterDataHandler = self.data
+
+    def take_lines(self):
+        lines = self.lines
+        self.lines = []
+        return lines
+
+    def start(self, tag, attrs):
+        if tag == MC_FALLBACK:
+            self.fallback += 1
+        if self.fallback:
+            return
+        if tag == P:
+            self.paragraphs.append(([], {}, []))
+        elif not self.paragraphs:
+            return
+        texts, props, runs = self.paragraphs[-1]
+        if tag == R:
+            runs.append(False)
+        elif not runs:
+            if tag in PARAGRAPH_PROPS:
+                # 段落属性：编号和样式
+                props[tag] = attrs.get(VAL)
+        elif tag == T:
+            self.text = []
+        elif tag == U:
+            # 段落属性中的下划线只作用于段落标记，所以只看文字块中的
+            runs[-1] = attrs.get(VAL) != 'none'
+        elif tag in RUN_TEXT:
+            text = RUN_TEXT[tag]
+            if runs[-1] and text == '\t':
+                text = '____'
+            texts.append(text)
+
+    def data(self, text):
+        if self.text is not None:
+            self.text.append(text)
+
+    def end(self, tag):
+        if tag == MC_FALLBACK:
+            self.fallback -= 1
+            return
+        if self.fallback or not self.paragraphs:
+            return
+        if tag == P:
+            texts, props, _ = self.paragraphs.pop()
+            label = self.numbering.label(props.get(NUM_ID), props.get(ILVL), props.get(P_STYLE))
+            self.lines.extend((label + ''.join(texts)).split('\n'))
+        elif tag == R:
+            self.paragraphs[-1][2].pop()
+        elif tag == T and self.text is not None:
+            text = ''.join(self.text)
+            self.text = None
+            runs = self.paragraphs[-1][2]
+            if runs and runs[-1] and text and not text.strip():
+                text = '_' * len(text)
+            self.paragraphs[-1][0].append(text)
@@ -0,0 +1,266 @@
+import json
+import os
+import re
+from json.encoder import encode_basestring
+
+# 导出格式
+EXPORT_PRETTY = 'pretty'    # 缩进4格，与旧版导出的文件完全相同
+EXPORT_COMPACT = 'compact'  # 不带缩进的JSON数组，体积最小，适合 timu.html 下载
+EXPORT_NDJSON = 'ndjson'    # 每行一道题目的JSON对象，便于其他程序逐行读取
+
+EXPORT_BINARY = 'tmb'       # 二进制列式题库，由 timu_binfmt 编码
+
+# write_export 支持的文本格式
+EXPORT_FORMATS = [EXPORT_PRETTY, EXPORT_COMPACT, EXPORT_NDJSON]
+
+# 每次从游标取出的行数
+FETCH_SIZE = 2000
+
+EXPORT_COLUMNS = "id, title, option, answer, analysis"
+
+
+def export_query(sources=None, columns=EXPORT_COLUMNS):
+    # 导出全部题目，或只导出指定来源的题目（走 source 索引）
+    if sources:
+        placeholders = ",".join(["?"] * len(sources))
+        return f"SELECT {columns} FROM timu WHERE source IN ({placeholders})", list(sources)
+    return f"SELECT {columns} FROM timu", []
+
+
+def count_export_rows(conn, sources=None):
+    # 题目数直接从触发器维护的来源汇总表（timu_source_summary）中读取，不扫描题目表
+    if sources:
+        placeholders = ",".join(["?"] * len(sources))
+        sql, params = f"SELECT SUM(questions) FROM timu_source_summary WHERE source IN ({placeholders})", list(sources)
+    else:
+        sql, params = "SELECT SUM(questions) FROM timu_source_summary", []
+    return conn.execute(sql, params).fetchone()[0] or 0
+
+
+def iter_export_batches(conn, sources=None, fetch_size=FETCH_SIZE, columns=EXPORT_COLUMNS):
+    # 按 fetchmany 分批读取，内存占用只和批次大小有关
+    sql, params = export_query(sources, columns)
+    cursor = conn.execute(sql, params)
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def json_value(value):
+    if value is None:
+        return 'null'
+    if isinstance(value, str):
+        return encode_basestring(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+# 字符串组成的JSON数组（json.dumps 写出的格式），匹配的选项可以原样拼进输出
+JSON_STRING = r'"[^"\\\x00-\x1f]*(?:\\(?:["\\/bfnrt]|u[0-9a-fA-F]{4})[^"\\\x00-\x1f]*)*"'
+VALID_OPTION = re.compile(rf'\[(?:{JSON_STRING}(?:, ?{JSON_STRING})*)?\]')
+
+
+def option_list(option):
+    """把题目的选项统一成列表：列表原样返回，JSON数组文本解码；
+    其他字符串（如 "[A. yes, B. no]"）作为唯一的一个选项，空值为没有选项"""
+    if option is None:
+        return []
+    if isinstance(option, list):
+        return option
+    if isinstance(option, str):
+        if not option.strip():
+            return []
+        try:
+            value = json.loads(option)
+        except ValueError:
+            return [option]
+        return value if isinstance(value, list) else [option]
+    return [option]
+
+
+def option_text(option):
+    # 库中保存的选项是JSON数组文本，确认格式正确时直接拼进输出，不再解码、重新编码；
+    # 其他程序写入的不规范内容解码后重新编码，无法解析时按没有选项处理，保证导出的文件总是合法的JSON
+    if option and VALID_OPTION.fullmatch(option):
+        return option
+    try:
+        options = json.loads(option) if option else []
+    except ValueError:
+        return '[]'
+    return json.dumps(options, ensure_ascii=False) if isinstance(options, list) else '[]'
+
+
+def compact_record(row):
+    return (f'{{"id":{json_value(row[0])},"title":{json_value(row[1])},"option":{option_text(row[2])},'
+            f'"answer":{json_value(row[3])},"analysis":{json_value(row[4])}}}')
+
+
+def pretty_record(row):
+    # 缩进格式需要重新排版选项，这里仍然解码选项
+    try:
+        options = json.loads(row[2])
+    except:
+        options = []
+    record = {
+        "id": row[0],
+        "title": row[1],
+        "option": options,
+        "answer": row[3],
+        "analysis": row[4]
+    }
+    # 数组元素比对象本身多缩进一级
+    return "    " + json.dumps(record, ensure_ascii=False, indent=4).replace("\n", "\n    ")
+
+
+def timed_batches(batches, metrics=None):
+    # 传入 timu_metrics.Metrics 时，把从数据库取每一批的耗时记为"读取数据库"阶段
+    return batches if metrics is None else metrics.iterate(batches, '读取数据库')
+
+
+def write_export(conn, f, fmt=EXPORT_COMPACT, sources=None, fetch_size=FETCH_SIZE, on_batch=None, metrics=None):
+    """把题目逐批写入已打开的文本文件 f，返回导出的题目数量
+
+    on_batch(已导出数量) 在每批写完后调用，可用于汇报进度或中途取消。
+    metrics 为 timu_metrics.Metrics 时分开统计读取数据库和写文件的耗时。
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {fmt}")
+    count = 0
+    if fmt == EXPORT_NDJSON:
+        for rows in timed_batches(iter_export_batches(conn, sources, fetch_size), metrics):
+            f.write("".join(compact_record(row) + "\n" for row in rows))
+            count += len(rows)
+            if on_batch is not None:
+                on_batch(count)
+        return count
+
+    if fmt == EXPORT_PRETTY:
+        record, separator, opening, closing = pretty_record, ",\n", "[\n", "\n]"
+    else:
+        record, separator, opening, closing = compact_record, ",", "[", "]"
+    for rows in timed_batches(iter_export_batches(conn, sources, fetch_size), metrics):
+        f.write((opening if count == 0 else separator) + separator.join(record(row) for row in rows))
+        count += len(rows)
+        if on_batch is not None:
+            on_batch(count)
+    f.write(closing if count else "[]")
+    return count
+
+
+# 分块导出时每块的题目数
+CHUNK_QUESTIONS = 500
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'index.json'
+MANIFEST_VERSION = 1
+
+# 与 timu.html 中的题型判断一致
+TYPE_SINGLE = '单选'
+TYPE_MULTIPLE = '多选'
+TYPE_BLANK = '填空'
+TYPE_ESSAY = '简答'
+QUESTION_TYPES = [TYPE_SINGLE, TYPE_MULTIPLE, TYPE_BLANK, TYPE_ESSAY]
+
+
+# 简答题答案的最短字数，更短的没有选项的题目算填空题
+ESSAY_ANSWER_LENGTH = 17
+
+
+def option_count(option):
+    # 选项个数，option 为列表或库中保存的JSON文本，无法解析时按没有选项处理
+    if isinstance(option, list):
+        return len(option)
+    try:
+        option = json.loads(option)
+    except (TypeError, ValueError):
+        return 0
+    return len(option) if isinstance(option, list) else 0
+
+
+def qtype_of(options, answer_len):
+    # 按选项个数和答案长度判断题型，与库中 qtype 列的计算方式相同
+    if options:
+        return TYPE_SINGLE if answer_len == 1 else TYPE_MULTIPLE
+    return TYPE_ESSAY if answer_len >= ESSAY_ANSWER_LENGTH else TYPE_BLANK
+
+
+def question_type(option, answer):
+    return qtype_of(option_count(option), len(answer or ""))
+
+
+def chunk_name(number):
+    return f"chunk_{number:05d}.json"
+
+
+def write_chunked_export(conn, out_dir, chunk_size=CHUNK_QUESTIONS, sources=None, fetch_size=FETCH_SIZE, on_batch=None,
+                         metrics=None):
+    """把题目按固定题数切成多个紧凑JSON文件，并写出清单，供 timu.html 按需加载
+
+    out_dir 中生成：
+        chunk_00000.json ...  每块最多 chunk_size 道题目的JSON数组
+        index.json            题目ID -> 块序号
+        manifest.json         总题数、各块的起止位置和题数、各题型数量、索引文件名
+    清单最后写入，中途失败或取消时会删除已写出的文件。返回清单内容。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    chunks = []
+    types = dict.fromkeys(QUESTION_TYPES, 0)
+    written = []
+    count = 0
+    chunk_file = None
+    index_path = os.path.join(out_dir, INDEX_NAME)
+    try:
+        written.append(index_path)
+        with open(index_path, 'w', encoding='utf-8') as index_file:
+            index_file.write("{")
+            # 题型在导入时已经算好保存在 qtype 列中
+            batches = iter_export_batches(conn, sources, fetch_size, EXPORT_COLUMNS + ", qtype")
+            for rows in timed_batches(batches, metrics):
+                for row in rows:
+                    if count % chunk_size == 0:
+                        if chunk_file is not None:
+                            chunk_file.write("]")
+                            chunk_file.close()
+                        chunk = {"file": chunk_name(len(chunks)), "start": count, "count": 0,
+                                 "types": dict.fromkeys(QUESTION_TYPES, 0)}
+                        chunks.append(chunk)
+                        path = os.path.join(out_dir, chunk["file"])
+                        written.append(path)
+                        chunk_file = open(path, 'w', encoding='utf-8')
+                        chunk_file.write("[")
+                    else:
+                        chunk_file.write(",")
+                    chunk_file.write(compact_record(row))
+                    qtype = row[5] or question_type(row[2], row[3])
+                    chunk["types"][qtype] += 1
+                    chunk["count"] += 1
+                    types[qtype] += 1
+                    index_file.write(("," if count else "") + f"{json_value(row[0])}:{len(chunks) - 1}")
+                    count += 1
+                if on_batch is not None:
+                    on_batch(count)
+            index_file.write("}")
+        if chunk_file is not None:
+            chunk_file.write("]")
+            chunk_file.close()
+            chunk_file = None
+
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "count": count,
+            "chunk_size": chunk_size,
+            "types": types,
+            "index": INDEX_NAME,
+            "chunks": chunks,
+        }
+        manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+        return manifest
+    except BaseException:
+        if chunk_file is not None:
+            chunk_file.close()
+        for path in written:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
@@ -0,0 +1,85 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from timu_parser import parse_timu_file, parse_timu_range
+
+# 支持的文件类型
+SUPPORTED_EXTENSIONS = ['.txt', '.docx', '.json']
+# 按题目模板格式解析的文件类型，其余的按JSON读取
+TEXT_EXTENSIONS = ('.txt', '.docx')
+# 不导入的文件名前缀：Word 打开文档时生成的锁文件（~$名称.docx）和隐藏文件
+IGNORED_PREFIXES = ('~$', '.')
+
+
+def is_bank_file(filename):
+    # 文件夹中需要导入的题库文件：支持的扩展名，并且不是锁文件或隐藏文件
+    return (not filename.startswith(IGNORED_PREFIXES)
+            and os.path.splitext(filename)[1].lower() in SUPPORTED_EXTENSIONS)
+
+
+# 超过这个大小的TXT文件会被切成多块并行解析
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+def plan_folder_tasks(folder_path, chunk_size=CHUNK_SIZE):
+    """把文件夹中的文件拆成解析任务：每个文件一个任务，大TXT文件按字节范围切成多个任务
+
+    返回 (任务列表, 每个文件的任务数)，任务格式为 (文件路径, 扩展名, 起始字节, 结束字节)。
+    """
+    tasks = []
+    task_counts = {}
+    for filename in sorted(os.listdir(folder_path)):
+        if not is_bank_file(filename):
+            continue
+        file_ext = os.path.splitext(filename)[1].lower()
+        file_path = os.path.join(folder_path, filename)
+        size = os.path.getsize(file_path)
+        if file_ext == '.txt' and size > chunk_size:
+            ranges = [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)]
+        else:
+            ranges = [(0, size)]
+        for start, end in ranges:
+            tasks.append((file_path, file_ext, start, end))
+        task_counts[file_path] = len(ranges)
+    return tasks, task_counts
+
+
+def parse_task(task):
+    # 在子进程中执行：解析一个文件（或文件的一块），返回题目列表
+    file_path, file_ext, start, end = task
+    if file_ext == '.txt':
+        return list(parse_timu_range(file_path, start, end))
+    if file_ext == '.docx':
+        return list(parse_timu_file(file_path))
+    with open(file_path, 'r', encoding='UTF-8') as f:
+        return json.load(f)
+
+
+def parallel_parse_folder(folder_path, max_workers=None):
+    """用进程池并行解析文件夹，按完成顺序产出解析结果
+
+    每个结果为 (文件路径, 扩展名, 题目列表, 异常, 该文件是否已全部解析完)，
+    写数据库由调用方在单个连接上完成。
+    """
+    tasks, task_counts = plan_folder_tasks(folder_path)
+    if not tasks:
+        return
+    remaining = dict(task_counts)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(parse_task, task): task for task in tasks}
+        try:
+            for future in as_completed(futures):
+                file_path, file_ext = futures[future][:2]
+                remaining[file_path] -= 1
+                try:
+                    records = future.result()
+                    error = None
+                except Exception as e:
+                    records = []
+                    error = e
+                yield file_path, file_ext, records, error, remaining[file_path] == 0
+        finally:
+            # 调用方中途停止（例如任务被取消）时，不再等待尚未开始的解析任务
+            for future in futures:
+                future.cancel()
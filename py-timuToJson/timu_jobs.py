@@ -0,0 +1,222 @@
+import queue
+import threading
+import time
+
+from timu_metrics import Metrics
+
+# 任务状态
+JOB_PENDING = '等待中'
+JOB_RUNNING = '运行中'
+JOB_DONE = '已完成'
+JOB_CANCELLED = '已取消'
+JOB_FAILED = '失败'
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """一个后台任务（导入或导出）
+
+    任务函数通过 report 汇报进度，通过 check_cancel 响应取消；
+    进度以事件的形式放入 JobManager 的队列，由界面线程轮询读取。
+    metrics（timu_metrics.Metrics）记录各阶段的耗时和计数，任务结束后可以保存为报告。
+    """
+
+    def __init__(self, job_id, name, func, args, kwargs, events):
+        self.id = job_id
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.events = events
+        self.status = JOB_PENDING
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.progress = {}
+        self.metrics = Metrics(name)
+        self._cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def start(self):
+        self.status = JOB_RUNNING
+        self.started = time.time()
+        self.metrics.begin()
+
+    def finish(self, status):
+        self.status = status
+        self.finished = time.time()
+        self.metrics.status = status
+
+    def check_cancel(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0
+        return (self.finished or time.time()) - self.started
+
+    def report(self, **progress):
+        """汇报进度，可用的字段：
+
+        message     当前状态说明
+        bytes_done / bytes_total    已读取 / 总字节数
+        files_done / files_total    已处理 / 总文件数
+        items_done / items_total    已处理 / 总题目数
+        rows        已写入的行数
+        根据这些字段计算每秒行数和预计剩余时间。
+        """
+        self.progress.update(progress)
+        elapsed = self.elapsed
+        rows = self.progress.get('rows', 0)
+        self.progress['rows_per_sec'] = rows / elapsed if elapsed > 0 else 0
+        fraction = None
+        for unit in ('bytes', 'files', 'items'):
+            if self.progress.get(unit + '_total'):
+                fraction = self.progress.get(unit + '_done', 0) / self.progress[unit + '_total']
+                break
+        if fraction:
+            self.progress['eta'] = elapsed * (1 - fraction) / fraction
+        self.events.put(('progress', self, dict(self.progress)))
+
+
+def read_only(func):
+    # 标记不修改数据库的任务函数：后台执行时借用只读连接，不占用写连接
+    func.read_only = True
+    return func
+
+
+class JobManager:
+    """后台任务管理：任务按提交顺序在一个工作线程上依次执行
+
+    数据库连接从 storage（timu_storage.Storage）中取得：标记为 read_only 的任务使用只读连接，
+    其余任务使用写连接，执行期间界面线程的修改会等到任务结束。
+    界面线程通过 poll() 取出进度和结束事件，事件格式为 (类型, 任务, 数据)，
+    类型为 'start'、'progress' 或 'done'。
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.events = queue.Queue()
+        self.history = []
+        self._pending = queue.Queue()
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, name, func, *args, **kwargs):
+        # func 的签名为 func(job, conn, *args, **kwargs)，返回值保存在 job.result
+        with self._lock:
+            job = Job(self._next_id, name, func, args, kwargs, self.events)
+            self._next_id += 1
+            self.history.append(job)
+        self._pending.put(job)
+        return job
+
+    def cancel(self, job=None):
+        # 取消指定任务；不指定时取消所有未结束的任务
+        jobs = [job] if job is not None else self.active_jobs()
+        for item in jobs:
+            item.cancel()
+
+    def active_jobs(self):
+        return [job for job in self.history if job.status in (JOB_PENDING, JOB_RUNNING)]
+
+    def poll(self):
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def shutdown(self):
+        self.cancel()
+        self._pending.put(None)
+
+    def _run(self):
+        while True:
+            job = self._pending.get()
+            if job is None:
+                return
+            if job.cancelled:
+                job.status = JOB_CANCELLED
+                job.finished = time.time()
+                self.events.put(('done', job, None))
+                continue
+            job.start()
+            self.events.put(('start', job, None))
+            status = JOB_FAILED
+            try:
+                with job.metrics.profiling(), self.storage.connection(getattr(job.func, 'read_only', False)) as conn:
+                    job.result = job.func(job, conn, *job.args, **job.kwargs)
+                status = JOB_DONE
+            except JobCancelled:
+                status = JOB_CANCELLED
+            except Exception as e:
+                job.error = e
+            finally:
+                job.finish(status)
+            self.events.put(('done', job, None))
+
+
+class CallbackEvents:
+    # 在当前线程直接执行任务时使用：进度事件直接交给回调，不经过队列
+    def __init__(self, callback=None):
+        self.callback = callback
+
+    def put(self, event):
+        kind, job, progress = event
+        if kind == 'progress' and self.callback is not None:
+            self.callback(progress)
+
+
+def run_job(name, func, conn, *args, on_progress=None, **kwargs):
+    """在当前线程中同步执行任务函数，用于命令行等没有界面的场合
+
+    func 的签名与 JobManager.submit 相同，返回任务结果；出错时直接抛出异常。
+    on_progress(进度字典) 在每次汇报进度时调用。
+    结束后（包括出错时）按 timu_metrics.settings 保存性能报告，结果中的 metrics 为该任务的 Metrics。
+    """
+    job = Job(0, name, func, args, kwargs, CallbackEvents(on_progress))
+    job.start()
+    status = JOB_FAILED
+    try:
+        with job.metrics.profiling():
+            job.result = func(job, conn, *args, **kwargs)
+        status = JOB_DONE
+    except JobCancelled:
+        status = JOB_CANCELLED
+        raise
+    except Exception as e:
+        job.error = e
+        raise
+    finally:
+        job.finish(status)
+        job.metrics.save()
+    if isinstance(job.result, dict):
+        job.result['metrics'] = job.metrics
+    return job.result
+
+
+def format_progress(progress):
+    # 把进度字典格式化成状态栏文字：当前状态、已写入行数、速度和预计剩余时间
+    parts = [progress.get('message', "")]
+    if progress.get('rows'):
+        parts.append(f"已写入 {progress['rows']} 行，{progress['rows_per_sec']:.0f} 行/秒")
+    if progress.get('eta') is not None:
+        parts.append(f"预计剩余 {progress['eta']:.0f} 秒")
+    return "  ".join(part for part in parts if part)
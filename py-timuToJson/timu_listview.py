@@ -0,0 +1,266 @@
+from timu_analytics import SORT_COLUMNS
+from timu_search import SEARCH_LIMIT, search_timu
+
+# 每次从数据库取的行数
+PAGE_SIZE = 200
+# Treeview 中最多保留几页，超出的部分从另一端丢弃
+WINDOW_PAGES = 5
+# 滚动到距离边缘多近时加载下一页
+PREFETCH_MARGIN = 0.1
+# 列表中题目最多显示的字数
+TITLE_LENGTH = 50
+
+LIST_COLUMNS = "id, title, answer, source, create_time"
+
+
+class AllTimuSource:
+    """全部题目，按 (create_time, id) 倒序做键集分页，翻页代价和题库大小无关"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def count(self):
+        # 题目总数从来源汇总表中读取，不扫描题目表
+        return self.conn.execute("SELECT ifnull(SUM(questions), 0) FROM timu_source_summary").fetchone()[0]
+
+    def key(self, row, position):
+        return (row[4], row[0])
+
+    def fetch_after(self, key, limit):
+        # 取排在 key 之后（更早创建）的 limit 行
+        if key is None:
+            return self.conn.execute(
+                f"SELECT {LIST_COLUMNS} FROM timu ORDER BY create_time DESC, id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return self.conn.execute(
+            f"SELECT {LIST_COLUMNS} FROM timu WHERE (create_time, id) < (?, ?) "
+            "ORDER BY create_time DESC, id DESC LIMIT ?", (key[0], key[1], limit)
+        ).fetchall()
+
+    def fetch_before(self, key, limit):
+        # 取排在 key 之前（更晚创建）的 limit 行，按列表顺序返回
+        rows = self.conn.execute(
+            f"SELECT {LIST_COLUMNS} FROM timu WHERE (create_time, id) > (?, ?) "
+            "ORDER BY create_time, id LIMIT ?", (key[0], key[1], limit)
+        ).fetchall()
+        rows.reverse()
+        return rows
+
+
+class SearchSource:
+    """搜索结果，按相关度排序，用结果序号做偏移分页，总数不超过 limit"""
+
+    # 分页键是结果序号，删除一行后其后各行的键要减一
+    positional = True
+
+    def __init__(self, conn, keyword, limit=SEARCH_LIMIT):
+        self.conn = conn
+        self.keyword = keyword
+        self.limit = limit
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = len(search_timu(self.conn, self.keyword, self.limit))
+        return self._count
+
+    def key(self, row, position):
+        return position
+
+    def fetch_after(self, key, limit):
+        offset = 0 if key is None else key + 1
+        limit = min(limit, self.limit - offset)
+        if limit <= 0:
+            return []
+        return search_timu(self.conn, self.keyword, limit, offset)
+
+    def fetch_before(self, key, limit):
+        offset = max(0, key - limit)
+        return search_timu(self.conn, self.keyword, key - offset, offset)
+
+
+class StatsSource:
+    """按答题统计（timu_stats 表）的某一列排序，只列出有该项统计的题目，按 (该列, id) 做键集分页"""
+
+    def __init__(self, conn, column, descending=True):
+        if column not in SORT_COLUMNS:
+            raise ValueError(f"不能按 {column} 排序")
+        self.conn = conn
+        self.column = column
+        self.descending = descending
+
+    def count(self):
+        return self.conn.execute(f"SELECT COUNT(*) FROM timu_stats s JOIN timu t ON t.id = s.id "
+                                 f"WHERE s.{self.column} IS NOT NULL").fetchone()[0]
+
+    def key(self, row, position):
+        return (row[4], row[0])
+
+    def _fetch(self, key, limit, forward):
+        # forward 为真时按列表顺序取 key 之后的行，否则反向取 key 之前的行
+        descending = self.descending == forward
+        order = "DESC" if descending else "ASC"
+        sql = (f"SELECT t.id, t.title, t.answer, t.source, s.{self.column}, s.error_rate, s.discrimination, s.attempts "
+               f"FROM timu_stats s JOIN timu t ON t.id = s.id WHERE s.{self.column} IS NOT NULL")
+        params = []
+        if key is not None:
+            sql += f" AND (s.{self.column}, s.id) {'<' if descending else '>'} (?, ?)"
+            params.extend(key)
+        sql += f" ORDER BY s.{self.column} {order}, s.id {order} LIMIT ?"
+        params.append(limit)
+        return self.conn.execute(sql, params).fetchall()
+
+    def fetch_after(self, key, limit):
+        return self._fetch(key, limit, True)
+
+    def fetch_before(self, key, limit):
+        rows = self._fetch(key, limit, False)
+        rows.reverse()
+        return rows
+
+
+def format_stat(value, digits=2):
+    return "" if value is None else f"{value:.{digits}f}"
+
+
+def list_values(row):
+    # Treeview 中显示的列：ID、截断后的题目、答案、来源；按答题统计排序时还有错误率、区分度和作答次数
+    title = row[1] or ""
+    title = title[:TITLE_LENGTH] + "..." if len(title) > TITLE_LENGTH else title
+    values = (row[0], title.replace("\n", " "), row[2], row[3])
+    if len(row) >= 8:
+        values += (format_stat(row[5]), format_stat(row[6]), row[7])
+    return values
+
+
+class PagedTreeModel:
+    """只在 Treeview 中保留一个窗口的行，随滚动按页加载、丢弃
+
+    窗口内的每一行都记录了它在数据源中的分页键，向下滚动时从最后一行的键往后取，
+    向上滚动时从第一行的键往前取，因此不需要 OFFSET，也不需要一次性读出全部题目。
+    Treeview 中每一行的 iid 就是题目ID，选中行后可以直接拿 iid 查询题目。
+    """
+
+    def __init__(self, tree, page_size=PAGE_SIZE, window_pages=WINDOW_PAGES):
+        self.tree = tree
+        self.page_size = page_size
+        self.window_pages = window_pages
+        self.source = None
+        self.total = 0
+        # 窗口内各行的 (iid, 分页键)，与 Treeview 中的顺序一致
+        self.keys = []
+        # 窗口第一行在整个列表中的序号
+        self.first_position = 0
+        self.loading = False
+
+    def reset(self, source):
+        self.source = source
+        self.keys = []
+        self.first_position = 0
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self.total = source.count()
+        self._append(source.fetch_after(None, self.page_size))
+        self.tree.yview_moveto(0)
+
+    def on_scroll(self, first, last):
+        # 由 Treeview 的 yscrollcommand 调用，接近底部或顶部时加载相邻的一页
+        if self.loading or self.source is None or not self.keys:
+            return
+        first, last = float(first), float(last)
+        if last >= 1 - PREFETCH_MARGIN and self.first_position + len(self.keys) < self.total:
+            self.load_next()
+        elif first <= PREFETCH_MARGIN and self.first_position > 0:
+            self.load_prev()
+
+    def load_next(self):
+        rows = self.source.fetch_after(self.keys[-1][1], self.page_size)
+        if not rows:
+            self.total = self.first_position + len(self.keys)
+            return
+        self.loading = True
+        try:
+            top = self._top_index()
+            self._append(rows)
+            removed = self._trim(from_top=True)
+            self._restore_top(top - removed)
+        finally:
+            self.loading = False
+
+    def load_prev(self):
+        rows = self.source.fetch_before(self.keys[0][1], self.page_size)
+        if not rows:
+            self.first_position = 0
+            return
+        self.loading = True
+        try:
+            top = self._top_index()
+            self._prepend(rows)
+            self._trim(from_top=False)
+            self._restore_top(top + len(rows))
+        finally:
+            self.loading = False
+
+    def refresh(self):
+        # 数据变化后从头重新加载当前数据源
+        if self.source is not None:
+            self.reset(self.source)
+
+    def remove(self, iid):
+        # 删除一行后原地更新窗口，不重新加载；返回是否在窗口中
+        for index, (row_iid, _) in enumerate(self.keys):
+            if row_iid == iid:
+                break
+        else:
+            return False
+        del self.keys[index]
+        if getattr(self.source, 'positional', False):
+            self.keys[index:] = [(row_iid, key - 1) for row_iid, key in self.keys[index:]]
+        self.tree.delete(iid)
+        self.total = max(0, self.total - 1)
+        return True
+
+    def update(self, iid, column, value):
+        # 修改题目后只更新这一行的某一列
+        if self.tree.exists(iid):
+            values = list(self.tree.item(iid, 'values'))
+            values[column] = value
+            self.tree.item(iid, values=values)
+
+    def _append(self, rows):
+        position = self.first_position + len(self.keys)
+        for i, row in enumerate(rows):
+            iid = self.tree.insert("", "end", iid=row[0], values=list_values(row))
+            self.keys.append((iid, self.source.key(row, position + i)))
+
+    def _prepend(self, rows):
+        self.first_position -= len(rows)
+        if self.first_position < 0:
+            self.first_position = 0
+        new_keys = []
+        for i, row in enumerate(rows):
+            iid = self.tree.insert("", i, iid=row[0], values=list_values(row))
+            new_keys.append((iid, self.source.key(row, self.first_position + i)))
+        self.keys = new_keys + self.keys
+
+    def _trim(self, from_top):
+        # 超出窗口的行从另一端删除，返回删除的行数
+        excess = len(self.keys) - self.page_size * self.window_pages
+        if excess <= 0:
+            return 0
+        if from_top:
+            removed, self.keys = self.keys[:excess], self.keys[excess:]
+            self.first_position += excess
+        else:
+            removed, self.keys = self.keys[-excess:], self.keys[:-excess]
+        self.tree.delete(*[iid for iid, _ in removed])
+        return excess
+
+    def _top_index(self):
+        first = self.tree.yview()[0]
+        return int(round(first * len(self.keys)))
+
+    def _restore_top(self, index):
+        if self.keys:
+            self.tree.yview_moveto(max(0, index) / len(self.keys))
@@ -1,36 +1,90 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+import argparse
 import sqlite3
-import re
 import time
-import random
-import json
 import os
 
+from timu_core import DB_PATH
+from timu_db import BATCH_SIZE, content_digest
+from timu_dedupe import merge_cluster, write_clusters
+from timu_export import CHUNK_QUESTIONS, EXPORT_BINARY, EXPORT_COMPACT, EXPORT_NDJSON, EXPORT_PRETTY, QUESTION_TYPES
+from timu_jobs import JOB_CANCELLED, JOB_DONE, JOB_FAILED, JobManager, format_progress
+from timu_analytics import source_stats
+from timu_cache import CACHE_RECORDS, CACHE_ROWS, CachedSource, TimuCache
+from timu_metrics import PROFILE_KINDS, settings as metrics_settings
+from timu_listview import AllTimuSource, PagedTreeModel, SearchSource, StatsSource, format_stat
+from timu_search import SEARCH_LIMIT
+from timu_paper import DEFAULT_ROOT
+from timu_storage import Storage, WriterBusy, is_busy_error, retry_busy
+from timu_tasks import (analyze_answers, export_chunks, export_delta, export_json, find_duplicates, generate_papers,
+                        import_folder, import_json, import_txt, paper_conflicts, sync_folder)
+
+# 界面线程检查后台任务进度的间隔（毫秒）
+POLL_INTERVAL = 100
+# 进度显示在导出标签页的任务
+EXPORT_TASKS = (export_json, export_chunks, export_delta, generate_papers)
+# 进度显示在题目管理标签页、不修改题目的任务
+MANAGE_TASKS = (find_duplicates, analyze_answers)
+# 可以点击列标题排序的答题统计列
+STATS_HEADINGS = (("error_rate", "错误率"), ("discrimination", "区分度"), ("attempts", "作答次数"))
+# 界面中保存、删除、合并题目时最多等待写锁的秒数，超过后提示稍后再试
+UI_WRITE_TIMEOUT = 2
+
+def save_answer(conn, values):
+    # values 为 (答案, 解析, 内容摘要, 题目ID)
+    conn.execute("UPDATE timu SET answer=?, analysis=?, digest=? WHERE id=?", values)
+    conn.commit()
+    return 1
+
+
+def remove_timu(conn, timu_id):
+    count = conn.execute("DELETE FROM timu WHERE id=?", (timu_id,)).rowcount
+    conn.commit()
+    return count
+
+
 class TimuManager:
-    def __init__(self):
+    def __init__(self, db_path=DB_PATH, batch_size=BATCH_SIZE, search_limit=SEARCH_LIMIT,
+                 cache_records=CACHE_RECORDS, cache_rows=CACHE_ROWS):
+        self.db_path = db_path
+        # 批量导入时每次 executemany 写入的行数
+        self.batch_size = batch_size
+        # 搜索结果最多显示的条数
+        self.search_limit = search_limit
         # 初始化数据库
         self.init_database()
+        # 题目详情和列表分页的读缓存
+        self.cache = TimuCache(self.conn, cache_records, cache_rows)
+        # 导入、导出在后台线程中执行：导入使用写连接，导出和组卷使用只读连接
+        self.jobs = JobManager(self.storage)
         # 创建GUI界面
         self.create_gui()
+        self.root.after(POLL_INTERVAL, self.poll_jobs)
     
     def init_database(self):
-        # 创建或连接到SQLite数据库
-        self.conn = sqlite3.connect('timu_database.db')
+        # 创建或连接到SQLite数据库，旧数据库自动升级；列表、搜索等查询使用一个只读连接，
+        # 导入进行中（本程序或其他程序）也能照常浏览
+        self.storage = Storage(self.db_path)
+        self.conn = self.storage.acquire_reader()
         self.cursor = self.conn.cursor()
-        # 创建题目表
-        self.cursor.execute('''
-        CREATE TABLE IF NOT EXISTS timu (
-            id TEXT PRIMARY KEY,
-            title TEXT NOT NULL,
-            option TEXT,
-            answer TEXT,
-            analysis TEXT,
-            source TEXT,
-            create_time TEXT
-        )
-        ''')
-        self.conn.commit()
+    
+    def write(self, func, *args):
+        """在写连接上执行 func(conn, *args) 并返回结果
+
+        后台任务或其他程序正在写入时，最多等待 UI_WRITE_TIMEOUT 秒，仍然等不到时提示稍后再试并返回 None，
+        不让界面长时间卡住。
+        """
+        try:
+            with self.storage.writer(timeout=UI_WRITE_TIMEOUT) as conn:
+                return retry_busy(func, conn, *args, attempts=2)
+        except WriterBusy:
+            messagebox.showwarning("数据库忙", "后台任务正在写入数据库，请等任务完成后再试！")
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e):
+                raise
+            messagebox.showwarning("数据库忙", "其他程序正在写入数据库，请稍后再试！")
+        return None
     
     def create_gui(self):
         self.root = tk.Tk()
@@ -71,7 +125,7 @@ class TimuManager:
         frame = ttk.Frame(parent)
         frame.pack(pady=10)
         
-        btn_txt = ttk.Button(frame, text="从TXT文件导入", command=self.import_from_txt)
+        btn_txt = ttk.Button(frame, text="从TXT/Word文件导入", command=self.import_from_txt)
         btn_txt.pack(side=tk.LEFT, padx=10)
         
         btn_json = ttk.Button(frame, text="从JSON文件导入", command=self.import_from_json)
@@ -80,6 +134,35 @@ class TimuManager:
         btn_folder = ttk.Button(frame, text="从文件夹批量导入", command=self.batch_import_from_folder)
         btn_folder.pack(side=tk.LEFT, padx=10)
         
+        btn_sync = ttk.Button(frame, text="同步文件夹", command=self.sync_folder)
+        btn_sync.pack(side=tk.LEFT, padx=10)
+        
+        # 批量导入时是否用多进程并行解析
+        self.parallel_var = tk.BooleanVar(value=False)
+        chk_parallel = tk.Checkbutton(parent, text="批量导入时多进程并行解析", variable=self.parallel_var)
+        chk_parallel.pack()
+        
+        # 按题目内容生成ID，重复导入同一文件时跳过未变化的题目、更新有变化的题目
+        self.content_id_var = tk.BooleanVar(value=True)
+        chk_content_id = tk.Checkbutton(parent, text="按内容生成ID（重复导入时跳过未变化的题目）", variable=self.content_id_var)
+        chk_content_id.pack()
+        
+        # 之后提交的任务用 cProfile 和 tracemalloc 分析耗时和内存，结果写进 metrics/ 中的性能报告
+        self.profile_var = tk.BooleanVar(value=bool(metrics_settings['profile']))
+        chk_profile = tk.Checkbutton(parent, text="性能分析（cProfile/tracemalloc，会明显变慢）", variable=self.profile_var,
+                                     command=self.toggle_profile)
+        chk_profile.pack()
+        
+        # 后台任务控制
+        job_frame = ttk.Frame(parent)
+        job_frame.pack(pady=10)
+        
+        btn_cancel = ttk.Button(job_frame, text="取消任务", command=self.cancel_jobs)
+        btn_cancel.pack(side=tk.LEFT, padx=10)
+        
+        btn_history = ttk.Button(job_frame, text="任务记录", command=self.show_job_history)
+        btn_history.pack(side=tk.LEFT, padx=10)
+        
         # 导入状态显示
         self.status_var = tk.StringVar()
         self.status_var.set("等待导入...")
@@ -102,8 +185,18 @@ class TimuManager:
         refresh_btn = ttk.Button(search_frame, text="刷新", command=self.refresh_timu_list)
         refresh_btn.pack(side=tk.LEFT, padx=5)
         
+        dedupe_btn = ttk.Button(search_frame, text="查找相似题目", command=self.find_duplicates)
+        dedupe_btn.pack(side=tk.LEFT, padx=5)
+        
+        analyze_btn = ttk.Button(search_frame, text="答题统计", command=self.analyze_answers)
+        analyze_btn.pack(side=tk.LEFT, padx=5)
+        
+        # 题目总数
+        self.list_count_var = tk.StringVar()
+        tk.Label(search_frame, textvariable=self.list_count_var, font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
+        
         # 创建题目列表
-        columns = ("id", "title", "answer", "source")
+        columns = ("id", "title", "answer", "source") + tuple(column for column, _ in STATS_HEADINGS)
         self.timu_tree = ttk.Treeview(parent, columns=columns, show="headings")
         
         # 设置列宽和标题
@@ -117,11 +210,23 @@ class TimuManager:
         self.timu_tree.column("answer", width=50)
         self.timu_tree.column("source", width=100)
         
+        # 答题统计列，点击列标题按该列排序，再次点击反向排序
+        self.stats_sort = None
+        for column, text in STATS_HEADINGS:
+            self.timu_tree.heading(column, text=text, command=lambda c=column: self.sort_by_stats(c))
+            self.timu_tree.column(column, width=70, anchor=tk.E)
+        
         self.timu_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
-        # 创建滚动条
+        # 创建滚动条，滚动到窗口边缘时按页加载题目
         scrollbar = ttk.Scrollbar(self.timu_tree, orient=tk.VERTICAL, command=self.timu_tree.yview)
-        self.timu_tree.configure(yscroll=scrollbar.set)
+        self.list_model = PagedTreeModel(self.timu_tree)
+        
+        def on_tree_scroll(first, last):
+            scrollbar.set(first, last)
+            self.list_model.on_scroll(first, last)
+        
+        self.timu_tree.configure(yscroll=on_tree_scroll)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # 添加右键菜单
@@ -130,6 +235,10 @@ class TimuManager:
         self.context_menu.add_command(label="查看详情", command=self.view_timu_detail)
         self.context_menu.add_command(label="删除题目", command=self.delete_timu)
         
+        # 查找相似题目、答题统计的进度
+        self.manage_status_var = tk.StringVar()
+        tk.Label(parent, textvariable=self.manage_status_var, fg="blue", font=('Arial', 10)).pack(anchor=tk.W, padx=10)
+        
         # 初始加载题目列表
         self.refresh_timu_list()
     
@@ -145,6 +254,34 @@ class TimuManager:
         btn_export_filter = ttk.Button(frame, text="按条件导出", command=self.export_with_filter)
         btn_export_filter.pack(side=tk.LEFT, padx=10)
         
+        btn_export_chunks = ttk.Button(frame, text="分块导出", command=self.export_chunks)
+        btn_export_chunks.pack(side=tk.LEFT, padx=10)
+        
+        btn_delta = ttk.Button(frame, text="增量发布", command=self.export_delta)
+        btn_delta.pack(side=tk.LEFT, padx=10)
+        
+        btn_paper = ttk.Button(frame, text="组卷", command=self.generate_paper)
+        btn_paper.pack(side=tk.LEFT, padx=10)
+        
+        btn_export_cancel = ttk.Button(frame, text="取消任务", command=self.cancel_jobs)
+        btn_export_cancel.pack(side=tk.LEFT, padx=10)
+        
+        # 导出格式
+        format_frame = ttk.Frame(parent)
+        format_frame.pack(pady=10)
+        tk.Label(format_frame, text="导出格式:").pack(side=tk.LEFT)
+        self.export_format_var = tk.StringVar(value=EXPORT_COMPACT)
+        for fmt, text in ((EXPORT_COMPACT, "紧凑JSON"), (EXPORT_PRETTY, "缩进JSON"), (EXPORT_NDJSON, "NDJSON（每行一题）"),
+                          (EXPORT_BINARY, "二进制题库（.tmb，体积最小）")):
+            tk.Radiobutton(format_frame, text=text, variable=self.export_format_var, value=fmt).pack(side=tk.LEFT, padx=5)
+        
+        # 分块导出时每块的题目数
+        chunk_frame = ttk.Frame(parent)
+        chunk_frame.pack(pady=5)
+        tk.Label(chunk_frame, text="分块导出每块题目数:").pack(side=tk.LEFT)
+        self.chunk_size_var = tk.IntVar(value=CHUNK_QUESTIONS)
+        tk.Spinbox(chunk_frame, from_=50, to=10000, increment=50, width=8, textvariable=self.chunk_size_var).pack(side=tk.LEFT, padx=5)
+        
         # 导出状态显示
         self.export_status_var = tk.StringVar()
         self.export_status_var.set("准备导出...")
@@ -152,246 +289,134 @@ class TimuManager:
         status_label.pack(pady=20)
     
     def import_from_txt(self):
-        try:
-            file_path = filedialog.askopenfilename(filetypes=[('txt', '*.txt')])
-            if not file_path:
-                return
-            
-            self.status_var.set(f"正在导入: {os.path.basename(file_path)}...")
-            self.root.update()
-            
-            with open(file_path, 'r', encoding='UTF-8') as f:
-                data = f.read()
-                data = data.replace('．', '.')
-                
-            # 不同题目分割
-            pattern = re.compile(r'(?:^|\n\s*)\d+?[\.。]')
-            data_list = pattern.split(data)
-            
-            # 将每个题目分为题目、选项、答案
-            imported_count = 0
-            for i, item in enumerate(data_list[1:], 1):  # 跳过第一个空项
-                # 题目
-                title_match = re.search(r'^(.*?)(?=\n[A-E])', item, re.DOTALL)
-                title = title_match.group(1).strip() if title_match else ""
-                
-                # 选项
-                option = re.findall(r'[A-E][\.。]?(.+?)(?=\n[A-E]|\n答案|\n解析|$)', item, re.DOTALL)
-                option = [opt.strip() for opt in option]
-                
-                # 答案
-                daan = re.findall(r'答案[:：]([A-E]+)', item)
-                analysis = ''
-                
-                if not daan:
-                    daan = re.findall(r'答案[:：]([\s\S]+?)\n解析', item)
-                    if daan:
-                        daan = daan[0].strip()
-                        jiexi = re.findall(r'解析[:：]([\s\S]+)', item)
-                        analysis = jiexi[0].strip() if jiexi else ''
-                    else:
-                        daan = re.findall(r'答案[:：]([\s\S]+)', item)
-                        daan = daan[0].strip() if daan else ''
-                else:
-                    daan = daan[0].strip()
-                    jiexi = re.findall(r'解析[:：]([\s\S]+)', item)
-                    analysis = jiexi[0].strip() if jiexi else ''
-                
-                # 生成ID
-                timu_id = time.strftime("%Y%m%d%H%M", time.localtime()) + str(random.randint(0, 1000000))
-                
-                # 插入数据库
-                try:
-                    self.cursor.execute(
-                        "INSERT INTO timu (id, title, option, answer, analysis, source, create_time) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (timu_id, title, json.dumps(option), daan, analysis, os.path.basename(file_path), time.strftime("%Y-%m-%d %H:%M:%S"))
-                    )
-                    imported_count += 1
-                except sqlite3.IntegrityError:
-                    # ID重复，重新生成ID
-                    timu_id = time.strftime("%Y%m%d%H%M", time.localtime()) + str(random.randint(0, 1000000))
-                    self.cursor.execute(
-                        "INSERT INTO timu (id, title, option, answer, analysis, source, create_time) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (timu_id, title, json.dumps(option), daan, analysis, os.path.basename(file_path), time.strftime("%Y-%m-%d %H:%M:%S"))
-                    )
-                    imported_count += 1
-            
-            self.conn.commit()
-            self.status_var.set(f"导入完成！成功导入 {imported_count} 道题目")
-            self.refresh_timu_list()
-            messagebox.showinfo("导入成功", f"成功导入 {imported_count} 道题目！")
-        except Exception as e:
-            self.status_var.set(f"导入失败: {str(e)}")
-            messagebox.showerror("导入失败", f"导入过程中出现错误：{str(e)}")
+        # Word 文档（.docx）按同样的模板直接读取，不必先复制到TXT中
+        file_path = filedialog.askopenfilename(filetypes=[('TXT或Word文档', '*.txt *.docx'), ('txt', '*.txt'),
+                                                          ('Word文档', '*.docx')])
+        if not file_path:
+            return
+        self.submit_job("导入", import_txt, file_path,
+                        use_content_id=self.content_id_var.get(), batch_size=self.batch_size)
     
     def import_from_json(self):
-        try:
-            file_path = filedialog.askopenfilename(filetypes=[('json', '*.json')])
-            if not file_path:
-                return
-            
-            self.status_var.set(f"正在导入: {os.path.basename(file_path)}...")
-            self.root.update()
-            
-            with open(file_path, 'r', encoding='UTF-8') as f:
-                data = json.load(f)
-            
-            imported_count = 0
-            for item in data:
-                # 生成新ID或使用原有ID
-                timu_id = item.get('id', time.strftime("%Y%m%d%H%M", time.localtime()) + str(random.randint(0, 1000000)))
-                
-                # 确保选项是JSON字符串
-                option = json.dumps(item.get('option', [])) if isinstance(item.get('option', []), list) else item.get('option', '[]')
-                
-                # 插入数据库
-                try:
-                    self.cursor.execute(
-                        "INSERT INTO timu (id, title, option, answer, analysis, source, create_time) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                        (timu_id, item.get('title', ''), option, item.get('answer', ''), item.get('analysis', ''), 
-                         os.path.basename(file_path), time.strftime("%Y-%m-%d %H:%M:%S"))
-                    )
-                    imported_count += 1
-                except sqlite3.IntegrityError:
-                    # ID重复，更新现有记录
-                    self.cursor.execute(
-                        "UPDATE timu SET title=?, option=?, answer=?, analysis=?, source=? WHERE id=?",
-                        (item.get('title', ''), option, item.get('answer', ''), item.get('analysis', ''), 
-                         os.path.basename(file_path), timu_id)
-                    )
-                    imported_count += 1
-            
-            self.conn.commit()
-            self.status_var.set(f"导入完成！成功导入/更新 {imported_count} 道题目")
-            self.refresh_timu_list()
-            messagebox.showinfo("导入成功", f"成功导入/更新 {imported_count} 道题目！")
-        except Exception as e:
-            self.status_var.set(f"导入失败: {str(e)}")
-            messagebox.showerror("导入失败", f"导入过程中出现错误：{str(e)}")
+        file_path = filedialog.askopenfilename(filetypes=[('json', '*.json')])
+        if not file_path:
+            return
+        self.submit_job("导入", import_json, file_path,
+                        use_content_id=self.content_id_var.get(), batch_size=self.batch_size)
     
     def batch_import_from_folder(self):
+        folder_path = filedialog.askdirectory()
+        if not folder_path:
+            return
+        self.submit_job("批量导入", import_folder, folder_path, use_content_id=self.content_id_var.get(),
+                        parallel=self.parallel_var.get(), batch_size=self.batch_size)
+    
+    def sync_folder(self):
+        # 增量同步：只重新导入上次同步后有变化的文件，文件中删掉的题目也会从库中删除
+        folder_path = filedialog.askdirectory()
+        if not folder_path:
+            return
+        self.submit_job("同步", sync_folder, folder_path)
+    
+    def toggle_profile(self):
+        metrics_settings['profile'] = PROFILE_KINDS if self.profile_var.get() else ()
+    
+    def submit_job(self, name, func, *args, **kwargs):
+        # 导入、导出都在后台线程执行，界面只负责显示进度
+        job = self.jobs.submit(name, func, *args, **kwargs)
+        self.job_status_var(job).set(f"{name}任务已排队，等待执行...")
+        return job
+    
+    def job_status_var(self, job):
+        # 导出任务的进度显示在导出标签页，查找相似题目和答题统计显示在题目管理标签页，其余显示在导入标签页
+        if job.func in EXPORT_TASKS:
+            return self.export_status_var
+        if job.func in MANAGE_TASKS:
+            return self.manage_status_var
+        return self.status_var
+    
+    def poll_jobs(self):
+        # 定时取出后台任务的事件，在界面线程中更新状态
+        for kind, job, progress in self.jobs.poll():
+            if kind == 'progress':
+                self.job_status_var(job).set(format_progress(progress))
+            elif kind == 'done':
+                self.finish_job(job)
+        self.root.after(POLL_INTERVAL, self.poll_jobs)
+    
+    def finish_job(self, job):
+        # 导入放在一个事务中，取消或失败时已整体回滚，数据库保持导入前的状态
+        status_var = self.job_status_var(job)
+        if job.status == JOB_DONE and job.func not in EXPORT_TASKS + MANAGE_TASKS:
+            with job.metrics.stage('刷新列表'):
+                self.cache.bump()
+                self.refresh_timu_list()
+        summary = self.save_metrics(job)
+        if job.status == JOB_CANCELLED:
+            status_var.set(f"{job.name}已取消，已写入的题目已回滚" if job.func not in EXPORT_TASKS else f"{job.name}已取消")
+        elif job.status == JOB_FAILED:
+            status_var.set(f"{job.name}失败: {str(job.error)}")
+            messagebox.showerror(f"{job.name}失败", f"{job.name}过程中出现错误：{str(job.error)}")
+        elif job.result.get('failed_files'):
+            status_var.set(job.result['status'] + summary)
+            messagebox.showwarning(f"{job.name}完成", job.result['message'])
+        elif job.func is find_duplicates:
+            status_var.set(job.result['status'] + summary)
+            self.show_duplicates(job.result['clusters'], job.result['threshold'])
+        elif job.func is analyze_answers:
+            status_var.set(job.result['status'] + summary)
+            messagebox.showinfo(f"{job.name}完成", job.result['message'])
+            self.sort_by_stats('error_rate')
+            self.show_source_stats()
+        else:
+            status_var.set(job.result['status'] + summary)
+            messagebox.showinfo(f"{job.name}成功", job.result['message'])
+    
+    def save_metrics(self, job):
+        # 保存任务的性能报告（包含刷新列表的耗时），返回附加在状态栏后面的耗时摘要；报告写不出来时不影响任务结果
         try:
-            folder_path = filedialog.askdirectory()
-            if not folder_path:
-                return
-            
-            self.status_var.set(f"正在批量导入文件夹中的文件...")
-            self.root.update()
-            
-            total_imported = 0
-            # 支持的文件类型
-            supported_extensions = ['.txt', '.json']
-            
-            for filename in os.listdir(folder_path):
-                file_ext = os.path.splitext(filename)[1].lower()
-                if file_ext not in supported_extensions:
-                    continue
-                
-                file_path = os.path.join(folder_path, filename)
-                self.status_var.set(f"正在导入: {filename}...")
-                self.root.update()
-                
-                if file_ext == '.txt':
-                    # 使用TXT导入方法
-                    with open(file_path, 'r', encoding='UTF-8') as f:
-                        data = f.read()
-                        data = data.replace('．', '.')
-                    
-                    # 不同题目分割
-                    pattern = re.compile(r'(?:^|\n\s*)\d+?[\.。]')
-                    data_list = pattern.split(data)
-                    
-                    for item in data_list[1:]:  # 跳过第一个空项
-                        # 题目
-                        title_match = re.search(r'^(.*?)(?=\n[A-E])', item, re.DOTALL)
-                        title = title_match.group(1).strip() if title_match else ""
-                        
-                        # 选项
-                        option = re.findall(r'[A-E][\.。]?(.+?)(?=\n[A-E]|\n答案|\n解析|$)', item, re.DOTALL)
-                        option = [opt.strip() for opt in option]
-                        
-                        # 答案
-                        daan = re.findall(r'答案[:：]([A-E]+)', item)
-                        analysis = ''
-                        
-                        if not daan:
-                            daan = re.findall(r'答案[:：]([\s\S]+?)\n解析', item)
-                            if daan:
-                                daan = daan[0].strip()
-                                jiexi = re.findall(r'解析[:：]([\s\S]+)', item)
-                                analysis = jiexi[0].strip() if jiexi else ''
-                            else:
-                                daan = re.findall(r'答案[:：]([\s\S]+)', item)
-                                daan = daan[0].strip() if daan else ''
-                        else:
-                            daan = daan[0].strip()
-                            jiexi = re.findall(r'解析[:：]([\s\S]+)', item)
-                            analysis = jiexi[0].strip() if jiexi else ''
-                        
-                        # 生成ID
-                        timu_id = time.strftime("%Y%m%d%H%M", time.localtime()) + str(random.randint(0, 1000000))
-                        
-                        # 插入数据库
-                        try:
-                            self.cursor.execute(
-                                "INSERT INTO timu (id, title, option, answer, analysis, source, create_time) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                                (timu_id, title, json.dumps(option), daan, analysis, filename, time.strftime("%Y-%m-%d %H:%M:%S"))
-                            )
-                            total_imported += 1
-                        except sqlite3.IntegrityError:
-                            # ID重复，重新生成ID
-                            timu_id = time.strftime("%Y%m%d%H%M", time.localtime()) + str(random.randint(0, 1000000))
-                            self.cursor.execute(
-                                "INSERT INTO timu (id, title, option, answer, analysis, source, create_time) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                                (timu_id, title, json.dumps(option), daan, analysis, filename, time.strftime("%Y-%m-%d %H:%M:%S"))
-                            )
-                            total_imported += 1
-                elif file_ext == '.json':
-                    # 使用JSON导入方法
-                    with open(file_path, 'r', encoding='UTF-8') as f:
-                        data = json.load(f)
-                    
-                    for item in data:
-                        # 生成新ID或使用原有ID
-                        timu_id = item.get('id', time.strftime("%Y%m%d%H%M", time.localtime()) + str(random.randint(0, 1000000)))
-                        
-                        # 确保选项是JSON字符串
-                        option = json.dumps(item.get('option', [])) if isinstance(item.get('option', []), list) else item.get('option', '[]')
-                        
-                        # 插入数据库
-                        try:
-                            self.cursor.execute(
-                                "INSERT INTO timu (id, title, option, answer, analysis, source, create_time) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                                (timu_id, item.get('title', ''), option, item.get('answer', ''), item.get('analysis', ''), 
-                                 filename, time.strftime("%Y-%m-%d %H:%M:%S"))
-                            )
-                            total_imported += 1
-                        except sqlite3.IntegrityError:
-                            # ID重复，跳过或更新
-                            pass
-            
-            self.conn.commit()
-            self.status_var.set(f"批量导入完成！成功导入 {total_imported} 道题目")
-            self.refresh_timu_list()
-            messagebox.showinfo("批量导入成功", f"成功导入 {total_imported} 道题目！")
-        except Exception as e:
-            self.status_var.set(f"批量导入失败: {str(e)}")
-            messagebox.showerror("批量导入失败", f"批量导入过程中出现错误：{str(e)}")
+            job.metrics.save()
+        except OSError:
+            pass
+        return "\n" + job.metrics.summary()
+    
+    def cancel_jobs(self):
+        if not self.jobs.active_jobs():
+            messagebox.showinfo("提示", "当前没有正在执行的任务！")
+            return
+        self.jobs.cancel()
+    
+    def show_job_history(self):
+        history_window = tk.Toplevel(self.root)
+        history_window.title("任务记录")
+        history_window.geometry("600x300")
+        
+        columns = ("ID", "任务", "状态", "耗时", "结果")
+        tree = ttk.Treeview(history_window, columns=columns, show="headings")
+        for col, width in zip(columns, (40, 80, 70, 70, 320)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        for job in reversed(self.jobs.history):
+            if job.status == JOB_DONE:
+                result = job.result['status']
+            elif job.status == JOB_FAILED:
+                result = str(job.error)
+            else:
+                result = job.progress.get('message', "")
+            tree.insert("", tk.END, values=(job.id, job.name, job.status, f"{job.elapsed:.1f}秒", result))
     
     def refresh_timu_list(self):
-        # 清空现有列表
-        for item in self.timu_tree.get_children():
-            self.timu_tree.delete(item)
-        
-        # 查询所有题目
-        self.cursor.execute("SELECT id, title, answer, source FROM timu ORDER BY create_time DESC")
-        timu_list = self.cursor.fetchall()
-        
-        # 填充列表
-        for item in timu_list:
-            # 截断过长的题目
-            title = item[1][:50] + "..." if len(item[1]) > 50 else item[1]
-            self.timu_tree.insert("", tk.END, values=item)
+        # 分页加载全部题目，只取第一页，其余随滚动加载；数据库没有变化时各页直接从缓存中取
+        self.stats_sort = None
+        self.list_model.reset(CachedSource(AllTimuSource(self.conn), self.cache, ('all',)))
+        self.set_list_count("共 {} 道题目")
+    
+    def set_list_count(self, text):
+        # text 中的 {} 换成列表中的题目总数，删除题目后用同样的格式更新
+        self.list_count_text = text
+        self.list_count_var.set(text.format(self.list_model.total))
     
     def search_timu(self):
         keyword = self.search_var.get()
@@ -399,19 +424,142 @@ class TimuManager:
             self.refresh_timu_list()
             return
         
-        # 清空现有列表
-        for item in self.timu_tree.get_children():
-            self.timu_tree.delete(item)
+        # 根据关键字搜索，优先走全文索引，结果按相关度排序并分页加载
+        self.stats_sort = None
+        source = SearchSource(self.conn, keyword, self.search_limit)
+        self.list_model.reset(CachedSource(source, self.cache, ('search', keyword, self.search_limit)))
+        self.set_list_count("找到 {} 道题目")
+    
+    def sort_by_stats(self, column):
+        # 只列出有答题统计的题目，按所点的列从高到低排列，再次点击同一列时从低到高
+        descending = not (self.stats_sort and self.stats_sort == (column, True))
+        self.stats_sort = (column, descending)
+        source = StatsSource(self.conn, column, descending)
+        self.list_model.reset(CachedSource(source, self.cache, ('stats', column, descending)))
+        text = dict(STATS_HEADINGS)[column]
+        if self.list_model.total:
+            self.set_list_count("{} 道题目按" + text + ('从高到低' if descending else '从低到高') + "排列")
+        else:
+            self.set_list_count("还没有答题统计，请先点击“答题统计”")
+    
+    def analyze_answers(self):
+        # 选择答题日志（timu_server.py --progress-dir 目录下的 .log）或浏览器导出的错题记录（.json）
+        paths = filedialog.askopenfilenames(
+            title="选择答题日志或错题记录",
+            filetypes=[("答题日志和错题记录", "*.log *.json"), ("答题日志", "*.log"), ("错题记录", "*.json")]
+        )
+        if paths:
+            self.submit_job("答题统计", analyze_answers, list(paths))
+    
+    def show_source_stats(self):
+        rows = source_stats(self.conn)
+        if not rows:
+            return
+        stats_window = tk.Toplevel(self.root)
+        stats_window.title("按来源统计")
+        stats_window.geometry("800x300")
+        
+        columns = ("来源", "题目数", "有作答", "作答次数", "错误率", "平均区分度", "错误率最高的题目")
+        tree = ttk.Treeview(stats_window, columns=columns, show="headings")
+        
+        def sort_column(index, descending):
+            # 来源不多，直接在 Treeview 中重新排列；没有数值的排在最后
+            items = [(tree.set(iid, columns[index]), iid) for iid in tree.get_children("")]
+            present = [item for item in items if item[0] != ""]
+            missing = [item for item in items if item[0] == ""]
+            if index in (0, 6):
+                present.sort(key=lambda item: item[0], reverse=descending)
+            else:
+                present.sort(key=lambda item: float(item[0]), reverse=descending)
+            for position, (_, iid) in enumerate(present + missing):
+                tree.move(iid, "", position)
+            tree.heading(columns[index], command=lambda: sort_column(index, not descending))
+        
+        for i, (col, width) in enumerate(zip(columns, (160, 60, 60, 80, 60, 80, 160))):
+            tree.heading(col, text=col, command=lambda i=i: sort_column(i, True))
+            tree.column(col, width=width)
+        for source, questions, answered, attempts, wrong, error_rate, discrimination, hardest_id in rows:
+            tree.insert("", tk.END, values=(source, questions, answered, attempts, format_stat(error_rate),
+                                            format_stat(discrimination), hardest_id or ""))
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    
+    def find_duplicates(self):
+        # 在后台计算签名并查找相似题目，完成后打开相似题目窗口
+        self.submit_job("查找相似题目", find_duplicates)
+    
+    def show_duplicates(self, clusters, threshold):
+        if not clusters:
+            messagebox.showinfo("查找相似题目", "没有找到相似题目！")
+            return
+        
+        dup_window = tk.Toplevel(self.root)
+        dup_window.title(f"相似题目（{len(clusters)} 组）")
+        dup_window.geometry("800x500")
+        
+        tk.Label(dup_window, text="选中一道题目后点击“合并”，保留该题并删除同组其他题目；保留的题目没有解析时用同组题目的解析补上",
+                 font=('Arial', 10)).pack(anchor=tk.W, padx=10, pady=5)
+        
+        # 每组一个父节点，子节点的 iid 为 "组号:题目ID"
+        columns = ("similarity", "answer", "source", "id")
+        tree = ttk.Treeview(dup_window, columns=columns, show="tree headings")
+        tree.heading("#0", text="题目")
+        tree.heading("similarity", text="相似度")
+        tree.heading("answer", text="答案")
+        tree.heading("source", text="来源")
+        tree.heading("id", text="ID")
+        tree.column("#0", width=400)
+        tree.column("similarity", width=60)
+        tree.column("answer", width=60)
+        tree.column("source", width=100)
+        tree.column("id", width=120)
+        
+        scrollbar = ttk.Scrollbar(tree, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscroll=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        
+        for i, cluster in enumerate(clusters):
+            parent = tree.insert("", tk.END, iid=str(i), text=f"第 {i + 1} 组（{len(cluster)} 道题目）", open=i < 50)
+            for timu in cluster:
+                tree.insert(parent, tk.END, iid=f"{i}:{timu['id']}", text=(timu['title'] or "").replace("\n", " "),
+                            values=(f"{timu['similarity']:.2f}", timu['answer'], timu['source'], timu['id']))
+        
+        def merge_selected():
+            selected = tree.selection()
+            if not selected or ":" not in selected[0]:
+                messagebox.showinfo("提示", "请先选中组内要保留的题目！", parent=dup_window)
+                return
+            group, keep_id = selected[0].split(":", 1)
+            cluster = clusters[int(group)]
+            if not messagebox.askyesno("确认合并", f"保留选中的题目，删除同组其他 {len(cluster) - 1} 道题目？",
+                                       parent=dup_window):
+                return
+            ids = [timu['id'] for timu in cluster]
+            deleted = self.write(merge_cluster, keep_id, ids)
+            if deleted is None:
+                return
+            self.cache.bump(ids)
+            tree.delete(group)
+            self.refresh_timu_list()
+            self.manage_status_var.set(f"已合并第 {int(group) + 1} 组，删除 {deleted} 道题目")
         
-        # 根据关键字搜索
-        self.cursor.execute("SELECT id, title, answer, source FROM timu WHERE title LIKE ? OR answer LIKE ? OR source LIKE ?", 
-                           (f"%{keyword}%", f"%{keyword}%", f"%{keyword}%"))
-        timu_list = self.cursor.fetchall()
+        def export_report():
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".json",
+                filetypes=[("JSON文件", "*.json")],
+                initialfile=f"duplicates_{time.strftime('%Y%m%d%H%M%S', time.localtime())}",
+                parent=dup_window
+            )
+            if not file_path:
+                return
+            with open(file_path, 'w', encoding='utf-8') as f:
+                write_clusters(f, clusters, threshold)
+            messagebox.showinfo("导出成功", f"相似题目组已保存至: {file_path}", parent=dup_window)
         
-        # 填充列表
-        for item in timu_list:
-            title = item[1][:50] + "..." if len(item[1]) > 50 else item[1]
-            self.timu_tree.insert("", tk.END, values=item)
+        btn_frame = ttk.Frame(dup_window)
+        btn_frame.pack(pady=10)
+        ttk.Button(btn_frame, text="合并（保留选中题目）", command=merge_selected).pack(side=tk.LEFT, padx=10)
+        ttk.Button(btn_frame, text="导出报告", command=export_report).pack(side=tk.LEFT, padx=10)
     
     def show_context_menu(self, event):
         # 选中点击的项目
@@ -426,12 +574,11 @@ class TimuManager:
         if not selected_item:
             return
         
-        item = self.timu_tree.item(selected_item)
-        timu_id = item["values"][0]
+        # 列表中每行的 iid 就是题目ID
+        timu_id = selected_item[0]
         
-        # 查询详细信息
-        self.cursor.execute("SELECT * FROM timu WHERE id=?", (timu_id,))
-        timu = self.cursor.fetchone()
+        # 查询详细信息，最近查看过的题目直接从缓存中取
+        timu = self.cache.record(timu_id)
         
         if timu:
             # 创建详情窗口
@@ -443,41 +590,39 @@ class TimuManager:
             tk.Label(detail_window, text="题目:", font=('Arial', 12, 'bold')).pack(anchor=tk.W, padx=10, pady=5)
             title_text = tk.Text(detail_window, height=3, width=70)
             title_text.pack(padx=10)
-            title_text.insert(tk.END, timu[1])
+            title_text.insert(tk.END, timu['title'])
             title_text.config(state=tk.DISABLED)
             
             tk.Label(detail_window, text="选项:", font=('Arial', 12, 'bold')).pack(anchor=tk.W, padx=10, pady=5)
-            try:
-                options = json.loads(timu[2])
-                option_text = "\n".join([f"{chr(65+i)}. {opt}" for i, opt in enumerate(options)])
-            except:
-                option_text = timu[2]
-            
             option_text_widget = tk.Text(detail_window, height=5, width=70)
             option_text_widget.pack(padx=10)
-            option_text_widget.insert(tk.END, option_text)
+            option_text_widget.insert(tk.END, timu['option_text'])
             option_text_widget.config(state=tk.DISABLED)
             
             tk.Label(detail_window, text="答案:", font=('Arial', 12, 'bold')).pack(anchor=tk.W, padx=10, pady=5)
             answer_entry = ttk.Entry(detail_window, width=50)
             answer_entry.pack(padx=10)
-            answer_entry.insert(0, timu[3])
+            answer_entry.insert(0, timu['answer'] or "")
             
             tk.Label(detail_window, text="解析:", font=('Arial', 12, 'bold')).pack(anchor=tk.W, padx=10, pady=5)
             analysis_text = tk.Text(detail_window, height=5, width=70)
             analysis_text.pack(padx=10)
-            analysis_text.insert(tk.END, timu[4])
+            analysis_text.insert(tk.END, timu['analysis'] or "")
             
             # 保存按钮
             def save_changes():
                 new_answer = answer_entry.get()
                 new_analysis = analysis_text.get(1.0, tk.END).strip()
                 
-                self.cursor.execute("UPDATE timu SET answer=?, analysis=? WHERE id=?", 
-                                   (new_answer, new_analysis, timu_id))
-                self.conn.commit()
+                # 同步更新内容摘要，保持和按内容导入时的判断一致
+                digest = content_digest(timu['title'], timu['option'], new_answer, new_analysis)
+                if self.write(save_answer, (new_answer, new_analysis, digest, timu_id)) is None:
+                    return
+                # 其他题目和列表窗口不受影响，只更新缓存中的这道题和列表中的答案列
+                self.cache.bump([timu_id])
+                self.cache.put_record(dict(timu, answer=new_answer, analysis=new_analysis))
+                self.list_model.update(timu_id, 2, new_answer)
                 messagebox.showinfo("保存成功", "题目信息已更新！")
-                self.refresh_timu_list()
                 detail_window.destroy()
             
             save_btn = ttk.Button(detail_window, text="保存修改", command=save_changes)
@@ -492,62 +637,78 @@ class TimuManager:
         if not messagebox.askyesno("确认删除", "确定要删除选中的题目吗？"):
             return
         
-        item = self.timu_tree.item(selected_item)
-        timu_id = item["values"][0]
+        # 列表中每行的 iid 就是题目ID
+        timu_id = selected_item[0]
         
         # 删除题目
-        self.cursor.execute("DELETE FROM timu WHERE id=?", (timu_id,))
-        self.conn.commit()
+        if self.write(remove_timu, timu_id) is None:
+            return
         
-        # 更新列表
-        self.refresh_timu_list()
+        # 只从列表中删除这一行，不重新加载
+        self.cache.bump([timu_id])
+        self.list_model.remove(timu_id)
+        self.list_count_var.set(self.list_count_text.format(self.list_model.total))
         messagebox.showinfo("删除成功", "题目已成功删除！")
     
     def export_to_json(self):
-        try:
-            # 查询所有题目
-            self.cursor.execute("SELECT id, title, option, answer, analysis FROM timu")
-            timu_list = self.cursor.fetchall()
-            
-            if not timu_list:
-                messagebox.showinfo("提示", "没有题目可以导出！")
-                return
-            
-            # 转换为JSON格式
-            json_data = []
-            for item in timu_list:
-                try:
-                    options = json.loads(item[2])
-                except:
-                    options = []
-                
-                json_data.append({
-                    "id": item[0],
-                    "title": item[1],
-                    "option": options,
-                    "answer": item[3],
-                    "analysis": item[4]
-                })
-            
-            # 选择保存路径
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".json",
-                filetypes=[("JSON文件", "*.json")],
-                initialfile=time.strftime("%Y%m%d%H%M%S", time.localtime())
+        self.cursor.execute("SELECT 1 FROM timu LIMIT 1")
+        if self.cursor.fetchone() is None:
+            messagebox.showinfo("提示", "没有题目可以导出！")
+            return
+        
+        file_path = self.ask_export_path(time.strftime("%Y%m%d%H%M%S", time.localtime()))
+        if not file_path:
+            return
+        
+        self.submit_job("导出", export_json, file_path, fmt=self.export_format_var.get())
+    
+    def ask_export_path(self, initialfile):
+        # 选择保存路径，NDJSON 和二进制题库使用各自的扩展名
+        if self.export_format_var.get() == EXPORT_NDJSON:
+            return filedialog.asksaveasfilename(
+                defaultextension=".ndjson",
+                filetypes=[("NDJSON文件", "*.ndjson")],
+                initialfile=initialfile
             )
-            
-            if not file_path:
-                return
-            
-            # 写入文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=4)
-            
-            self.export_status_var.set(f"导出成功！文件已保存至: {os.path.basename(file_path)}")
-            messagebox.showinfo("导出成功", f"成功导出 {len(json_data)} 道题目到 {file_path}！")
-        except Exception as e:
-            self.export_status_var.set(f"导出失败: {str(e)}")
-            messagebox.showerror("导出失败", f"导出过程中出现错误：{str(e)}")
+        if self.export_format_var.get() == EXPORT_BINARY:
+            return filedialog.asksaveasfilename(
+                defaultextension=".tmb",
+                filetypes=[("二进制题库", "*.tmb")],
+                initialfile=initialfile
+            )
+        return filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON文件", "*.json")],
+            initialfile=initialfile
+        )
+    
+    def export_chunks(self):
+        # 分块导出到一个目录：多个分块文件加一个清单，timu.html 只需先下载清单
+        self.cursor.execute("SELECT 1 FROM timu LIMIT 1")
+        if self.cursor.fetchone() is None:
+            messagebox.showinfo("提示", "没有题目可以导出！")
+            return
+        
+        try:
+            chunk_size = int(self.chunk_size_var.get())
+        except (tk.TclError, ValueError):
+            chunk_size = 0
+        if chunk_size <= 0:
+            messagebox.showinfo("提示", "每块题目数必须是正整数！")
+            return
+        
+        out_dir = filedialog.askdirectory(title="选择分块导出的目录")
+        if not out_dir:
+            return
+        
+        self.submit_job("分块导出", export_chunks, out_dir, chunk_size=chunk_size)
+    
+    def export_delta(self, sources=None):
+        # 增量发布到一个目录：第一次发布完整题库，之后每次只多一个补丁，timu.html 只下载补丁
+        out_dir = filedialog.askdirectory(title="选择增量发布的目录（每次发布同一题库请选择同一目录）")
+        if not out_dir:
+            return
+        self.submit_job("增量发布", export_delta, out_dir, sources=sources)
     
     def export_with_filter(self):
         # 创建过滤窗口
@@ -558,8 +719,8 @@ class TimuManager:
         # 来源过滤
         tk.Label(filter_window, text="按来源过滤:", font=('Arial', 10)).pack(anchor=tk.W, padx=20, pady=10)
         
-        # 获取所有来源
-        self.cursor.execute("SELECT DISTINCT source FROM timu")
+        # 获取所有来源及题目数，从触发器维护的来源汇总表中读取
+        self.cursor.execute("SELECT source, SUM(questions) FROM timu_source_summary GROUP BY source ORDER BY source")
         sources = self.cursor.fetchall()
         
         source_vars = []
@@ -574,7 +735,7 @@ class TimuManager:
             col = i % 3
             row = i // 3
             
-            chk = tk.Checkbutton(source_frame, text=source[0], variable=var)
+            chk = tk.Checkbutton(source_frame, text=f"{source[0]}（{source[1]}题）", variable=var)
             chk.grid(row=row, column=col, sticky=tk.W, padx=5, pady=5)
         
         # 导出按钮
@@ -586,62 +747,133 @@ class TimuManager:
                 messagebox.showinfo("提示", "请至少选择一个来源！")
                 return
             
-            # 构建SQL查询
-            placeholders = ",".join(["?"] * len(selected_sources))
-            query = f"SELECT id, title, option, answer, analysis FROM timu WHERE source IN ({placeholders})"
-            
-            self.cursor.execute(query, selected_sources)
-            timu_list = self.cursor.fetchall()
-            
-            if not timu_list:
-                messagebox.showinfo("提示", "没有符合条件的题目可以导出！")
-                return
-            
-            # 转换为JSON格式
-            json_data = []
-            for item in timu_list:
-                try:
-                    options = json.loads(item[2])
-                except:
-                    options = []
-                
-                json_data.append({
-                    "id": item[0],
-                    "title": item[1],
-                    "option": options,
-                    "answer": item[3],
-                    "analysis": item[4]
-                })
-            
-            # 选择保存路径
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".json",
-                filetypes=[("JSON文件", "*.json")],
-                initialfile=f"filtered_{time.strftime('%Y%m%d%H%M%S', time.localtime())}"
-            )
-            
+            file_path = self.ask_export_path(f"filtered_{time.strftime('%Y%m%d%H%M%S', time.localtime())}")
             if not file_path:
                 return
             
-            # 写入文件
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(json_data, f, ensure_ascii=False, indent=4)
-            
-            self.export_status_var.set(f"条件导出成功！文件已保存至: {os.path.basename(file_path)}")
-            messagebox.showinfo("导出成功", f"成功导出 {len(json_data)} 道题目到 {file_path}！")
+            self.submit_job("条件导出", export_json, file_path, sources=selected_sources,
+                            fmt=self.export_format_var.get())
             filter_window.destroy()
         
-        export_btn = ttk.Button(filter_window, text="导出", command=do_export)
-        export_btn.pack(pady=20)
+        def do_delta():
+            selected_sources = [source for source, var in source_vars if var.get()]
+            if not selected_sources:
+                messagebox.showinfo("提示", "请至少选择一个来源！")
+                return
+            filter_window.destroy()
+            self.export_delta(selected_sources)
+        
+        button_frame = ttk.Frame(filter_window)
+        button_frame.pack(pady=20)
+        export_btn = ttk.Button(button_frame, text="导出", command=do_export)
+        export_btn.pack(side=tk.LEFT, padx=10)
+        delta_btn = ttk.Button(button_frame, text="增量发布", command=do_delta)
+        delta_btn.pack(side=tk.LEFT, padx=10)
+    
+    def generate_paper(self):
+        # 组卷窗口：各题型题数、参与的来源、要避开的往期试卷、份数；试卷写到仓库的 json/ 目录
+        paper_window = tk.Toplevel(self.root)
+        paper_window.title("组卷")
+        paper_window.geometry("520x480")
+        
+        name_frame = ttk.Frame(paper_window)
+        name_frame.pack(fill=tk.X, padx=20, pady=10)
+        tk.Label(name_frame, text="试卷名称:").pack(side=tk.LEFT)
+        name_var = tk.StringVar(value=f"paper_{time.strftime('%Y%m%d', time.localtime())}")
+        ttk.Entry(name_frame, textvariable=name_var, width=30).pack(side=tk.LEFT, padx=5)
+        
+        # 各题型题数
+        count_frame = ttk.Frame(paper_window)
+        count_frame.pack(fill=tk.X, padx=20)
+        count_vars = {}
+        for qtype in QUESTION_TYPES:
+            tk.Label(count_frame, text=f"{qtype}:").pack(side=tk.LEFT)
+            count_vars[qtype] = tk.IntVar(value=0)
+            tk.Spinbox(count_frame, from_=0, to=1000, width=5, textvariable=count_vars[qtype]).pack(side=tk.LEFT, padx=5)
+        
+        # 来源，题目数从来源汇总表读取
+        tk.Label(paper_window, text="从以下来源抽题:", font=('Arial', 10)).pack(anchor=tk.W, padx=20, pady=10)
+        source_frame = ttk.Frame(paper_window)
+        source_frame.pack(fill=tk.X, padx=20)
+        self.cursor.execute("SELECT source, SUM(questions) FROM timu_source_summary GROUP BY source ORDER BY source")
+        source_vars = []
+        for i, (source, count) in enumerate(self.cursor.fetchall()):
+            var = tk.BooleanVar(value=True)
+            source_vars.append((source, var))
+            chk = tk.Checkbutton(source_frame, text=f"{source}（{count}题）", variable=var)
+            chk.grid(row=i // 3, column=i % 3, sticky=tk.W, padx=5, pady=5)
+        
+        # 往期试卷中的题目和相似题目不会被抽到
+        exclude_paths = []
+        exclude_var = tk.StringVar(value="不排除往期试卷")
+        
+        def choose_exclude():
+            paths = filedialog.askopenfilenames(title="选择往期试卷", filetypes=[("JSON文件", "*.json")],
+                                                initialdir=os.path.join(DEFAULT_ROOT, 'json'))
+            exclude_paths[:] = paths
+            exclude_var.set(f"排除 {len(paths)} 份往期试卷" if paths else "不排除往期试卷")
+        
+        exclude_frame = ttk.Frame(paper_window)
+        exclude_frame.pack(fill=tk.X, padx=20, pady=10)
+        ttk.Button(exclude_frame, text="选择往期试卷", command=choose_exclude).pack(side=tk.LEFT)
+        tk.Label(exclude_frame, textvariable=exclude_var).pack(side=tk.LEFT, padx=10)
+        
+        option_frame = ttk.Frame(paper_window)
+        option_frame.pack(fill=tk.X, padx=20)
+        tk.Label(option_frame, text="份数:").pack(side=tk.LEFT)
+        copies_var = tk.IntVar(value=1)
+        tk.Spinbox(option_frame, from_=1, to=100000, width=7, textvariable=copies_var).pack(side=tk.LEFT, padx=5)
+        register_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(option_frame, text="加入题库列表（js/public.js）", variable=register_var).pack(side=tk.LEFT, padx=10)
+        
+        def do_generate():
+            try:
+                counts = {qtype: var.get() for qtype, var in count_vars.items()}
+                copies = copies_var.get()
+            except tk.TclError:
+                messagebox.showinfo("提示", "题数和份数必须是整数！")
+                return
+            name = name_var.get().strip()
+            selected_sources = [source for source, var in source_vars if var.get()]
+            if not name:
+                messagebox.showinfo("提示", "请填写试卷名称！")
+                return
+            if not sum(counts.values()) or min(counts.values()) < 0 or copies <= 0:
+                messagebox.showinfo("提示", "请至少为一种题型填写题数！")
+                return
+            if not selected_sources:
+                messagebox.showinfo("提示", "请至少选择一个来源！")
+                return
+            # 全部来源都选中时不限制来源
+            sources = None if len(selected_sources) == len(source_vars) else selected_sources
+            # 与已有题库同名时确认后才覆盖
+            conflicts = paper_conflicts(DEFAULT_ROOT, name, copies, register_var.get())
+            if conflicts and not messagebox.askyesno(
+                    "确认覆盖", f"已有同名题库：{'、'.join(conflicts[:5])}{' 等' if len(conflicts) > 5 else ''}\n是否覆盖？",
+                    parent=paper_window):
+                return
+            self.submit_job("组卷", generate_papers, DEFAULT_ROOT, name, counts, copies=copies, sources=sources,
+                            exclude_paths=list(exclude_paths), register=register_var.get(), overwrite=bool(conflicts))
+            paper_window.destroy()
+        
+        ttk.Button(paper_window, text="生成", command=do_generate).pack(pady=20)
     
     def on_closing(self):
-        # 关闭数据库连接
-        self.conn.close()
+        # 取消未完成的后台任务，关闭数据库连接
+        self.jobs.shutdown()
+        self.storage.close()
         self.root.destroy()
     
     def run(self):
         self.root.mainloop()
 
 if __name__ == "__main__":
-    app = TimuManager()
+    parser = argparse.ArgumentParser(description="题目管理器")
+    parser.add_argument('--db', default=DB_PATH, help=f"数据库文件（默认 {DB_PATH}，也可以用环境变量 TIMU_DB 指定）")
+    parser.add_argument('--cache-records', type=int, default=CACHE_RECORDS,
+                        help=f"最多缓存的题目详情条数（默认 {CACHE_RECORDS}，也可以用环境变量 TIMU_CACHE_RECORDS 指定，0 表示不缓存）")
+    parser.add_argument('--cache-rows', type=int, default=CACHE_ROWS,
+                        help=f"列表、搜索结果最多缓存的行数（默认 {CACHE_ROWS}，也可以用环境变量 TIMU_CACHE_ROWS 指定，0 表示不缓存）")
+    args = parser.parse_args()
+    app = TimuManager(args.db, cache_records=args.cache_records, cache_rows=args.cache_rows)
     app.run()
\ No newline at end of file
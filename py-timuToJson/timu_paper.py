@@ -0,0 +1,321 @@
+"""组卷：按题型题数和来源的要求从题库中随机抽题，生成可以直接放进 json/ 的题库文件和 JSONList 记录
+
+题目按 (来源, 题型) 分层。每层的 rowid 通过 (source, qtype) 索引读出后缓存在内存中（只有整数），
+用稀疏的 Fisher-Yates 洗牌逐个抽取不重复的位置，再按 rowid 取回抽中的题目，不把候选题目读进 Python。
+一次生成很多份试卷时各份共用这些缓存，每份试卷只读取抽中的题目。
+
+每种题型的题数按各来源的题目数成比例分配（最大余数法），某个来源排除后不够时由其他来源补足。
+指定往期试卷时，跳过其中的题目以及与它们相似的题目，同一份试卷内的题目之间也不会相似：
+相似度用 timu_dedupe 的 MinHash 签名和 LSH 分桶估计，只为抽中的题目计算签名。
+没有安装 numpy 时只按题目ID和规范化后的题干、选项排除完全相同的题目。
+"""
+import json
+import os
+import random
+from array import array
+
+from timu_db import IN_CHUNK_SIZE, normalize_option, normalize_text
+from timu_dedupe import (BANDS, THRESHOLD, band_keys, compute_signatures, dedupe_available, permutations,
+                         shingle_text)
+from timu_export import QUESTION_TYPES, TYPE_BLANK, TYPE_ESSAY, TYPE_MULTIPLE, TYPE_SINGLE, compact_record
+
+# 命令行中题型的英文写法，与 benchmarks/gen_bank.py 的 --mix 相同
+TYPE_ALIASES = {'single': TYPE_SINGLE, 'multiple': TYPE_MULTIPLE, 'blank': TYPE_BLANK, 'essay': TYPE_ESSAY}
+
+PAPER_COLUMNS = "rowid, id, title, option, answer, analysis"
+# 仓库根目录，试卷写到其中的 json/，JSONList 在 js/public.js 中
+DEFAULT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_counts(text):
+    # "单选=40,多选=10,简答=5" 或 "single=40,multiple=10,essay=5" -> {'单选': 40, '多选': 10, '简答': 5}
+    counts = {}
+    for part in text.split(','):
+        if not part.strip():
+            continue
+        name, _, value = part.partition('=')
+        name = TYPE_ALIASES.get(name.strip().lower(), name.strip())
+        if name not in QUESTION_TYPES:
+            raise ValueError(f"未知的题型: {name}，可选 {'、'.join(QUESTION_TYPES)}")
+        counts[name] = int(value)
+        if counts[name] < 0:
+            raise ValueError(f"{name}的题数不能为负数")
+    return counts
+
+
+def content_key(title, option):
+    # 题干和选项都相同才算同一道题，"下列说法正确的是"这样的题干在不同题目中经常重复
+    return normalize_text(title) + '\x1e' + normalize_option(option)
+
+
+def describe_counts(counts):
+    return "、".join(f"{qtype}{counts[qtype]}道" for qtype in QUESTION_TYPES if counts.get(qtype))
+
+
+def allocate(k, weights, rng):
+    """把 k 道题按 weights 成比例分配，返回各份的题数
+
+    先取整数部分，剩下的题依次给小数部分最大的几份，小数部分相同时随机决定。
+    sum(weights) >= k 时每份都不会超过自己的权重。
+    """
+    total = sum(weights)
+    quotas = [k * w // total for w in weights]
+    order = sorted(range(len(weights)), key=lambda i: (-(k * weights[i] % total), rng.random()))
+    for i in order[:k - sum(quotas)]:
+        quotas[i] += 1
+    return quotas
+
+
+class Stratum:
+    """一个 (来源, 题型) 分层的 rowid 数组，用稀疏的 Fisher-Yates 洗牌逐个抽取不重复的 rowid
+
+    第 i 次抽取在位置 i..n-1 中随机选一个，与位置 i 交换；交换只记录在字典中，不修改数组，
+    抽 k 道题的代价与 k 成正比，与分层大小无关。
+    """
+
+    def __init__(self, rowids):
+        self.rowids = rowids
+        self.drawn = 0
+        self.swaps = {}
+
+    def remaining(self):
+        return len(self.rowids) - self.drawn
+
+    def reset(self):
+        self.drawn = 0
+        self.swaps = {}
+
+    def draw(self, rng):
+        i = self.drawn
+        if i >= len(self.rowids):
+            return None
+        j = rng.randrange(i, len(self.rowids))
+        position = self.swaps.get(j, j)
+        self.swaps[j] = self.swaps.pop(i, i)
+        self.drawn += 1
+        return self.rowids[position]
+
+
+class NearIndex:
+    """已经选用（或需要避开）的题目的签名，按 LSH 分段建桶，用于判断新题目是否与其中某道题相似"""
+
+    def __init__(self, threshold=THRESHOLD):
+        self.threshold = threshold
+        self.sigs = []
+        self.buckets = [{} for _ in range(BANDS)]
+
+    def add(self, sig, keys):
+        index = len(self.sigs)
+        self.sigs.append(sig)
+        for band, key in enumerate(keys):
+            self.buckets[band].setdefault(key, []).append(index)
+
+    def similar(self, sig, keys):
+        checked = set()
+        for band, key in enumerate(keys):
+            for index in self.buckets[band].get(key, ()):
+                if index not in checked:
+                    checked.add(index)
+                    if (self.sigs[index] == sig).mean() >= self.threshold:
+                        return True
+        return False
+
+
+class PaperGenerator:
+    """从题库中按要求抽题组卷
+
+    sources 为参与组卷的来源，默认全部；exclude 为往期试卷的题目字典列表（至少有 id、title、option），
+    其中的题目和与之相似的题目不会被抽到。同一个生成器可以连续生成多份试卷，分层缓存在各份之间共用。
+    用法：
+        generator = PaperGenerator(conn, sources=['2017.json'], exclude=last_paper)
+        rows = generator.generate({'单选': 40, '多选': 10, '简答': 5}, random.Random(1))
+    """
+
+    def __init__(self, conn, sources=None, exclude=(), threshold=THRESHOLD):
+        self.conn = conn
+        if sources:
+            self.sources = sorted(set(sources))
+        else:
+            self.sources = [row[0] for row in conn.execute("SELECT DISTINCT source FROM timu_source_summary "
+                                                           "ORDER BY source")]
+        self.threshold = threshold
+        self.strata = {}
+        self.by_type = {}
+        self.use_signatures = dedupe_available()
+        self.perms = permutations() if self.use_signatures else None
+        self.exclude_ids = set()
+        self.exclude_keys = set()
+        self.excluded = NearIndex(threshold)
+        self.add_excluded(exclude)
+        # 当前这份试卷已选的题目，生成每份试卷时重置
+        self.paper_keys = set()
+        self.paper = NearIndex(threshold)
+
+    def type_strata(self, qtype):
+        # 该题型在各来源中的分层，只包含有题目的来源；来源列表从来源汇总表读取
+        if qtype not in self.by_type:
+            placeholders = ",".join(["?"] * len(self.sources))
+            present = {row[0] for row in self.conn.execute(
+                f"SELECT source FROM timu_source_summary WHERE qtype = ? AND source IN ({placeholders})",
+                [qtype] + self.sources)}
+            strata = [self.stratum(source, qtype) for source in self.sources if source in present]
+            self.by_type[qtype] = [stratum for stratum in strata if stratum.rowids]
+        return self.by_type[qtype]
+
+    def signatures(self, items):
+        # items 为 (title, option) 列表，返回签名数组和每道题各段的桶号
+        sigs = compute_signatures([shingle_text(title, option) for title, option in items], self.perms)
+        keys = [band_keys(sigs, band).tolist() for band in range(BANDS)]
+        return sigs, list(zip(*keys))
+
+    def add_excluded(self, items):
+        # 有签名时完全相同的题目签名也相同，不必再按题干和选项比较
+        items = [item for item in items if isinstance(item, dict)]
+        for item in items:
+            if item.get('id') is not None:
+                self.exclude_ids.add(str(item['id']))
+        if not items:
+            return
+        if self.use_signatures:
+            sigs, keys = self.signatures([(item.get('title'), item.get('option')) for item in items])
+            for sig, key in zip(sigs, keys):
+                self.excluded.add(sig, key)
+        else:
+            self.exclude_keys.update(content_key(item.get('title'), item.get('option')) for item in items)
+
+    def stratum(self, source, qtype):
+        # 第一次用到时通过 (source, qtype) 索引读出 rowid，只读索引不读题目
+        key = (source, qtype)
+        if key not in self.strata:
+            self.strata[key] = Stratum(array('q', (rowid for (rowid,) in self.conn.execute(
+                "SELECT rowid FROM timu WHERE source = ? AND qtype = ?", key))))
+        return self.strata[key]
+
+    def fetch(self, rowids):
+        rows = {}
+        for i in range(0, len(rowids), IN_CHUNK_SIZE):
+            chunk = rowids[i:i + IN_CHUNK_SIZE]
+            placeholders = ",".join(["?"] * len(chunk))
+            for row in self.conn.execute(f"SELECT {PAPER_COLUMNS} FROM timu WHERE rowid IN ({placeholders})", chunk):
+                rows[row[0]] = row
+        return [rows[rowid] for rowid in rowids if rowid in rows]
+
+    def accept(self, rows):
+        # 按顺序检查抽中的题目，跳过往期试卷中的、与往期试卷或本卷已选题目相似的，返回留下的题目
+        if not rows:
+            return []
+        if self.use_signatures:
+            sigs, keys = self.signatures([(row[2], row[3]) for row in rows])
+        accepted = []
+        for i, row in enumerate(rows):
+            if str(row[1]) in self.exclude_ids:
+                continue
+            if self.use_signatures:
+                if self.excluded.similar(sigs[i], keys[i]) or self.paper.similar(sigs[i], keys[i]):
+                    continue
+                self.paper.add(sigs[i], keys[i])
+            else:
+                key = content_key(row[2], row[3])
+                if key in self.exclude_keys or key in self.paper_keys:
+                    continue
+                self.paper_keys.add(key)
+            accepted.append(row)
+        return accepted
+
+    def sample_type(self, qtype, k, rng):
+        strata = self.type_strata(qtype)
+        total = sum(len(stratum.rowids) for stratum in strata)
+        if total < k:
+            raise ValueError(f"所选来源中{qtype}题只有 {total} 道，不够抽 {k} 道")
+        for stratum in strata:
+            stratum.reset()
+        picked = []
+        # 第一轮按各来源的题目数分配；排除往期题目后不够时，按各来源剩余的题目数分配差额，直到抽满或抽完
+        while len(picked) < k:
+            rest = [stratum for stratum in strata if stratum.remaining()]
+            if not rest:
+                raise ValueError(f"排除往期试卷中的题目和相似题目后，{qtype}题不够抽 {k} 道")
+            need = k - len(picked)
+            weights = [stratum.remaining() for stratum in rest]
+            quotas = weights if sum(weights) < need else allocate(need, weights, rng)
+            rowids = [stratum.draw(rng) for stratum, quota in zip(rest, quotas) for _ in range(quota)]
+            picked.extend(self.accept(self.fetch(rowids)))
+        rng.shuffle(picked)
+        return picked
+
+    def generate(self, counts, rng):
+        """按 counts（题型 -> 题数）抽一份试卷，返回 (rowid, id, title, option, answer, analysis) 列表
+
+        题目按单选、多选、填空、简答的顺序排列，同一题型内顺序随机。
+        """
+        self.paper_keys = set()
+        self.paper = NearIndex(self.threshold)
+        rows = []
+        for qtype in QUESTION_TYPES:
+            if counts.get(qtype):
+                rows.extend(self.sample_type(qtype, counts[qtype], rng))
+        return rows
+
+
+def paper_data(rows):
+    # 紧凑JSON数组，与导出的题库格式相同，timu.html 可以直接使用
+    return ("[" + ",".join(compact_record(row[1:]) for row in rows) + "]").encode('utf-8')
+
+
+def load_papers(paths):
+    # 读取往期试卷（JSON题库文件），返回题目字典列表
+    items = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError(f"{os.path.basename(path)} 不是题目数组")
+        items.extend(data)
+    return items
+
+
+def paper_names(name, copies):
+    # 一份时直接用名称，多份时加序号：期末_0001.json ...
+    if copies == 1:
+        return [f"{name}.json"]
+    width = max(4, len(str(copies)))
+    return [f"{name}_{i:0{width}d}.json" for i in range(1, copies + 1)]
+
+
+def write_papers(conn, json_dir, name, counts, copies=1, sources=None, exclude=(), seed=None, threshold=THRESHOLD,
+                 on_paper=None, overwrite=False):
+    """生成 copies 份试卷写到 json_dir，返回 [(文件名, 文件内容), ...]
+
+    seed 相同时生成的试卷相同，第 i 份试卷使用 seed + i；不指定时随机。
+    json_dir 中已有同名文件时报错，overwrite 为真时才覆盖。
+    试卷先写到临时文件，全部生成后才替换成正式文件名；
+    on_paper(已完成份数) 在每份试卷写完后调用，可用于汇报进度或中途取消，取消或出错时只删除临时文件，已有的文件不受影响。
+    """
+    if not sum(counts.values()):
+        raise ValueError("请至少为一种题型指定题数")
+    names = paper_names(name, copies)
+    if not overwrite:
+        existing = [file_name for file_name in names if os.path.exists(os.path.join(json_dir, file_name))]
+        if existing:
+            raise ValueError(f"{json_dir} 中已有同名文件 {'、'.join(existing[:5])}{' 等' if len(existing) > 5 else ''}，"
+                             "请换一个试卷名称")
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    generator = PaperGenerator(conn, sources, exclude, threshold)
+    os.makedirs(json_dir, exist_ok=True)
+    papers = []
+    try:
+        for i, file_name in enumerate(names):
+            data = paper_data(generator.generate(counts, random.Random(seed + i)))
+            with open(os.path.join(json_dir, file_name + '.tmp'), 'wb') as f:
+                f.write(data)
+            papers.append((file_name, data))
+            if on_paper is not None:
+                on_paper(len(papers))
+    except BaseException:
+        for file_name, _ in papers:
+            os.remove(os.path.join(json_dir, file_name + '.tmp'))
+        raise
+    for file_name, _ in papers:
+        os.replace(os.path.join(json_dir, file_name + '.tmp'), os.path.join(json_dir, file_name))
+    return papers
@@ -0,0 +1,160 @@
+import re
+
+from timu_docx import iter_docx_lines
+
+# 一次匹配就能判断出一行是题号、答案、解析还是选项
+LINE_RE = re.compile(
+    r'^\s*(?:(?P<num>\d+)[\.。]|(?P<answer>答案)[:：]|(?P<analysis>解析)[:：]'
+    r'|(?P<option>[A-E])(?:[\.。、]|(?![A-Za-z0-9])))\s*(?P<text>.*)$'
+)
+# 同一行写了多个选项（“A.甲   B.乙   C.丙”）时，后面各个选项的开头
+INLINE_OPTION_RE = re.compile(r'\s+([B-E])[\.。、]\s*')
+# 同一行内“答案：A 解析：……”的写法
+INLINE_ANALYSIS_RE = re.compile(r'\s*解析[:：]\s*')
+
+# 状态机的各个状态
+STATE_SKIP = 0      # 第一道题之前的内容
+STATE_TITLE = 1
+STATE_OPTION = 2
+STATE_ANSWER = 3
+STATE_ANALYSIS = 4
+
+
+def normalize_line(line):
+    # 全角点号统一为半角，去掉行尾换行和空白
+    if '．' in line:
+        line = line.replace('．', '.')
+    return line.rstrip()
+
+
+def split_options(letter, text):
+    # 把一行中的多个选项拆开，后面的字母必须依次递增，选项内容中偶然出现的“ C.”不会被拆开
+    options = []
+    expected = chr(ord(letter) + 1)
+    start = 0
+    for match in INLINE_OPTION_RE.finditer(text):
+        if match.group(1) != expected:
+            continue
+        options.append(text[start:match.start()])
+        start = match.end()
+        expected = chr(ord(expected) + 1)
+    options.append(text[start:])
+    return options
+
+
+def parse_timu(lines):
+    """逐行解析题目文本，每解析完一道题就产出一条题目记录
+
+    lines 可以是任意按行迭代的对象（文件、列表等），不会一次性读入全部内容。
+    产出的记录格式为 {'title', 'option', 'answer', 'analysis'}，ID 由调用方生成。
+    """
+    state = STATE_SKIP
+    title = []
+    options = []
+    answer = []
+    analysis = []
+
+    def build():
+        return {
+            'title': '\n'.join(title).strip(),
+            'option': [opt.strip() for opt in options],
+            'answer': '\n'.join(answer).strip(),
+            'analysis': '\n'.join(analysis).strip()
+        }
+
+    for line in lines:
+        line = normalize_line(line)
+        match = LINE_RE.match(line)
+        if match:
+            num, is_answer, is_analysis, letter, text = match.groups()
+        else:
+            num = is_answer = is_analysis = letter = None
+
+        if num:
+            if state != STATE_SKIP:
+                yield build()
+            state = STATE_TITLE
+            title = [text.strip()]
+            options = []
+            answer = []
+            analysis = []
+            continue
+
+        if state == STATE_SKIP:
+            continue
+
+        if is_answer and state != STATE_ANALYSIS:
+            state = STATE_ANSWER
+            parts = INLINE_ANALYSIS_RE.split(text, 1)
+            answer = [parts[0].strip()]
+            if len(parts) > 1:
+                state = STATE_ANALYSIS
+                analysis = [parts[1].strip()]
+            continue
+
+        if is_analysis:
+            state = STATE_ANALYSIS
+            analysis = [text.strip()]
+            continue
+
+        # 选项必须按 A、B、C…… 的顺序出现，避免把题干中的大写字母当成选项
+        if (letter and state in (STATE_TITLE, STATE_OPTION)
+                and ord(letter) - 65 == len(options)):
+            state = STATE_OPTION
+            options.extend(split_options(letter, text))
+            continue
+
+        text = line.strip()
+        if not text:
+            continue
+        if state == STATE_TITLE:
+            title.append(text)
+        elif state == STATE_OPTION:
+            options[-1] = options[-1].rstrip() + '\n' + text
+        elif state == STATE_ANSWER:
+            answer.append(text)
+        elif state == STATE_ANALYSIS:
+            analysis.append(text)
+
+    if state != STATE_SKIP:
+        yield build()
+
+
+def parse_timu_file(file_path):
+    # 按行流式读取TXT文件，utf-8-sig 可以去掉记事本保存时带的BOM；Word 文档（.docx）直接逐段落读取
+    if file_path.lower().endswith('.docx'):
+        yield from parse_timu(iter_docx_lines(file_path))
+        return
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        yield from parse_timu(f)
+
+
+def iter_range_lines(f, start, end):
+    """按字节范围切分大文件：只产出“题号行起点落在 [start, end) 内”的题目所需的行
+
+    f 需以二进制方式打开。范围前面残留的上一题内容会被解析器当作开头内容跳过，
+    范围末尾则一直读到下一道题的题号行为止，这样相邻的范围不会重复或遗漏题目。
+    """
+    if start > 0:
+        # 从 start-1 开始丢弃半行，正好落在 start 的题号行不会被跳过
+        f.seek(start - 1)
+        f.readline()
+    else:
+        f.seek(0)
+    pos = f.tell()
+    for raw in iter(f.readline, b''):
+        line = raw.decode('utf-8')
+        if pos == 0:
+            line = line.lstrip('\ufeff')
+        if pos >= end:
+            match = LINE_RE.match(normalize_line(line))
+            if match and match.group('num'):
+                return
+        pos += len(raw)
+        yield line
+
+
+def parse_timu_range(file_path, start, end):
+    # 解析文件中某个字节范围内的题目，供多进程分块解析使用
+    with open(file_path, 'rb') as f:
+        yield from parse_timu(iter_range_lines(f, start, end))
@@ -0,0 +1,400 @@
+"""答题记录服务：保存学生的答题事件、错题集和答题进度，随 timu_server.py 一起运行（--progress-dir）
+
+每个题库一个只追加的日志文件 <目录>/<题库ID>.log（题库ID按百分号编码成文件名，见 bank_file_name），每行一个JSON事件：
+    {"t": 时间, "u": 用户, "q": 题目ID, "r": 1}       答对
+    {"t": 时间, "u": 用户, "q": 题目ID, "r": 0}       答错，加入错题集
+    答题事件可以带 "a": "AC"，记录选择的选项，供 timu_analytics.py 统计各选项的选择次数
+    {"t": 时间, "u": 用户, "q": 题目ID, "d": 1}       从错题集中删除
+    {"t": 时间, "u": 用户, "q": 题目ID, "w": 1}       加入错题集但不计入答题数（上传浏览器中原有的错题）
+    {"t": 时间, "u": 用户, "m": "order", "p": 12}     顺序答题/背题模式的进度
+压缩后的日志以快照开头：{"s": {用户: {"w": [错题ID...], "p": {模式: 进度}, "n": 答题数, "c": 答对数}}}
+和 {"c": {题目ID: [答题次数, 答错次数]}}，后面接着新的事件。
+
+题库第一次被访问时在线程池中重放日志，在内存中为每个用户维护按题目ID索引的错题集，为每道题维护答题和答错次数；
+写入时每个请求的事件一次写入日志文件，fsync 每隔 FSYNC_INTERVAL 秒对有改动的文件批量执行一次。
+
+接口（都返回JSON）：
+    POST /api/progress/events   {"user": 用户, "bank": 题库ID, "events": [{"q": ID, "r": 0/1, "a": "AC"} | {"q": ID, "d": 1} | {"q": ID, "w": 1} | {"m": 模式, "p": 进度}]}
+    GET  /api/progress/state?user=用户&bank=题库ID     错题ID列表和各模式的进度
+    GET  /api/progress/stats?bank=题库ID&limit=50      答题人数、答题数和答错最多的题目
+
+用法：python timu_progress.py compact 目录    压缩全部日志
+"""
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import quote, unquote
+
+from timu_server import Response
+
+API_PREFIX = '/api/progress'
+# 每隔多少秒把写入的事件 fsync 到磁盘；进程崩溃不会丢数据，断电最多丢这段时间内的事件
+FSYNC_INTERVAL = 1.0
+# 每个请求最多带的事件数
+MAX_EVENTS = 1000
+# 日志超过这么多行、且远多于快照所需的行数时，启动时自动压缩
+COMPACT_LINES = 100000
+COMPACT_RATIO = 4
+# 用户ID写在日志中并作为字典键，只允许这些字符
+ID_RE = re.compile(r'^[A-Za-z0-9_.\-]{1,64}$')
+# 题库ID来自 JSONList，build_banks 用题库文件名作ID，可以是中文、带空格等，只排除控制字符
+BANK_ID_RE = re.compile(r'^[^\x00-\x1f\x7f]{1,255}$')
+# 编码后的日志文件名超过这个长度时改用散列
+MAX_FILE_NAME = 200
+# 题目ID不能含引号、逗号、反斜杠和控制字符，日志中的ID不需要转义，timu_analytics.py 可以直接按字节切分
+QID_RE = re.compile(r'^[^",\\\x00-\x1f]{1,64}$')
+# 选择的选项，与 timu.html 的 zidian 一致
+CHOICE_RE = re.compile(r'^[A-E]{1,5}$')
+MODES = ('order', 'recite')
+STATS_LIMIT = 50
+
+
+class UserProgress:
+    __slots__ = ('wrong', 'positions', 'answered', 'correct')
+
+    def __init__(self):
+        # 错题集：题目ID -> None，保持加入的先后顺序
+        self.wrong = {}
+        self.positions = {}
+        self.answered = 0
+        self.correct = 0
+
+    def snapshot(self):
+        return {'w': list(self.wrong), 'p': self.positions, 'n': self.answered, 'c': self.correct}
+
+    @classmethod
+    def from_snapshot(cls, data):
+        user = cls()
+        user.wrong = dict.fromkeys(data.get('w', []))
+        user.positions = dict(data.get('p', {}))
+        user.answered = data.get('n', 0)
+        user.correct = data.get('c', 0)
+        return user
+
+
+class BankProgress:
+    """一个题库的全部答题记录：日志文件、每个用户的进度和每道题的统计"""
+
+    def __init__(self, path):
+        self.path = path
+        self.users = {}
+        # 题目ID -> [答题次数, 答错次数]
+        self.questions = {}
+        self.lines = 0
+        self.file = None
+        self.dirty = False
+
+    def user(self, name):
+        user = self.users.get(name)
+        if user is None:
+            user = self.users[name] = UserProgress()
+        return user
+
+    def apply(self, event):
+        # 把一个事件应用到内存中的状态，重放日志和新写入的事件都走这里
+        if 't' not in event:
+            # 快照没有时间字段
+            for name, data in event.get('s', {}).items():
+                self.users[name] = UserProgress.from_snapshot(data)
+            for qid, counts in event.get('c', {}).items():
+                self.questions[qid] = list(counts)
+            return
+        user = self.user(event['u'])
+        if 'm' in event:
+            user.positions[event['m']] = event['p']
+        elif 'd' in event:
+            user.wrong.pop(event['q'], None)
+        elif 'w' in event:
+            user.wrong[event['q']] = None
+        else:
+            qid = event['q']
+            counts = self.questions.get(qid)
+            if counts is None:
+                counts = self.questions[qid] = [0, 0]
+            counts[0] += 1
+            user.answered += 1
+            if event['r']:
+                user.correct += 1
+            else:
+                counts[1] += 1
+                user.wrong[qid] = None
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # 断电时最后一行可能只写了一半
+                    continue
+                self.apply(event)
+                self.lines += 1
+
+    def open(self):
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        return self.file
+
+    def write(self, events):
+        # 一个请求的事件拼成一次写入，立即交给操作系统，fsync 由 ProgressService.sync_loop 批量执行
+        f = self.open()
+        f.write("".join(json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n" for event in events))
+        f.flush()
+        self.lines += len(events)
+        self.dirty = True
+
+    def needs_compact(self):
+        return self.lines > COMPACT_LINES and self.lines > COMPACT_RATIO * (len(self.users) + 1)
+
+    def compact(self):
+        # 用快照替换日志：先写临时文件并 fsync，再原子替换
+        self.close()
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'s': {name: user.snapshot() for name, user in self.users.items()}},
+                               ensure_ascii=False, separators=(',', ':')) + "\n")
+            f.write(json.dumps({'c': self.questions}, ensure_ascii=False, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.lines = 2
+
+    def close(self):
+        if self.file is not None:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            self.file = None
+            self.dirty = False
+
+
+def load_bank(path):
+    # 重放日志，行数太多时压缩；只读写这一个文件，可以在线程池中执行
+    bank = BankProgress(path)
+    bank.load()
+    if bank.needs_compact():
+        bank.compact()
+    return bank
+
+
+def bank_file_name(bank_id):
+    """题库ID对应的日志文件名：按百分号编码，不会含路径分隔符；只含字母、数字和 _.-~ 的ID编码后不变
+
+    编码后太长（如很长的中文名称）时用 @ 加ID的散列，百分号编码的结果中不会出现 @，两种文件名不会冲突。
+    """
+    name = quote(bank_id, safe='')
+    if len(name) > MAX_FILE_NAME:
+        name = '@' + hashlib.sha1(bank_id.encode('utf-8')).hexdigest()
+    return name + '.log'
+
+
+def parse_event(user, item, now):
+    # 校验浏览器发来的事件，转换成日志中的格式；格式不对时返回 None
+    if not isinstance(item, dict):
+        return None
+    if 'm' in item:
+        if item['m'] not in MODES or not isinstance(item.get('p'), int) or item['p'] < 0:
+            return None
+        return {'t': now, 'u': user, 'm': item['m'], 'p': item['p']}
+    qid = item.get('q')
+    if not isinstance(qid, (str, int)) or isinstance(qid, bool) or not QID_RE.match(str(qid)):
+        return None
+    if item.get('d'):
+        return {'t': now, 'u': user, 'q': str(qid), 'd': 1}
+    if item.get('w'):
+        return {'t': now, 'u': user, 'q': str(qid), 'w': 1}
+    if 'r' not in item:
+        return None
+    event = {'t': now, 'u': user, 'q': str(qid), 'r': 1 if item['r'] else 0}
+    if isinstance(item.get('a'), str) and CHOICE_RE.match(item['a']):
+        event['a'] = item['a']
+    return event
+
+
+class ProgressStore:
+    """全部题库的答题记录，题库在第一次访问时加载"""
+
+    def __init__(self, data_dir):
+        self.data_dir = os.path.abspath(data_dir)
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.banks = {}
+
+    def path(self, bank_id):
+        return os.path.join(self.data_dir, bank_file_name(bank_id))
+
+    def bank(self, bank_id):
+        bank = self.banks.get(bank_id)
+        if bank is None:
+            bank = self.banks[bank_id] = load_bank(self.path(bank_id))
+        return bank
+
+    def load_all(self):
+        # 散列得到的文件名无法还原出题库ID，用文件名代替
+        for name in sorted(os.listdir(self.data_dir)):
+            if name.endswith('.log'):
+                bank_id = unquote(name[:-4])
+                if bank_id not in self.banks:
+                    self.banks[bank_id] = load_bank(os.path.join(self.data_dir, name))
+
+    def append(self, user, bank_id, items):
+        """写入一批事件并更新内存中的状态，返回写入的事件数"""
+        now = int(time.time())
+        events = [event for event in (parse_event(user, item, now) for item in items) if event is not None]
+        if not events:
+            return 0
+        bank = self.bank(bank_id)
+        bank.write(events)
+        for event in events:
+            bank.apply(event)
+        return len(events)
+
+    def state(self, user, bank_id):
+        bank = self.bank(bank_id)
+        progress = bank.users.get(user)
+        if progress is None:
+            return {'known': False, 'wrong': [], 'positions': {}}
+        return {'known': True, 'wrong': list(progress.wrong), 'positions': progress.positions,
+                'answered': progress.answered, 'correct': progress.correct}
+
+    def stats(self, bank_id, limit=STATS_LIMIT):
+        bank = self.bank(bank_id)
+        answered = sum(counts[0] for counts in bank.questions.values())
+        wrong = sum(counts[1] for counts in bank.questions.values())
+        hardest = sorted(bank.questions.items(), key=lambda item: (-item[1][1], -item[1][0], item[0]))[:limit]
+        return {
+            'users': len(bank.users),
+            'answered': answered,
+            'wrong': wrong,
+            'questions': len(bank.questions),
+            'hardest': [{'id': qid, 'answered': counts[0], 'wrong': counts[1],
+                         'error_rate': round(counts[1] / counts[0], 3) if counts[0] else 0}
+                        for qid, counts in hardest],
+        }
+
+    def dirty_files(self):
+        files = [bank.file for bank in self.banks.values() if bank.dirty and bank.file is not None]
+        for bank in self.banks.values():
+            bank.dirty = False
+        return files
+
+    def close(self):
+        for bank in self.banks.values():
+            bank.close()
+
+
+class ProgressService:
+    """把 ProgressStore 挂到 timu_server.BankServer 上，并在后台定时批量 fsync"""
+
+    def __init__(self, store):
+        self.store = store
+        self._sync_task = None
+        # 正在线程池中加载的题库：题库ID -> Future
+        self._loading = {}
+
+    def install(self, server):
+        server.routes[API_PREFIX + '/events'] = self.handle_events
+        server.routes[API_PREFIX + '/state'] = self.handle_state
+        server.routes[API_PREFIX + '/stats'] = self.handle_stats
+        self._sync_task = asyncio.ensure_future(self.sync_loop())
+
+    async def sync_loop(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                await asyncio.sleep(FSYNC_INTERVAL)
+                files = self.store.dirty_files()
+                if files:
+                    # 文件只在关闭服务时才关闭，在线程池中 fsync 不会碰到已关闭的文件
+                    await loop.run_in_executor(None, lambda: [os.fsync(f.fileno()) for f in files])
+        finally:
+            self.store.close()
+
+    async def bank(self, bank_id):
+        """题库第一次被访问时在线程池中重放日志，期间其他请求照常处理；同时访问同一题库的请求等待同一次加载"""
+        bank = self.store.banks.get(bank_id)
+        if bank is not None:
+            return bank
+        future = self._loading.get(bank_id)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(None, load_bank, self.store.path(bank_id))
+            self._loading[bank_id] = future
+            # 先于等待的请求执行，请求恢复时题库已经登记
+            future.add_done_callback(lambda f: self._loaded(bank_id, f))
+        # 某个请求被取消时不取消加载
+        return await asyncio.shield(future)
+
+    def _loaded(self, bank_id, future):
+        del self._loading[bank_id]
+        if not future.cancelled() and future.exception() is None:
+            self.store.banks[bank_id] = future.result()
+
+    async def handle_events(self, request):
+        if request.method != 'POST':
+            return Response.text(405)
+        try:
+            data = json.loads(request.body.decode('utf-8'))
+            user, bank = data['user'], data['bank']
+            events = data['events']
+        except (ValueError, KeyError, TypeError):
+            return Response.text(400, "请求格式错误")
+        if not valid_id(user) or not valid_bank_id(bank) or not isinstance(events, list) or len(events) > MAX_EVENTS:
+            return Response.text(400, "用户、题库ID或事件数不合法")
+        progress_bank = await self.bank(bank)
+        count = self.store.append(user, bank, events)
+        progress = progress_bank.users.get(user)
+        return Response.json({'accepted': count, 'wrong': len(progress.wrong) if progress else 0})
+
+    async def handle_state(self, request):
+        user = first_param(request, 'user')
+        bank = first_param(request, 'bank')
+        if not valid_id(user) or not valid_bank_id(bank):
+            return Response.text(400, "用户或题库ID不合法")
+        await self.bank(bank)
+        return Response.json(self.store.state(user, bank))
+
+    async def handle_stats(self, request):
+        bank = first_param(request, 'bank')
+        if not valid_bank_id(bank):
+            return Response.text(400, "题库ID不合法")
+        try:
+            limit = int(first_param(request, 'limit') or STATS_LIMIT)
+        except ValueError:
+            limit = STATS_LIMIT
+        await self.bank(bank)
+        return Response.json(self.store.stats(bank, max(0, min(limit, 1000))))
+
+
+def valid_id(value):
+    return isinstance(value, str) and ID_RE.match(value) is not None and value not in ('.', '..')
+
+
+def valid_bank_id(value):
+    return isinstance(value, str) and BANK_ID_RE.match(value) is not None
+
+
+def first_param(request, name):
+    values = request.query.get(name)
+    return values[0] if values else None
+
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != 'compact':
+        print("用法：python timu_progress.py compact 目录")
+        return 1
+    store = ProgressStore(sys.argv[2])
+    store.load_all()
+    for bank_id, bank in store.banks.items():
+        before = bank.lines
+        bank.compact()
+        print(f"{bank_id}: {before} 行 -> {bank.lines} 行（{len(bank.users)} 个用户）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import sqlite3
+
+# 搜索结果最多返回的条数
+SEARCH_LIMIT = 500
+# trigram 分词至少需要3个字符才能走全文索引
+MIN_FTS_TERM = 3
+
+FTS_COLUMNS = "title, option, answer, analysis, source"
+# 太短的词用 LIKE 查询，检索的列与全文索引相同，有没有 FTS5 搜索结果都一样
+SEARCH_COLUMNS = FTS_COLUMNS.split(", ")
+LIKE_CONDITION = "(" + " OR ".join(f"t.{column} LIKE ?" for column in SEARCH_COLUMNS) + ")"
+
+# 只在索引的列变化时更新全文索引，修改摘要、题型等其他列不会重写索引
+FTS_UPDATE_TRIGGER = f'''
+    CREATE TRIGGER IF NOT EXISTS timu_fts_au AFTER UPDATE OF {FTS_COLUMNS} ON timu BEGIN
+        INSERT INTO timu_fts(timu_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.rowid, old.title, old.option, old.answer, old.analysis, old.source);
+        INSERT INTO timu_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.rowid, new.title, new.option, new.answer, new.analysis, new.source);
+    END
+    '''
+
+FTS_SCHEMA = [
+    f'''
+    CREATE VIRTUAL TABLE IF NOT EXISTS timu_fts USING fts5(
+        {FTS_COLUMNS}, content='timu', content_rowid='rowid', tokenize='trigram'
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_fts_ai AFTER INSERT ON timu BEGIN
+        INSERT INTO timu_fts(rowid, {FTS_COLUMNS})
+        VALUES (new.rowid, new.title, new.option, new.answer, new.analysis, new.source);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS timu_fts_ad AFTER DELETE ON timu BEGIN
+        INSERT INTO timu_fts(timu_fts, rowid, {FTS_COLUMNS})
+        VALUES ('delete', old.rowid, old.title, old.option, old.answer, old.analysis, old.source);
+    END
+    ''',
+    FTS_UPDATE_TRIGGER,
+]
+
+# 排序时各列的权重：题干最重要，其次是答案、选项
+RANK_SQL = "bm25(timu_fts, 10.0, 2.0, 5.0, 1.0, 1.0)"
+
+
+def fts_available(conn):
+    row = conn.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='timu_fts'").fetchone()
+    return row is not None
+
+
+def ensure_fts(conn):
+    """创建全文索引及同步触发器，旧数据库第一次打开时会为已有题目建立索引
+
+    当前SQLite不支持 FTS5 或 trigram 分词时返回 False，搜索会退回 LIKE 查询。
+    """
+    if fts_available(conn):
+        return True
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp.fts_probe")
+    except sqlite3.OperationalError:
+        return False
+    # 建表、建触发器和补建索引放在同一个事务里，中途失败不会留下半成品索引
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # 旧版本按 ASCII 转义保存的选项已由 timu_db 的结构升级转成原文，这里只建索引
+        for sql in FTS_SCHEMA:
+            conn.execute(sql)
+        conn.execute("INSERT INTO timu_fts(timu_fts) VALUES ('rebuild')")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return True
+
+
+def fts_phrase(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def like_params(terms):
+    params = []
+    for term in terms:
+        params.extend([f"%{term}%"] * len(SEARCH_COLUMNS))
+    return params
+
+
+def like_search(conn, keyword, limit=SEARCH_LIMIT, offset=0):
+    # 没有全文索引或关键字都太短时的退路：每个词都要命中，全表 LIKE 扫描，找到 offset + limit 条就停止；
+    # 按 rowid 排序，分页时结果不会重复或遗漏
+    terms = keyword.split()
+    sql = "SELECT t.id, t.title, t.answer, t.source FROM timu t"
+    if terms:
+        sql += " WHERE " + " AND ".join([LIKE_CONDITION] * len(terms))
+    sql += " ORDER BY t.rowid LIMIT ? OFFSET ?"
+    return conn.execute(sql, like_params(terms) + [limit, offset]).fetchall()
+
+
+def search_timu(conn, keyword, limit=SEARCH_LIMIT, offset=0):
+    """搜索题目，返回按相关度排序的 (id, title, answer, source) 列表
+
+    关键字按空格拆分，每个词都要命中；不少于3个字的词走 FTS5 trigram 索引，
+    更短的词在索引结果上再用 LIKE 过滤。所有词都太短时退回 LIKE 查询。
+    offset 用于分页加载结果。
+    """
+    terms = keyword.split()
+    long_terms = [term for term in terms if len(term) >= MIN_FTS_TERM]
+    short_terms = [term for term in terms if len(term) < MIN_FTS_TERM]
+    if not long_terms or not fts_available(conn):
+        return like_search(conn, keyword, limit, offset)
+
+    sql = ("SELECT t.id, t.title, t.answer, t.source FROM timu_fts f JOIN timu t ON t.rowid = f.rowid "
+           "WHERE timu_fts MATCH ?")
+    params = [" AND ".join(fts_phrase(term) for term in long_terms)]
+    for term in short_terms:
+        sql += " AND " + LIKE_CONDITION
+    params.extend(like_params(short_terms))
+    # 相关度相同的按 rowid 排序，分页时结果不会重复或遗漏
+    sql += f" ORDER BY {RANK_SQL}, t.rowid LIMIT ? OFFSET ?"
+    params.extend([limit, offset])
+    return conn.execute(sql, params).fetchall()
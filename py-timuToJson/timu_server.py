@@ -0,0 +1,614 @@
+"""刷题页面和题库的静态文件服务器，代替 python -m http.server
+
+基于 asyncio，单进程即可同时处理几百个连接：
+- 常用文件缓存在内存中（按最近使用淘汰），文件修改后自动重新读取
+- 客户端支持时发送 gzip 压缩的内容，优先使用 build_banks.py 生成的 .gz 文件，没有时压缩一次后缓存
+- 发送 ETag 和 Last-Modified，客户端带 If-None-Match / If-Modified-Since 且文件没变时返回 304
+- 支持 Range 请求（单个范围），大文件可以断点续传
+- json/build/ 下带内容哈希的发布文件允许永久缓存，其余文件每次都要向服务器验证
+- /__stats 返回请求数、状态码分布、吞吐量、延迟分位数和缓存命中率
+- 指定 --progress-dir 时在 /api/progress 下提供答题记录接口（见 timu_progress.py），刷题页面的错题集和进度保存在服务器上
+
+只对外提供仓库根目录下的 .html 页面和 css/、js/、json/ 目录，数据库和脚本不会被访问到。
+
+用法：python timu_server.py [--root 仓库根目录] [--host 0.0.0.0] [--port 8000] [--cache-mb 256] [--progress-dir progress]
+"""
+import argparse
+import asyncio
+import collections
+import email.utils
+import gzip
+import json
+import mimetypes
+import os
+import re
+import stat as stat_module
+import time
+import urllib.parse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# 允许访问的目录和根目录下的文件类型
+PUBLIC_DIRS = ('css', 'js', 'json')
+PUBLIC_EXTENSIONS = ('.html', '.ico')
+INDEX_FILE = 'index.html'
+
+# 内存缓存的总大小；超过总大小四分之一的文件不缓存，每次从磁盘发送
+CACHE_BYTES = 256 * 1024 * 1024
+MAX_ENTRY_FRACTION = 0.25
+# 缓存的文件最多隔这么多秒检查一次是否被修改
+STAT_INTERVAL = 1.0
+# 小于这个大小的文件不压缩
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+GZIP_TYPES = ('text/', 'application/javascript', 'application/json', 'application/x-ndjson', 'image/svg+xml')
+
+KEEPALIVE_TIMEOUT = 15
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+STATS_PATH = '/__stats'
+# 计算延迟分位数时保留的最近请求数，以及吞吐量统计的时间窗口（秒）
+LATENCY_SAMPLES = 10000
+RATE_WINDOW = 60
+
+# build_banks.py 生成的带哈希的文件名，如 build/2017.3f2a9c1d.json
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{8}\.[^/]+$')
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+CACHE_REVALIDATE = 'no-cache'
+
+CONTENT_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.json': 'application/json; charset=utf-8',
+    '.ndjson': 'application/x-ndjson; charset=utf-8',
+    '.tmb': 'application/octet-stream',
+    '.svg': 'image/svg+xml',
+    '.woff': 'font/woff',
+    '.woff2': 'font/woff2',
+}
+
+STATUS_TEXT = {
+    200: 'OK',
+    204: 'No Content',
+    206: 'Partial Content',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    403: 'Forbidden',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    416: 'Range Not Satisfiable',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+}
+
+
+def content_type(path):
+    ext = os.path.splitext(path)[1].lower()
+    return CONTENT_TYPES.get(ext) or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+
+
+def http_date(timestamp=None):
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def accepts_gzip(header):
+    # Accept-Encoding: gzip, deflate, br / gzip;q=0；q 值无法解析时按不接受处理
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            q = params.strip()
+            if not q.startswith('q='):
+                return True
+            try:
+                return float(q[2:] or 0) > 0
+            except ValueError:
+                return False
+    return False
+
+
+def content_length(headers):
+    # 请求体长度，没有 Content-Length 时为 0；不是非负整数时返回 None
+    value = headers.get('content-length')
+    if value is None:
+        return 0
+    value = value.strip()
+    return int(value) if value.isascii() and value.isdigit() else None
+
+
+def etag_matches(header, etags):
+    # If-None-Match 使用弱比较，W/ 前缀忽略
+    for tag in (header or '').split(','):
+        tag = tag.strip()
+        if tag == '*':
+            return True
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag in etags:
+            return True
+    return False
+
+
+def parse_range(header, size):
+    """解析 Range 头，返回 (起始, 结束)（包含结束位置）；不是单个字节范围时返回 None，范围无效时返回 False"""
+    unit, _, spec = (header or '').partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    start, sep, end = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        if start == '':
+            # bytes=-500 表示最后500个字节
+            length = int(end)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+class Request:
+    def __init__(self, method, target, version, headers, body=b''):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers
+        self.body = body
+        parts = urllib.parse.urlsplit(target)
+        self.path = urllib.parse.unquote(parts.path)
+        self.query = urllib.parse.parse_qs(parts.query)
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+
+def parse_request_head(data):
+    # 解析请求行和请求头，头名称统一转成小写；格式错误时返回 None
+    try:
+        lines = data.decode('latin-1').split('\r\n')
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        return None
+    if not version.startswith('HTTP/1.'):
+        return None
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, sep, value = line.partition(':')
+        if not sep:
+            return None
+        headers[name.strip().lower()] = value.strip()
+    return Request(method, target, version, headers)
+
+
+class Response:
+    """响应：body 为内存中的内容；file 为 (路径, 起始位置, 长度)，大文件直接从磁盘发送"""
+
+    def __init__(self, status, body=b'', headers=None, file=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or []
+        self.file = file
+        # HEAD 请求不发送正文，但 Content-Length 仍是完整响应的长度
+        self.length = len(body) if file is None else file[2]
+
+    @classmethod
+    def text(cls, status, message=None):
+        body = (message or STATUS_TEXT.get(status, '')).encode('utf-8')
+        return cls(status, body, [('Content-Type', 'text/plain; charset=utf-8')])
+
+    @classmethod
+    def json(cls, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        return cls(status, body, [('Content-Type', 'application/json; charset=utf-8'), ('Cache-Control', 'no-store')])
+
+
+class FileEntry:
+    # 缓存中的一个文件；data 为 None 表示文件太大不缓存内容，只缓存校验信息
+    def __init__(self, path, stat, data):
+        self.path = path
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.checked = time.monotonic()
+        self.data = data
+        self.gzip_data = None
+        self.gzip_task = None
+        self.content_type = content_type(path)
+        self.etag = f'"{self.size:x}-{self.mtime_ns:x}"'
+        self.gzip_etag = f'"{self.size:x}-{self.mtime_ns:x}-gz"'
+        self.last_modified = http_date(stat.st_mtime)
+
+    @property
+    def cost(self):
+        return len(self.data or b'') + len(self.gzip_data or b'')
+
+    @property
+    def compressible(self):
+        return self.data is not None and self.size >= GZIP_MIN_SIZE and self.content_type.startswith(GZIP_TYPES)
+
+
+def read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def load_gzip(entry):
+    # 优先使用比原文件新的预压缩 .gz 文件，否则现场压缩；压缩后没有变小时返回 None
+    gz_path = entry.path + '.gz'
+    try:
+        if os.stat(gz_path).st_mtime_ns >= entry.mtime_ns:
+            return read_file(gz_path)
+    except OSError:
+        pass
+    data = gzip.compress(entry.data, GZIP_LEVEL, mtime=0)
+    return data if len(data) < entry.size else None
+
+
+class FileCache:
+    """最近使用的文件内容缓存，总大小超过 max_bytes 时淘汰最久没有使用的文件
+
+    读文件和压缩在线程池中执行，不阻塞事件循环。
+    """
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()
+        # 正在读取的文件，同一文件同时有很多请求未命中时只读取一次
+        self.loading = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def lookup(self, path):
+        # 文件不存在时抛出 OSError
+        entry = self.entries.get(path)
+        if entry is not None:
+            now = time.monotonic()
+            if now - entry.checked < STAT_INTERVAL:
+                self.hit(entry)
+                return entry
+            entry.checked = now
+            try:
+                stat = await asyncio.get_running_loop().run_in_executor(None, os.stat, path)
+            except OSError:
+                self.remove(entry)
+                raise
+            if stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns:
+                self.hit(entry)
+                return entry
+            self.remove(entry)
+        task = self.loading.get(path)
+        if task is None:
+            task = self.loading[path] = asyncio.ensure_future(self.load(path))
+            task.add_done_callback(lambda _: self.loading.pop(path, None))
+        else:
+            self.hits += 1
+        return await asyncio.shield(task)
+
+    async def load(self, path):
+        loop = asyncio.get_running_loop()
+        stat = await loop.run_in_executor(None, os.stat, path)
+        if not stat_module.S_ISREG(stat.st_mode):
+            raise IsADirectoryError(path)
+        self.misses += 1
+        data = None
+        if stat.st_size <= self.max_bytes * MAX_ENTRY_FRACTION:
+            data = await loop.run_in_executor(None, read_file, path)
+        entry = FileEntry(path, stat, data)
+        if data is not None and len(data) != entry.size:
+            # 读取时文件正在被改写，这次不缓存
+            return entry
+        self.entries[path] = entry
+        self.bytes += entry.cost
+        self.evict()
+        return entry
+
+    async def gzip(self, entry):
+        # 每个文件只压缩一次，压缩期间到达的请求等待同一个结果
+        if entry.gzip_task is None:
+            entry.gzip_task = asyncio.ensure_future(self.compress(entry))
+        return await asyncio.shield(entry.gzip_task)
+
+    async def compress(self, entry):
+        entry.gzip_data = await asyncio.get_running_loop().run_in_executor(None, load_gzip, entry)
+        if self.entries.get(entry.path) is entry:
+            self.bytes += len(entry.gzip_data or b'')
+            self.evict()
+        return entry.gzip_data
+
+    def hit(self, entry):
+        self.hits += 1
+        self.entries.move_to_end(entry.path)
+
+    def remove(self, entry):
+        if self.entries.get(entry.path) is entry:
+            del self.entries[entry.path]
+            self.bytes -= entry.cost
+
+    def evict(self):
+        while self.bytes > self.max_bytes and len(self.entries) > 1:
+            self.remove(next(iter(self.entries.values())))
+            self.evictions += 1
+
+
+class ServerStats:
+    """请求统计：状态码分布、发送字节数、最近 RATE_WINDOW 秒的吞吐量和最近 LATENCY_SAMPLES 个请求的延迟"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = 0
+        self.bytes_sent = 0
+        self.status = collections.Counter()
+        self.connections = 0
+        self.open_connections = 0
+        self.latencies = collections.deque(maxlen=LATENCY_SAMPLES)
+        # 每秒一个 [秒, 请求数, 字节数]
+        self.seconds = collections.deque()
+
+    def record(self, status, nbytes, latency):
+        self.requests += 1
+        self.bytes_sent += nbytes
+        self.status[status] += 1
+        self.latencies.append(latency)
+        second = int(time.monotonic())
+        if self.seconds and self.seconds[-1][0] == second:
+            self.seconds[-1][1] += 1
+            self.seconds[-1][2] += nbytes
+        else:
+            self.seconds.append([second, 1, nbytes])
+        while self.seconds and self.seconds[0][0] <= second - RATE_WINDOW:
+            self.seconds.popleft()
+
+    def snapshot(self, cache):
+        now = int(time.monotonic())
+        window = [s for s in self.seconds if s[0] > now - RATE_WINDOW]
+        span = min(RATE_WINDOW, max(1.0, time.time() - self.started))
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 3)
+
+        lookups = cache.hits + cache.misses
+        return {
+            'uptime': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'bytes_sent': self.bytes_sent,
+            'status': {str(code): count for code, count in sorted(self.status.items())},
+            'connections': self.connections,
+            'open_connections': self.open_connections,
+            'requests_per_sec': round(sum(s[1] for s in window) / span, 1),
+            'bytes_per_sec': round(sum(s[2] for s in window) / span),
+            'latency_ms': {'p50': percentile(0.5), 'p90': percentile(0.9), 'p99': percentile(0.99),
+                           'max': percentile(1.0), 'samples': len(latencies)},
+            'cache': {'entries': len(cache.entries), 'bytes': cache.bytes, 'max_bytes': cache.max_bytes,
+                      'hits': cache.hits, 'misses': cache.misses, 'evictions': cache.evictions,
+                      'hit_rate': round(cache.hits / lookups, 3) if lookups else 0},
+        }
+
+
+class BankServer:
+    """静态文件服务器；routes 中的路径交给对应的处理函数，其余按静态文件处理
+
+    处理函数的签名为 async handler(request) -> Response。
+    """
+
+    def __init__(self, root=ROOT_DIR, cache_bytes=CACHE_BYTES):
+        self.root = os.path.realpath(root)
+        self.cache = FileCache(cache_bytes)
+        self.stats = ServerStats()
+        self.routes = {STATS_PATH: self.handle_stats}
+
+    async def start(self, host='0.0.0.0', port=8000):
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+
+    async def handle_connection(self, reader, writer):
+        self.stats.connections += 1
+        self.stats.open_connections += 1
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    await self.send(writer, None, Response.text(431), False)
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                start = time.perf_counter()
+                request = parse_request_head(head)
+                if request is None:
+                    await self.send(writer, None, Response.text(400), False)
+                    break
+                length = content_length(request.headers)
+                if length is None:
+                    await self.send(writer, request, Response.text(400), False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await self.send(writer, request, Response.text(413), False)
+                    break
+                if length:
+                    try:
+                        request.body = await asyncio.wait_for(reader.readexactly(length), KEEPALIVE_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        break
+                response = await self.respond(request)
+                keep_alive = request.keep_alive
+                sent = await self.send(writer, request, response, keep_alive)
+                self.stats.record(response.status, sent, time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.stats.open_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def respond(self, request):
+        try:
+            handler = self.routes.get(request.path)
+            if handler is not None:
+                return await handler(request)
+            if request.method not in ('GET', 'HEAD'):
+                return Response.text(405)
+            return await self.serve_file(request)
+        except Exception as e:
+            return Response.text(500, f"服务器错误: {str(e)}")
+
+    async def send(self, writer, request, response, keep_alive):
+        # 写出响应，返回发送的正文字节数
+        headers = [('Date', http_date()), ('Server', 'timu_server'),
+                   ('Connection', 'keep-alive' if keep_alive else 'close')]
+        headers.extend(response.headers)
+        if response.status != 304:
+            headers.append(('Content-Length', str(response.length)))
+        lines = [f"HTTP/1.1 {response.status} {STATUS_TEXT.get(response.status, '')}"]
+        lines.extend(f"{name}: {value}" for name, value in headers)
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+        sent = 0
+        if (request is not None and request.method == 'HEAD') or response.status == 304:
+            pass
+        elif response.file is not None:
+            path, offset, length = response.file
+            with open(path, 'rb') as f:
+                await writer.drain()
+                await asyncio.get_running_loop().sendfile(writer.transport, f, offset, length)
+            sent = length
+        else:
+            writer.write(response.body)
+            sent = len(response.body)
+        await writer.drain()
+        return sent
+
+    def resolve(self, url_path):
+        # URL 路径转换为文件路径；不允许访问公开范围以外的文件，返回 None
+        if '\0' in url_path:
+            return None
+        parts = [part for part in url_path.split('/') if part]
+        if any(part.startswith('.') for part in parts):
+            return None
+        if not parts:
+            parts = [INDEX_FILE]
+        if len(parts) == 1:
+            if os.path.splitext(parts[0])[1].lower() not in PUBLIC_EXTENSIONS:
+                return None
+        elif parts[0] not in PUBLIC_DIRS:
+            return None
+        path = os.path.realpath(os.path.join(self.root, *parts))
+        if not path.startswith(self.root + os.sep):
+            return None
+        return path
+
+    async def serve_file(self, request):
+        path = self.resolve(request.path)
+        if path is None:
+            return Response.text(404)
+        try:
+            entry = await self.cache.lookup(path)
+        except OSError:
+            return Response.text(404)
+
+        rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+        immutable = rel.startswith('json/build/') and HASHED_NAME_RE.search(rel)
+        headers = [('Content-Type', entry.content_type), ('Last-Modified', entry.last_modified),
+                   ('Cache-Control', CACHE_IMMUTABLE if immutable else CACHE_REVALIDATE),
+                   ('Accept-Ranges', 'bytes')]
+
+        range_header = request.headers.get('range')
+        if range_header and request.headers.get('if-range') not in (None, entry.etag, entry.last_modified):
+            # 客户端手里的版本已经过期，发送完整的文件
+            range_header = None
+
+        use_gzip = (not range_header and entry.compressible
+                    and accepts_gzip(request.headers.get('accept-encoding')))
+        if entry.compressible:
+            headers.append(('Vary', 'Accept-Encoding'))
+        gzip_data = await self.cache.gzip(entry) if use_gzip else None
+        etag = entry.gzip_etag if gzip_data is not None else entry.etag
+        headers.append(('ETag', etag))
+
+        if self.not_modified(request, entry):
+            return Response(304, headers=headers)
+
+        if range_header:
+            span = parse_range(range_header, entry.size)
+            if span is False:
+                return Response(416, headers=[('Content-Range', f"bytes */{entry.size}")])
+            if span is not None:
+                start, end = span
+                headers.append(('Content-Range', f"bytes {start}-{end}/{entry.size}"))
+                return self.file_response(206, entry, headers, start, end - start + 1)
+
+        if gzip_data is not None:
+            headers.append(('Content-Encoding', 'gzip'))
+            return Response(200, gzip_data, headers)
+        return self.file_response(200, entry, headers, 0, entry.size)
+
+    def not_modified(self, request, entry):
+        if_none_match = request.headers.get('if-none-match')
+        if if_none_match is not None:
+            return etag_matches(if_none_match, (entry.etag, entry.gzip_etag))
+        if_modified_since = request.headers.get('if-modified-since')
+        if if_modified_since is not None:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return entry.mtime_ns // 1000000000 <= since
+        return False
+
+    def file_response(self, status, entry, headers, offset, length):
+        if entry.data is not None:
+            return Response(status, entry.data[offset:offset + length] if length != entry.size else entry.data, headers)
+        return Response(status, headers=headers, file=(entry.path, offset, length))
+
+    async def handle_stats(self, request):
+        return Response.json(self.stats.snapshot(self.cache))
+
+
+async def serve(root, host, port, cache_bytes, progress_dir=None):
+    server = BankServer(root, cache_bytes)
+    if progress_dir:
+        from timu_progress import ProgressService, ProgressStore
+        ProgressService(ProgressStore(progress_dir)).install(server)
+    listener = await server.start(host, port)
+    addresses = ", ".join(f"http://{sock.getsockname()[0]}:{sock.getsockname()[1]}/" for sock in listener.sockets)
+    print(f"题库服务器已启动: {addresses}（根目录 {server.root}，统计 {STATS_PATH}）")
+    if progress_dir:
+        print(f"答题记录保存在 {os.path.abspath(progress_dir)}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="刷题页面和题库的静态文件服务器")
+    parser.add_argument('--root', default=ROOT_DIR, help="仓库根目录（包含 index.html 和 json/ 的目录）")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--cache-mb', type=int, default=CACHE_BYTES // 1024 // 1024, help="内存缓存大小（MB）")
+    parser.add_argument('--progress-dir', help="保存答题记录和错题集的目录，指定后启用 /api/progress 接口")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.root, args.host, args.port, args.cache_mb * 1024 * 1024, args.progress_dir))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""数据库连接：数据库路径、WAL日志、忙等待和重试，以及一个写连接加一组只读连接的连接池
+
+多个题目管理器、命令行导入同时打开同一个数据库时：
+- WAL 模式下读不阻塞写、写也不阻塞读，导入的大事务进行中，列表、搜索和导出照常读取提交前的数据
+- 写入之间仍然互斥，等待写锁的一方由 busy_timeout 排队，超时后抛出 "database is locked"
+- 同一进程中的写入都经过 Storage.writer() 这一个连接，由锁保证同一时间只有一个线程在写
+
+数据库路径和日志模式可以用环境变量 TIMU_DB、TIMU_JOURNAL_MODE 指定。WAL 依赖共享内存，
+数据库放在网络共享盘上、由多台电脑同时打开时应使用 TIMU_JOURNAL_MODE=DELETE。
+"""
+import os
+import pathlib
+import queue
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# 默认的数据库文件
+DB_PATH = os.environ.get('TIMU_DB', 'timu_database.db')
+# 日志模式：默认 WAL，网络共享盘上用 DELETE
+JOURNAL_MODE = os.environ.get('TIMU_JOURNAL_MODE', 'WAL').upper()
+
+# 连接遇到锁时最多等待的秒数
+BUSY_TIMEOUT = 30
+# 只读连接池的大小
+READER_POOL_SIZE = 4
+# retry_busy 的重试次数和第一次重试前等待的秒数，之后每次加倍
+RETRY_ATTEMPTS = 5
+RETRY_DELAY = 0.05
+
+
+class WriterBusy(sqlite3.OperationalError):
+    # 写连接在限定时间内没有空出来（通常是后台导入正在进行）
+    pass
+
+
+def is_busy_error(error):
+    # SQLITE_BUSY / SQLITE_LOCKED：等待超时，或 WAL 下读事务的快照已过期不能再升级为写事务
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in str(error) or 'busy' in str(error))
+
+
+def retry_busy(func, *args, attempts=RETRY_ATTEMPTS, delay=RETRY_DELAY, **kwargs):
+    """执行 func(*args, **kwargs)，遇到数据库忙时回滚并等待一段时间后重试
+
+    等待时间每次加倍并加上随机抖动，避免几个进程同时重试；重试 attempts 次后仍然忙时抛出原来的异常。
+    func 应当是一个完整的事务（出错时可以整体重做）。
+    """
+    for attempt in range(attempts):
+        try:
+            return func(*args, **kwargs)
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == attempts - 1:
+                raise
+        time.sleep(delay * (2 ** attempt) * (0.5 + random.random()))
+
+
+def connect(db_path=DB_PATH, timeout=BUSY_TIMEOUT, journal_mode=JOURNAL_MODE):
+    """打开读写连接：设置忙等待时间和日志模式
+
+    连接允许跨线程使用（check_same_thread=False），由调用方保证同一时间只有一个线程在用。
+    """
+    conn = sqlite3.connect(db_path, timeout=timeout, check_same_thread=False)
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    if journal_mode == 'WAL':
+        # WAL 下 synchronous=NORMAL 不会损坏数据库，只在断电时可能丢失最后几次提交
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def connect_readonly(db_path=DB_PATH, timeout=BUSY_TIMEOUT):
+    # 打开只读连接，误执行写入时 SQLite 直接报错
+    uri = pathlib.Path(db_path).resolve().as_uri() + '?mode=ro'
+    conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False)
+    conn.execute("PRAGMA query_only=1")
+    return conn
+
+
+class Storage:
+    """一个数据库的全部连接：一个写连接和一组只读连接
+
+    写连接打开时执行结构升级（见 timu_core.open_database），所有修改题目的操作都通过 writer() 取得它；
+    列表、搜索和导出通过 reader() 从连接池借用只读连接，不会排在导入后面。
+    用法：
+        storage = Storage('timu_database.db')
+        with storage.reader() as conn:
+            conn.execute("SELECT COUNT(*) FROM timu")
+        with storage.writer(timeout=2) as conn:
+            conn.execute("DELETE FROM timu WHERE id=?", (timu_id,))
+            conn.commit()
+    """
+
+    def __init__(self, db_path=DB_PATH, readers=READER_POOL_SIZE, timeout=BUSY_TIMEOUT, journal_mode=JOURNAL_MODE):
+        from timu_core import open_database
+        self.db_path = db_path
+        self.timeout = timeout
+        self.size = readers
+        # 几个程序同时打开同一个旧数据库时，升级会互相等待，偶尔等待超时就重试
+        self.write_conn = retry_busy(open_database, db_path, timeout, journal_mode)
+        self._write_lock = threading.RLock()
+        self._idle = queue.LifoQueue()
+        self._readers = []
+        self._pool_lock = threading.Lock()
+
+    @contextmanager
+    def writer(self, timeout=None):
+        """取得写连接，退出时回滚未提交的事务
+
+        timeout 为 None 时一直等待；否则最多等待 timeout 秒，写连接仍被占用时抛出 WriterBusy，
+        等待其他进程释放写锁的时间也缩短为 timeout，界面线程用它避免长时间卡住。
+        """
+        if not self._write_lock.acquire(timeout=-1 if timeout is None else timeout):
+            raise WriterBusy("数据库正在被后台任务写入")
+        conn = self.write_conn
+        try:
+            if timeout is not None:
+                conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+                if timeout is not None:
+                    conn.execute(f"PRAGMA busy_timeout={int(self.timeout * 1000)}")
+            finally:
+                self._write_lock.release()
+
+    def acquire_reader(self):
+        # 优先复用空闲的只读连接，连接数不足 size 时新建，否则等待其他线程归还
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if len(self._readers) < self.size:
+                conn = connect_readonly(self.db_path, self.timeout)
+                self._readers.append(conn)
+                return conn
+        return self._idle.get()
+
+    def release_reader(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def reader(self):
+        conn = self.acquire_reader()
+        try:
+            yield conn
+        finally:
+            self.release_reader(conn)
+
+    @contextmanager
+    def connection(self, read_only=False):
+        # 后台任务使用：只读任务借只读连接，其余任务使用写连接
+        with (self.reader() if read_only else self.writer()) as conn:
+            yield conn
+
+    def close(self):
+        with self._write_lock:
+            self.write_conn.close()
+        with self._pool_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
@@ -0,0 +1,212 @@
+import hashlib
+import io
+import json
+import os
+
+from timu_db import IN_CHUNK_SIZE, json_row, now_str, txt_row
+from timu_docx import iter_docx_lines
+from timu_import import is_bank_file
+from timu_parser import parse_timu
+
+# 记录每个来源文件上次同步时的状态，文件没变时不必打开
+SOURCE_FILES_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS source_files (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER,
+    hash TEXT,
+    count INTEGER,
+    sync_time TEXT
+)
+'''
+
+UPSERT_SQL = ("INSERT INTO timu (id, title, option, answer, analysis, source, create_time, digest, "
+              "qtype, option_count, answer_len, text_len, src_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+              "ON CONFLICT(id) DO UPDATE SET title=excluded.title, option=excluded.option, answer=excluded.answer, "
+              "analysis=excluded.analysis, source=excluded.source, digest=excluded.digest, src_path=excluded.src_path "
+              # 其他文件的题目（JSON中自带的ID相同时）不接管，只接管普通导入的、没有 src_path 的题目
+              "WHERE timu.src_path IS excluded.src_path OR timu.src_path IS NULL")
+SOURCE_UPSERT_SQL = ("INSERT INTO source_files (path, size, mtime_ns, hash, count, sync_time) VALUES (?, ?, ?, ?, ?, ?) "
+                     "ON CONFLICT(path) DO UPDATE SET size=excluded.size, mtime_ns=excluded.mtime_ns, hash=excluded.hash, "
+                     "count=excluded.count, sync_time=excluded.sync_time")
+
+# 累计写入这么多行或处理这么多个有变化的文件后提交一次
+COMMIT_ROWS = 5000
+COMMIT_FILES = 200
+
+
+def ensure_source_files(conn):
+    conn.execute(SOURCE_FILES_SCHEMA)
+    conn.commit()
+
+
+def scan_folder(folder_path):
+    # 递归列出文件夹中支持的文件，返回 (绝对路径, 大小, 修改时间) 列表；只读取目录项，不打开文件
+    result = []
+    stack = [os.path.abspath(folder_path)]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif is_bank_file(entry.name):
+                    stat = entry.stat()
+                    result.append((entry.path, stat.st_size, stat.st_mtime_ns))
+    result.sort()
+    return result
+
+
+def file_rows(path, data, create_time, id_source=None):
+    """解析文件内容，返回 {题目ID: 数据库行}
+
+    同步时一律按内容生成ID（JSON题目自带ID的除外），文件修改后才能和原来的题目对应上。
+    ID 按 id_source（文件相对同步目录的路径）计算，不同子文件夹中的同名文件即使有相同的题目，ID 也不同；
+    来源列仍然是文件名。
+    """
+    source = os.path.basename(path)
+    id_source = id_source or source
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.docx':
+        rows = (txt_row(timu, id_source, create_time, True) for timu in parse_timu(iter_docx_lines(io.BytesIO(data))))
+    elif ext == '.txt':
+        rows = (txt_row(timu, id_source, create_time, True) for timu in parse_timu(io.StringIO(data.decode('utf-8-sig'))))
+    else:
+        rows = (json_row(item, id_source, create_time, True) for item in json.loads(data.decode('utf-8-sig')))
+    # 第6列是来源
+    return {row[0]: row[:5] + (source,) + row[6:] for row in rows}
+
+
+class FolderSync:
+    """增量同步文件夹：只重新导入有变化的文件，并且只写入有差异的题目
+
+    每个文件的大小、修改时间和内容哈希记录在 source_files 表中，题目通过 src_path 列记录来自哪个文件：
+    - 大小和修改时间都没变的文件直接跳过，不打开
+    - 修改时间变了但内容哈希没变的文件只更新记录
+    - 内容变了的文件重新解析，和它上次产生的题目逐条比较摘要，只插入、更新、删除有差异的题目
+    - 已经不存在的文件，删除它产生的题目
+    """
+
+    def __init__(self, conn, folder_path, on_progress=None, check_cancel=None):
+        self.conn = conn
+        self.folder_path = os.path.abspath(folder_path)
+        self.on_progress = on_progress
+        self.check_cancel = check_cancel
+        self.files_total = 0
+        self.files_done = 0
+        self.files_changed = 0
+        self.files_skipped = 0
+        self.files_removed = 0
+        self.inserted = 0
+        self.updated = 0
+        self.deleted = 0
+        self.failed_files = []
+        self._pending_rows = 0
+        self._pending_files = 0
+
+    def relative_path(self, path):
+        # 相对同步目录的路径，统一用 "/" 分隔，在不同系统上算出的ID相同
+        return os.path.relpath(path, self.folder_path).replace(os.sep, '/')
+
+    def known_files(self):
+        prefix = os.path.join(self.folder_path, '')
+        rows = self.conn.execute("SELECT path, size, mtime_ns, hash FROM source_files WHERE substr(path, 1, ?) = ?",
+                                 (len(prefix), prefix))
+        return {path: (size, mtime_ns, file_hash) for path, size, mtime_ns, file_hash in rows}
+
+    def run(self):
+        files = scan_folder(self.folder_path)
+        known = self.known_files()
+        self.files_total = len(files)
+        create_time = now_str()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for path, size, mtime_ns in files:
+                record = known.pop(path, None)
+                if record is not None and record[0] == size and record[1] == mtime_ns:
+                    self.files_skipped += 1
+                else:
+                    self.sync_file(path, size, mtime_ns, record, create_time)
+                self.files_done += 1
+                if self.on_progress is not None and (self._pending_files or self.files_done % 1000 == 0):
+                    self.on_progress(self, path)
+                self.maybe_commit()
+            # 剩下的记录对应的文件已被删除
+            for path in known:
+                self.remove_file(path)
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return self
+
+    def maybe_commit(self):
+        # 分批提交，每个文件的题目和文件记录总在同一批中，取消时只回滚未提交的文件
+        if self._pending_rows >= COMMIT_ROWS or self._pending_files >= COMMIT_FILES:
+            self.conn.commit()
+            self.conn.execute("BEGIN IMMEDIATE")
+            self._pending_rows = 0
+            self._pending_files = 0
+        if self.check_cancel is not None:
+            self.check_cancel()
+
+    def sync_file(self, path, size, mtime_ns, record, create_time):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            self.failed_files.append(f"{path}: {str(e)}")
+            return
+        file_hash = hashlib.sha1(data).hexdigest()
+        if record is not None and record[2] == file_hash:
+            # 只是修改时间变了
+            self.files_skipped += 1
+            self.save_file_record(path, size, mtime_ns, file_hash, None)
+            return
+
+        try:
+            rows = file_rows(path, data, create_time, self.relative_path(path))
+        except Exception as e:
+            # 解析失败时不更新文件记录，下次同步会重试
+            self.failed_files.append(f"{path}: {str(e)}")
+            return
+
+        self.files_changed += 1
+        # 新增、修改、删除都只针对这个文件（src_path）的题目，不会改动或删除其他文件的题目
+        existing = dict(self.conn.execute("SELECT id, digest FROM timu WHERE src_path=?", (path,)))
+        added = []
+        changed = []
+        for timu_id, row in rows.items():
+            digest = existing.pop(timu_id, None)
+            if digest is None:
+                added.append(row + (path,))
+            elif digest != row[7]:
+                changed.append(row + (path,))
+        if added:
+            # ID 已被其他文件的题目占用的行不会写入，按实际写入的行数计数
+            self.inserted += self.conn.executemany(UPSERT_SQL, added).rowcount
+        if changed:
+            self.updated += self.conn.executemany(UPSERT_SQL, changed).rowcount
+        # 文件中已经没有的题目
+        self.delete_rows(path, list(existing))
+        self.save_file_record(path, size, mtime_ns, file_hash, len(rows))
+        self._pending_rows += len(added) + len(changed) + len(existing)
+        self._pending_files += 1
+
+    def delete_rows(self, path, ids):
+        for i in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[i:i + IN_CHUNK_SIZE]
+            placeholders = ",".join(["?"] * len(chunk))
+            self.deleted += self.conn.execute(f"DELETE FROM timu WHERE src_path=? AND id IN ({placeholders})",
+                                              [path] + chunk).rowcount
+
+    def remove_file(self, path):
+        self.deleted += self.conn.execute("DELETE FROM timu WHERE src_path=?", (path,)).rowcount
+        self.conn.execute("DELETE FROM source_files WHERE path=?", (path,))
+        self.files_removed += 1
+
+    def save_file_record(self, path, size, mtime_ns, file_hash, count):
+        if count is None:
+            self.conn.execute("UPDATE source_files SET size=?, mtime_ns=?, sync_time=? WHERE path=?",
+                              (size, mtime_ns, now_str(), path))
+        else:
+            self.conn.execute(SOURCE_UPSERT_SQL, (path, size, mtime_ns, file_hash, count, now_str()))
@@ -0,0 +1,462 @@
+import json
+import os
+
+from build_banks import add_json_list_entries, bank_entry, json_list_conflicts
+from timu_db import (CONFLICT_IGNORE, CONFLICT_NEW_ID, CONFLICT_SYNC, CONFLICT_UPDATE, BATCH_SIZE,
+                     BulkWriter, json_row, now_str, txt_row)
+from timu_analytics import analytics_available, analyze
+from timu_binfmt import write_bank
+from timu_dedupe import THRESHOLD, dedupe_available, find_clusters, update_signatures
+from timu_delta import publish
+from timu_export import CHUNK_QUESTIONS, EXPORT_BINARY, EXPORT_COMPACT, count_export_rows, write_chunked_export, write_export
+from timu_docx import iter_docx_lines
+from timu_import import TEXT_EXTENSIONS, is_bank_file, parallel_parse_folder
+from timu_jobs import read_only
+from timu_paper import describe_counts, load_papers, paper_names, write_papers
+from timu_parser import parse_timu, parse_timu_file
+from timu_sync import FolderSync
+
+# 导入、导出的具体工作，在后台任务线程中执行，不依赖界面。
+# 每个函数的前两个参数是 Job 和该任务专用的数据库连接，返回包含 status / message 的结果字典，
+# status 用于状态栏，message 用于完成后的提示框。
+# 各阶段的耗时和读取字节数、解析题数、写入行数等计数记在 job.metrics 中（见 timu_metrics）。
+
+# 读取TXT文件时每次读入的字节数
+READ_BLOCK = 1024 * 1024
+
+
+def format_sync_counts(writer):
+    # 按内容同步时附带新增/更新/跳过的数量
+    if writer.conflict != CONFLICT_SYNC:
+        return ""
+    return f"（新增 {writer.inserted}，更新 {writer.updated}，未变化跳过 {writer.skipped}）"
+
+
+def watch_writer(job, writer):
+    # 每写入一批就汇报一次进度，并检查是否被取消；写入器各阶段的耗时记到任务的 metrics 中
+    def on_flush():
+        job.report(rows=writer.written)
+        job.check_cancel()
+    writer.on_flush = on_flush
+    writer.metrics = job.metrics
+
+
+def count_writer(job, writer):
+    # 导入结束后把写入器的计数记到任务的 metrics 中
+    for name in ('inserted', 'updated', 'skipped', 'conflicts'):
+        if getattr(writer, name):
+            job.metrics.add(name, getattr(writer, name))
+    job.metrics.add('rows', writer.written)
+
+
+def sign_questions(job, conn):
+    # 为新导入和有变化的题目计算相似度签名；导入已经提交，这一步不响应取消。没有安装 numpy 时跳过
+    if not dedupe_available():
+        return
+    job.report(message="正在计算相似题目签名...", bytes_total=0, files_total=0)
+    with job.metrics.stage('相似签名'):
+        update_signatures(conn, on_progress=lambda done, total: job.report(items_done=done, items_total=total))
+
+
+def iter_file_lines(job, file_path):
+    """按行读取题库文件，顺便统计已读取的字节数用于估算剩余时间；Word 文档按解压出的正文字节数估算
+
+    TXT 按块读入、解码后再拆成行，读取和解码的耗时记为"读取文件"阶段；
+    Word 文档边解压边解析，逐段落计时，记为"读取Word"阶段。
+    """
+    metrics = job.metrics
+    if file_path.lower().endswith('.docx'):
+        def on_read(bytes_done, bytes_total):
+            job.progress['bytes_done'] = bytes_done
+            job.progress['bytes_total'] = bytes_total
+        yield from metrics.iterate(iter_docx_lines(file_path, on_read), '读取Word')
+        metrics.add('bytes_read', job.progress.get('bytes_done', 0))
+        return
+    bytes_total = os.path.getsize(file_path)
+    bytes_done = 0
+    pending = b''
+    with open(file_path, 'rb') as f:
+        while True:
+            with metrics.stage('读取文件'):
+                block = f.read(READ_BLOCK)
+                data = pending + block
+                if block:
+                    # 块末尾不完整的一行留到下一块，按 b'\n' 切分不会切断多字节字符
+                    end = data.rfind(b'\n') + 1
+                    data, pending = data[:end], data[end:]
+                text = data.decode('utf-8')
+                if bytes_done == 0:
+                    text = text.lstrip('\ufeff')
+                bytes_done += len(data)
+                lines = text.split('\n')
+            job.progress['bytes_done'] = bytes_done
+            job.progress['bytes_total'] = bytes_total
+            for line in lines[:-1]:
+                yield line + '\n'
+            if not block:
+                # 文件末尾没有换行符的最后一行
+                if lines[-1]:
+                    yield lines[-1]
+                break
+    metrics.add('bytes_read', bytes_done)
+
+
+def import_txt(job, conn, file_path, use_content_id=True, batch_size=BATCH_SIZE):
+    source = os.path.basename(file_path)
+    job.report(message=f"正在导入: {source}...")
+    # 逐行流式解析，解析出的题目按批次写入数据库
+    create_time = now_str()
+    conflict = CONFLICT_SYNC if use_content_id else CONFLICT_NEW_ID
+    metrics = job.metrics
+    with BulkWriter(conn, batch_size=batch_size, conflict=conflict) as writer:
+        watch_writer(job, writer)
+        timus = metrics.iterate(parse_timu(iter_file_lines(job, file_path)), '解析', 'questions')
+        for row in metrics.iterate((txt_row(timu, source, create_time, use_content_id) for timu in timus), '生成ID'):
+            writer.add(row)
+    count_writer(job, writer)
+    sign_questions(job, conn)
+    count = writer.written
+    return {
+        'count': count,
+        'status': f"导入完成！成功导入 {count} 道题目{format_sync_counts(writer)}",
+        'message': f"成功导入 {count} 道题目！{format_sync_counts(writer)}",
+    }
+
+
+def import_json(job, conn, file_path, use_content_id=True, batch_size=BATCH_SIZE):
+    source = os.path.basename(file_path)
+    job.report(message=f"正在导入: {source}...")
+    with job.metrics.stage('解析'), open(file_path, 'r', encoding='UTF-8') as f:
+        data = json.load(f)
+    job.metrics.add('bytes_read', os.path.getsize(file_path))
+    job.metrics.add('questions', len(data))
+    job.check_cancel()
+
+    # ID重复时更新现有记录
+    create_time = now_str()
+    conflict = CONFLICT_SYNC if use_content_id else CONFLICT_UPDATE
+    with BulkWriter(conn, batch_size=batch_size, conflict=conflict) as writer:
+        watch_writer(job, writer)
+        rows = job.metrics.iterate((json_row(item, source, create_time, use_content_id) for item in data), '生成ID')
+        for i, row in enumerate(rows):
+            writer.add(row)
+            job.progress['items_done'] = i + 1
+            job.progress['items_total'] = len(data)
+    count_writer(job, writer)
+    sign_questions(job, conn)
+    count = writer.written
+    return {
+        'count': count,
+        'status': f"导入完成！成功导入/更新 {count} 道题目{format_sync_counts(writer)}",
+        'message': f"成功导入/更新 {count} 道题目！{format_sync_counts(writer)}",
+    }
+
+
+def insert_folder_records(writer, records, filename, file_ext, create_time, use_content_id):
+    # 将批量导入中一个文件（或文件的一块）解析出的题目交给批量写入器，返回导入数量
+    # 按内容生成ID时统一按内容同步；否则TXT、Word题目ID重复时重新生成ID，JSON题目ID重复时跳过
+    if file_ext in TEXT_EXTENSIONS:
+        rows = (txt_row(timu, filename, create_time, use_content_id) for timu in records)
+        writer.conflict = CONFLICT_NEW_ID
+    else:
+        rows = (json_row(item, filename, create_time, use_content_id) for item in records)
+        writer.conflict = CONFLICT_IGNORE
+    if use_content_id:
+        writer.conflict = CONFLICT_SYNC
+    if writer.metrics is not None:
+        rows = writer.metrics.iterate(rows, '生成ID')
+    before = writer.written
+    writer.add_many(rows)
+    writer.flush()
+    return writer.written - before
+
+
+def folder_files(folder_path):
+    return [filename for filename in os.listdir(folder_path) if is_bank_file(filename)]
+
+
+def import_folder(job, conn, folder_path, use_content_id=True, parallel=False, batch_size=BATCH_SIZE):
+    job.report(message="正在批量导入文件夹中的文件...")
+    if parallel:
+        return import_folder_parallel(job, conn, folder_path, use_content_id, batch_size)
+
+    total_imported = 0
+    create_time = now_str()
+    filenames = folder_files(folder_path)
+
+    with BulkWriter(conn, batch_size=batch_size) as writer:
+        watch_writer(job, writer)
+        for i, filename in enumerate(filenames):
+            file_ext = os.path.splitext(filename)[1].lower()
+            file_path = os.path.join(folder_path, filename)
+            job.report(message=f"正在导入: {filename}...", files_done=i, files_total=len(filenames))
+
+            job.metrics.add('bytes_read', os.path.getsize(file_path))
+            if file_ext in TEXT_EXTENSIONS:
+                # 使用TXT导入方法，Word 文档也按同样的模板解析；读取文件的耗时包含在解析中
+                records = job.metrics.iterate(parse_timu_file(file_path), '解析', 'questions')
+            else:
+                # 使用JSON导入方法
+                with job.metrics.stage('解析'), open(file_path, 'r', encoding='UTF-8') as f:
+                    records = json.load(f)
+                job.metrics.add('questions', len(records))
+            total_imported += insert_folder_records(writer, records, filename, file_ext, create_time, use_content_id)
+            job.check_cancel()
+        job.report(files_done=len(filenames), files_total=len(filenames))
+    count_writer(job, writer)
+    sign_questions(job, conn)
+
+    return {
+        'count': total_imported,
+        'status': f"批量导入完成！成功导入 {total_imported} 道题目{format_sync_counts(writer)}",
+        'message': f"成功导入 {total_imported} 道题目！{format_sync_counts(writer)}",
+    }
+
+
+def import_folder_parallel(job, conn, folder_path, use_content_id=True, batch_size=BATCH_SIZE):
+    # 多进程并行解析，解析结果统一交给本任务的数据库连接写入
+    total_imported = 0
+    file_counts = {}
+    failed_files = []
+    files_total = len(folder_files(folder_path))
+    files_done = 0
+    create_time = now_str()
+    with BulkWriter(conn, batch_size=batch_size) as writer:
+        watch_writer(job, writer)
+        # 解析在子进程中进行，这里只能统计等待解析结果的时间
+        results = job.metrics.iterate(parallel_parse_folder(folder_path), '等待解析进程')
+        for file_path, file_ext, records, error, file_done in results:
+            filename = os.path.basename(file_path)
+            files_done += file_done
+            if error is not None:
+                if filename not in failed_files:
+                    failed_files.append(filename)
+                job.report(message=f"导入失败: {filename}: {str(error)}", files_done=files_done, files_total=files_total)
+                continue
+
+            job.metrics.add('questions', len(records))
+            count = insert_folder_records(writer, records, filename, file_ext, create_time, use_content_id)
+            file_counts[filename] = file_counts.get(filename, 0) + count
+            total_imported += count
+            if file_done and filename not in failed_files:
+                job.report(message=f"已导入: {filename}（{file_counts[filename]} 道题目）",
+                           files_done=files_done, files_total=files_total)
+            job.check_cancel()
+    count_writer(job, writer)
+    sign_questions(job, conn)
+
+    sync_counts = format_sync_counts(writer)
+    result = {'count': total_imported, 'failed_files': failed_files}
+    if failed_files:
+        result['status'] = f"批量导入完成！成功导入 {total_imported} 道题目{sync_counts}，{len(failed_files)} 个文件导入失败"
+        result['message'] = f"成功导入 {total_imported} 道题目！{sync_counts}\n以下文件导入失败：\n" + "\n".join(failed_files)
+    else:
+        result['status'] = f"批量导入完成！成功导入 {total_imported} 道题目{sync_counts}"
+        result['message'] = f"成功导入 {total_imported} 道题目！{sync_counts}"
+    return result
+
+
+def sync_folder(job, conn, folder_path):
+    # 增量同步：只重新导入有变化的文件，删除已不存在的文件产生的题目
+    job.report(message="正在检查文件夹中的文件...")
+
+    def on_progress(sync, path):
+        job.report(message=f"正在同步: {os.path.basename(path)}...", files_done=sync.files_done,
+                   files_total=sync.files_total, rows=sync.inserted + sync.updated + sync.deleted)
+
+    with job.metrics.stage('同步'):
+        sync = FolderSync(conn, folder_path, on_progress=on_progress, check_cancel=job.check_cancel).run()
+    for name in ('inserted', 'updated', 'deleted', 'files_changed', 'files_skipped'):
+        job.metrics.add(name, getattr(sync, name))
+    job.metrics.add('rows', sync.inserted + sync.updated + sync.deleted)
+    sign_questions(job, conn)
+    files = (f"检查 {sync.files_total} 个文件，{sync.files_changed} 个有变化，{sync.files_skipped} 个未变化，"
+             f"{sync.files_removed} 个已删除")
+    rows = f"新增 {sync.inserted}，更新 {sync.updated}，删除 {sync.deleted} 道题目"
+    result = {'count': sync.inserted + sync.updated + sync.deleted, 'failed_files': sync.failed_files}
+    if sync.failed_files:
+        result['status'] = f"同步完成！{rows}，{len(sync.failed_files)} 个文件导入失败"
+        result['message'] = f"{files}\n{rows}\n以下文件导入失败：\n" + "\n".join(sync.failed_files)
+    else:
+        result['status'] = f"同步完成！{rows}"
+        result['message'] = f"{files}\n{rows}"
+    return result
+
+
+@read_only
+def export_json(job, conn, file_path, sources=None, fmt=EXPORT_COMPACT):
+    # 导出全部题目，或只导出指定来源的题目；先写临时文件，完成后再替换，取消时不留下半个文件
+    job.report(message=f"正在导出: {os.path.basename(file_path)}...")
+    total = count_export_rows(conn, sources)
+    job.report(items_done=0, items_total=total)
+
+    def on_batch(count):
+        job.report(rows=count, items_done=count)
+        job.check_cancel()
+
+    tmp_path = file_path + '.tmp'
+    metrics = job.metrics
+    try:
+        # 写文件的耗时中扣除了读取数据库的部分
+        with metrics.stage('写出文件'):
+            if fmt == EXPORT_BINARY:
+                with open(tmp_path, 'wb') as f:
+                    count = write_bank(conn, f, sources, on_batch=on_batch, metrics=metrics)
+            else:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    count = write_export(conn, f, fmt, sources, on_batch=on_batch, metrics=metrics)
+        metrics.add('rows', count)
+        metrics.add('bytes_written', os.path.getsize(tmp_path))
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    prefix = "条件导出" if sources else "导出"
+    return {
+        'count': count,
+        'status': f"{prefix}成功！文件已保存至: {os.path.basename(file_path)}",
+        'message': f"成功导出 {count} 道题目到 {file_path}！",
+    }
+
+
+@read_only
+def export_chunks(job, conn, out_dir, chunk_size=CHUNK_QUESTIONS, sources=None):
+    # 分块导出到一个目录，供 timu.html 按需加载
+    job.report(message=f"正在分块导出到: {os.path.basename(out_dir)}...")
+    total = count_export_rows(conn, sources)
+    job.report(items_done=0, items_total=total)
+
+    def on_batch(count):
+        job.report(rows=count, items_done=count)
+        job.check_cancel()
+
+    with job.metrics.stage('写出文件'):
+        manifest = write_chunked_export(conn, out_dir, chunk_size, sources, on_batch=on_batch, metrics=job.metrics)
+    count = manifest['count']
+    job.metrics.add('rows', count)
+    types = "，".join(f"{name} {n}" for name, n in manifest['types'].items() if n)
+    return {
+        'count': count,
+        'status': f"分块导出成功！共 {count} 道题目，{len(manifest['chunks'])} 个分块",
+        'message': f"成功导出 {count} 道题目到 {out_dir}！\n共 {len(manifest['chunks'])} 个分块（{types}）",
+    }
+
+
+def format_size(size):
+    return f"{size / 1024 / 1024:.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.1f} KB"
+
+
+@read_only
+def export_delta(job, conn, out_dir, sources=None):
+    # 增量发布到一个目录：timu.html 缓存题库，之后只下载两次发布之间的补丁
+    job.report(message=f"正在增量发布到: {os.path.basename(out_dir)}...")
+    total = count_export_rows(conn, sources)
+    job.report(items_done=0, items_total=total)
+
+    def on_batch(count):
+        job.report(rows=count, items_done=count)
+        job.check_cancel()
+
+    with job.metrics.stage('写出文件'):
+        manifest, changed = publish(conn, out_dir, sources, on_batch=on_batch, metrics=job.metrics)
+    count = manifest['count']
+    release = manifest['release']
+    if not changed:
+        return {
+            'count': 0,
+            'status': f"题库没有变化，仍为第 {release} 次发布",
+            'message': f"上次发布后题库没有变化，{out_dir} 中仍为第 {release} 次发布（{count} 道题目）",
+        }
+    job.metrics.add('rows', count)
+    base = f"完整题库 {format_size(manifest['base']['size'])}"
+    patch = manifest['patches'][-1] if manifest['patches'] else None
+    if patch is None or patch['to'] != release:
+        detail = f"首次发布，{base}"
+    else:
+        detail = (f"补丁 {format_size(patch['size'])}（新增或修改 {patch['upsert']} 道，删除 {patch['delete']} 道），"
+                  f"{base}")
+    return {
+        'count': count,
+        'status': f"增量发布成功！第 {release} 次发布，共 {count} 道题目",
+        'message': f"已发布到 {out_dir}：第 {release} 次发布，共 {count} 道题目\n{detail}",
+    }
+
+
+def find_duplicates(job, conn, threshold=THRESHOLD):
+    # 先补算缺少的签名，再用 LSH 分桶查找相似题目组，结果中的 clusters 供界面或命令行展示
+    if not dedupe_available():
+        raise RuntimeError("查找相似题目需要安装 numpy")
+    job.report(message="正在计算相似题目签名...")
+    update_signatures(conn, on_progress=lambda done, total: job.report(items_done=done, items_total=total))
+    job.report(message="正在查找相似题目...", items_done=0, items_total=0)
+    clusters = find_clusters(conn, threshold, check_cancel=job.check_cancel)
+    count = sum(len(cluster) for cluster in clusters)
+    return {
+        'count': count,
+        'clusters': clusters,
+        'threshold': threshold,
+        'status': f"找到 {len(clusters)} 组相似题目，共 {count} 道",
+        'message': f"找到 {len(clusters)} 组相似题目，共 {count} 道（相似度不低于 {threshold}）",
+    }
+
+
+def analyze_answers(job, conn, paths):
+    # 读取答题日志和错题记录，计算每道题的错误率、选项选择次数和区分度，整体替换统计表；取消时统计表保持不变
+    if not analytics_available():
+        raise RuntimeError("答题统计需要安装 numpy")
+    job.report(message="正在读取答题记录...")
+    result = analyze(conn, paths, on_progress=lambda done, total: job.report(bytes_done=done, bytes_total=total),
+                     check_cancel=job.check_cancel)
+    unmatched = f"，{result['unmatched']} 道题目不在题库中，已忽略" if result['unmatched'] else ""
+    result['status'] = f"答题统计完成：{result['events']} 次作答，{result['questions']} 道题目，{result['sources']} 个来源"
+    result['message'] = (f"读取 {result['files']} 个文件，{result['users']} 名学生的 {result['events']} 次作答，"
+                         f"已更新 {result['questions']} 道题目的统计{unmatched}")
+    return result
+
+
+def paper_conflicts(root, name, copies=1, register=True):
+    """组卷会覆盖的已有题库：root/json/ 下的同名文件，register 时还有 JSONList 中来源或 id 相同的记录"""
+    names = paper_names(name, copies)
+    conflicts = [f"json/{file_name}" for file_name in names if os.path.exists(os.path.join(root, 'json', file_name))]
+    if register:
+        conflicts += [f"题库列表中的 {entry_id}"
+                      for entry_id in json_list_conflicts(os.path.join(root, 'js', 'public.js'), names)]
+    return conflicts
+
+
+@read_only
+def generate_papers(job, conn, root, name, counts, copies=1, sources=None, exclude_paths=None, seed=None,
+                    register=True, overwrite=False):
+    """组卷：试卷写到 root/json/，register 时同时加入 root/js/public.js 的 JSONList；取消时不留下试卷
+
+    名称与已有题库（文件或 JSONList 记录）相同时报错，overwrite 为真时才覆盖。
+    """
+    conflicts = [] if overwrite else paper_conflicts(root, name, copies, register)
+    if conflicts:
+        raise ValueError(f"已有同名题库：{'、'.join(conflicts[:5])}{' 等' if len(conflicts) > 5 else ''}，"
+                         "请换一个试卷名称，或选择覆盖")
+    job.report(message="正在读取往期试卷..." if exclude_paths else "正在组卷...", items_done=0, items_total=copies)
+    exclude = load_papers(exclude_paths or [])
+    job.report(message="正在组卷...")
+
+    def on_paper(done):
+        job.report(items_done=done, rows=done * sum(counts.values()))
+        job.check_cancel()
+
+    json_dir = os.path.join(root, 'json')
+    papers = write_papers(conn, json_dir, name, counts, copies, sources, exclude, seed, on_paper=on_paper,
+                          overwrite=overwrite)
+    describe = f"组卷：{describe_counts(counts)}，来源：{'、'.join(sources) if sources else '全部题库'}"
+    if register:
+        entries = []
+        for i, (file_name, data) in enumerate(papers, 1):
+            entries.append(bank_entry(file_name, data, name if copies == 1 else f"{name} 第{i}份", describe))
+        add_json_list_entries(os.path.join(root, 'js', 'public.js'), entries)
+    registered = "，已加入 js/public.js 的题库列表" if register else ""
+    return {
+        'count': len(papers),
+        'files': [file_name for file_name, _ in papers],
+        'status': f"组卷完成！生成 {len(papers)} 份试卷（{describe_counts(counts)}）",
+        'message': f"已生成 {len(papers)} 份试卷到 {json_dir}{registered}\n{describe}",
+    }